@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Routing for the Slack bot's interactive actions (button clicks).
+
+Button values are short dotted integer lists with a version prefix, e.g.
+``"1.3.0.2"`` (version 1; quiz step 3, question 0, answer 2). Values from
+messages posted before versioning (``"history_0_2"``, ``"3"``) decode as
+version 0. Each action_id has one handler and a parser that validates the
+decoded fields; parsed values are remembered, so a click on a known button
+is a dict lookup plus the handler call. Clicks on actions nobody registered
+are acknowledged and dropped.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Callable, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+VALUE_VERSION = 1
+
+Field = Union[int, str]
+
+
+class ActionValueError(ValueError):
+    """A button value that can't be decoded or doesn't name anything that exists."""
+
+
+def encode_value(*fields: int) -> str:
+    """Encode integer fields as a versioned button value."""
+    return '.'.join(str(field) for field in (VALUE_VERSION,) + fields)
+
+
+def decode_value(value: Optional[str]) -> Tuple[int, Tuple[Field, ...]]:
+    """Split a button value into ``(version, fields)``; version 0 fields may be strings."""
+    if not value:
+        return VALUE_VERSION, ()
+    if '.' not in value:
+        return 0, tuple(int(part) if part.isdigit() else part for part in value.split('_'))
+    try:
+        version, *fields = (int(part) for part in value.split('.'))
+    except ValueError:
+        raise ActionValueError(f"malformed action value {value!r}") from None
+    if version != VALUE_VERSION:
+        raise ActionValueError(f"unsupported action value version {version}")
+    return version, tuple(fields)
+
+
+@dataclass(frozen=True)
+class Action:
+    """A click to handle: who clicked, which action, and its parsed value."""
+    action_id: str
+    user_id: str
+    value: object
+    body: Dict
+
+
+@dataclass(frozen=True)
+class _Route:
+    handler: Callable
+    parse: Callable
+
+
+class ActionRouter:
+    """Maps action_id to a handler and a value parser.
+
+    ``parse(version, fields)`` returns the value the handler receives and
+    raises ValueError (or LookupError) for anything invalid.
+    """
+
+    def __init__(self):
+        self._routes: Dict[str, _Route] = {}
+        # (action_id, raw value) -> parsed value; only valid values are kept,
+        # and buttons are precompiled, so this stays as small as the UI
+        self._parsed: Dict[Tuple[str, Optional[str]], object] = {}
+        self.unhandled = 0
+
+    def register(self, action_id: str, handler: Callable, parse: Optional[Callable] = None):
+        self._routes[action_id] = _Route(handler, parse or (lambda version, fields: None))
+
+    def resolve(self, body: Dict) -> Optional[Tuple[Callable, Action]]:
+        """The handler and parsed Action for a click; None if nobody handles it.
+
+        Raises ActionValueError when the action is known but its value isn't valid.
+        """
+        clicked = body['actions'][0]
+        action_id = clicked['action_id']
+        route = self._routes.get(action_id)
+        if route is None:
+            self.unhandled += 1
+            logger.debug(f"Ignoring unhandled action {action_id!r}")
+            return None
+        raw = clicked.get('value')
+        key = (action_id, raw)
+        if key in self._parsed:
+            value = self._parsed[key]
+        else:
+            try:
+                value = route.parse(*decode_value(raw))
+            except ActionValueError:
+                raise
+            except (ValueError, LookupError, TypeError) as e:
+                raise ActionValueError(f"invalid value {raw!r} for {action_id}: {e}") from e
+            self._parsed[key] = value
+        return route.handler, Action(action_id, body['user']['id'], value, body)
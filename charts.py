@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Plotly chart specs for the onboarding dashboard.
+
+The dashboard charts are small and fixed in shape, so their Plotly JSON is
+written out directly from an AnalyticsSnapshot instead of going through
+``plotly.graph_objs`` (whose per-property validation costs far more than the
+data itself). Only the ``plotly_white`` layout template comes from Plotly,
+loaded once and reused.
+"""
+
+from functools import lru_cache
+from typing import Dict
+
+# One color per onboarding step, in step order
+STEP_PALETTE = ['#FF6B9D', '#C44569', '#F8B500', '#6C5CE7', '#A29BFE', '#74B9FF', '#00CEC9', '#55A3FF']
+
+LAYOUT_TEMPLATE = 'plotly_white'
+
+
+@lru_cache(maxsize=None)
+def layout_template(name: str = LAYOUT_TEMPLATE) -> Dict:
+    """The JSON form of a named Plotly layout template (what ``template=name`` expands to)."""
+    import json
+    import plotly.io
+    import plotly.utils
+    return json.loads(json.dumps(plotly.io.templates[name].to_plotly_json(), cls=plotly.utils.PlotlyJSONEncoder))
+
+
+def _layout(title: str, xaxis_title: str, yaxis_title: str, height: int) -> Dict:
+    return {
+        'template': layout_template(),
+        'title': {'text': title},
+        'xaxis': {'title': {'text': xaxis_title}},
+        'yaxis': {'title': {'text': yaxis_title}},
+        'height': height,
+    }
+
+
+def completion_progress_figure(analytics) -> Dict:
+    """Bar chart of the share of employees who completed each step."""
+    steps = list(analytics.step_completion)
+    percentages = [analytics.step_completion[step]['percentage'] for step in steps]
+    return {
+        'data': [{
+            'marker': {'color': STEP_PALETTE},
+            'text': [f"{p:.1f}%" for p in percentages],
+            'textposition': 'auto',
+            'x': steps,
+            'y': percentages,
+            'type': 'bar',
+        }],
+        'layout': _layout('Step Completion Rates', 'Onboarding Steps', 'Completion Percentage', 400),
+    }
+
+
+def daily_starts_figure(analytics) -> Dict:
+    """Line chart of new employees per day over the last 30 days."""
+    return {
+        'data': [{
+            'line': {'color': '#6C5CE7', 'width': 3},
+            'marker': {'color': '#A29BFE', 'size': 8},
+            'mode': 'lines+markers',
+            'x': [day for day, _ in analytics.daily_starts],
+            'y': [count for _, count in analytics.daily_starts],
+            'type': 'scatter',
+        }],
+        'layout': _layout('Daily Onboarding Starts (Last 30 Days)', 'Date', 'New Employees', 300),
+    }
@@ -6,182 +6,655 @@ Web-based dashboard for managers to track employee onboarding progress
 with real-time updates and detailed analytics.
 """
 
-import sqlite3
+import base64
+import gzip
+import hashlib
 import json
-from typing import Dict, List, Optional
-from flask import Flask, render_template, jsonify
-import plotly.graph_objs as go
-import plotly.utils
+import sqlite3
+import threading
+import time
+from dataclasses import asdict, dataclass
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+from flask import Flask, Response, jsonify, render_template, request, stream_with_context
 from dotenv import load_dotenv
 import os
 
+import charts
+from onboarding_store import (
+    STEP_DEFINITIONS, ConnectionPool, data_version, get_pool, migrate, step_pivot_columns, step_values,
+)
+from ttl_cache import TTLCache
+
+try:
+    import brotli
+except ImportError:  # Optional; gzip is always available
+    brotli = None
+
 app = Flask(__name__)
 load_dotenv()
 
+# Set when the server starts shutting down: /readyz fails and live streams end
+draining = threading.Event()
+
+# Every open live stream holds a thread for as long as its page stays open;
+# past this many, new streams are turned away with a 503
+stream_slots = threading.BoundedSemaphore(int(os.getenv('DASHBOARD_MAX_STREAMS', 100)))
+STREAM_RETRY_AFTER = 10
+
+T = TypeVar('T')
+
+# JSON bodies smaller than this are sent uncompressed
+COMPRESS_MIN_BYTES = 1024
+
+PROGRESS_COLUMNS = ('employee_id', 'employee_name', 'slack_user_id', 'start_date', 'current_step',
+                    'completion_percentage', 'completed_date', 'last_activity')
+PROGRESS_FIELDS = PROGRESS_COLUMNS + tuple(step.key for step in STEP_DEFINITIONS)
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(row: Dict) -> str:
+    """An opaque cursor pointing just past ``row`` in (start_date, employee_id) order."""
+    raw = json.dumps([row['start_date'], row['employee_id']]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    """The (start_date, employee_id) key inside a cursor; raises ValueError if malformed."""
+    try:
+        start_date, employee_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError) as exc:
+        raise ValueError('invalid cursor') from exc
+    return str(start_date), str(employee_id)
+
+@dataclass(frozen=True)
+class ProgressQuery:
+    """One page of employees, filtered and projected, in start-date order."""
+    limit: int = DEFAULT_PAGE_SIZE
+    cursor: Optional[Tuple[str, str]] = None
+    descending: bool = True
+    step: Optional[int] = None
+    min_completion: Optional[float] = None
+    max_completion: Optional[float] = None
+    inactive_days: Optional[int] = None
+    fields: Tuple[str, ...] = PROGRESS_FIELDS
+    
+    @classmethod
+    def from_args(cls, args) -> 'ProgressQuery':
+        """Build a query from request arguments; raises ValueError for bad ones."""
+        def number(name: str, kind: type):
+            value = args.get(name, '')
+            if value == '':
+                return None
+            try:
+                return kind(value)
+            except ValueError:
+                raise ValueError(f'{name} must be a number') from None
+        
+        order = args.get('order', 'desc')
+        if order not in ('asc', 'desc'):
+            raise ValueError("order must be 'asc' or 'desc'")
+        fields = PROGRESS_FIELDS
+        if args.get('fields'):
+            fields = tuple(field.strip() for field in args['fields'].split(',') if field.strip())
+            unknown = sorted(set(fields) - set(PROGRESS_FIELDS))
+            if unknown:
+                raise ValueError(f"unknown fields: {', '.join(unknown)}")
+        limit = number('limit', int)
+        return cls(
+            limit=DEFAULT_PAGE_SIZE if limit is None else max(1, min(limit, MAX_PAGE_SIZE)),
+            cursor=decode_cursor(args['cursor']) if args.get('cursor') else None,
+            descending=order == 'desc',
+            step=number('step', int),
+            min_completion=number('min_completion', float),
+            max_completion=number('max_completion', float),
+            inactive_days=number('inactive_days', int),
+            fields=fields,
+        )
+
+@dataclass(frozen=True)
+class AnalyticsSnapshot:
+    """Every aggregate the dashboard page, API and charts need."""
+    total_employees: int
+    completed_employees: int
+    avg_completion: float
+    completion_rate: float
+    step_completion: Dict[str, Dict]
+    daily_starts: List[Tuple[str, int]]
+    avg_completion_days: float
+    
+    def to_dict(self) -> Dict:
+        return asdict(self)
+
+@dataclass(frozen=True)
+class ContentVersion:
+    """A cheap fingerprint of the onboarding data, used for HTTP validators."""
+    employee_count: int
+    last_activity: Optional[str]
+    data_version: int
+    
+    def etag(self, *parts) -> str:
+        """A strong ETag for one representation built from this data."""
+        raw = ':'.join(str(part) for part in (self.data_version, self.employee_count, self.last_activity) + parts)
+        return hashlib.sha1(raw.encode()).hexdigest()[:24]
+
+class SnapshotCache:
+    """Serves dashboard query results until the onboarding data changes.
+    
+    The database's ``data_version`` counter (bumped by triggers on every
+    write, from any process) is re-read at most once per ``ttl`` seconds.
+    Cached results are reused while it is unchanged; entries also expire
+    after ``max_age`` seconds so date-relative data (like the last 30 days of
+    starts) rolls over.
+    """
+    
+    def __init__(self, pool: ConnectionPool, ttl: float = 2.0, maxsize: int = 256, max_age: float = 300.0):
+        self.pool = pool
+        self.ttl = ttl
+        self.entries = TTLCache(maxsize=maxsize, ttl=max_age)
+        self._version: Optional[int] = None
+        self._version_checked_at = float('-inf')
+        self._lock = threading.Lock()
+    
+    def version(self) -> int:
+        """The current data version, re-read from the database at most once per TTL."""
+        with self._lock:
+            if time.monotonic() - self._version_checked_at < self.ttl:
+                return self._version
+        with self.pool.connection() as conn:
+            version = data_version(conn)
+        with self._lock:
+            self._version = version
+            self._version_checked_at = time.monotonic()
+        return version
+    
+    def get(self, key, compute: Callable[[], T]) -> T:
+        """Return the cached result for ``key``, computing it if the data changed."""
+        version = self.version()
+        cached = self.entries.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        value = compute()
+        self.entries.set(key, (version, value))
+        return value
+    
+    def invalidate(self):
+        """Forget every cached result and re-read the data version on next use."""
+        with self._lock:
+            self._version_checked_at = float('-inf')
+        self.entries.clear()
+
 class OnboardingDashboard:
-    def __init__(self, db_path: str = "onboarding.db"):
+    def __init__(self, db_path: str = "onboarding.db", cache_ttl: Optional[float] = None):
         self.db_path = db_path
+        self.pool = get_pool(db_path, read_only=True)
+        if cache_ttl is None:
+            cache_ttl = float(os.getenv('DASHBOARD_CACHE_TTL', 2.0))
+        self.cache = SnapshotCache(self.pool, ttl=cache_ttl)
+        self._schema_ready = False
+        self._schema_lock = threading.Lock()
+    
+    def ensure_schema(self):
+        """Migrate the database to the current schema, once, before its first use.
+        
+        The dashboard's pool is read-only, so an older database (one the bot
+        hasn't opened since upgrading) is migrated over a short-lived
+        writable connection.
+        """
+        if self._schema_ready:
+            return
+        with self._schema_lock:
+            if not self._schema_ready:
+                migrate(self.db_path)
+                self._schema_ready = True
+    
+    def get_content_version(self) -> ContentVersion:
+        """Get the employee count, latest activity and data version."""
+        return self.cache.get(('content_version',), self._load_content_version)
+    
+    def _load_content_version(self) -> ContentVersion:
+        version = self.cache.version()
+        with self.pool.connection() as conn:
+            count, last_activity = conn.execute(
+                'SELECT COUNT(*), MAX(last_activity) FROM onboarding_progress'
+            ).fetchone()
+        return ContentVersion(count, last_activity, version)
     
     def get_all_progress(self) -> List[Dict]:
         """Get progress for all employees."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT employee_id, employee_name, slack_user_id, start_date,
-                   current_step, completion_percentage, completed_date,
-                   last_activity, step_1_github, step_2_environment,
-                   step_3_history_quiz, step_4_product_quiz,
-                   step_5_team_integration, step_6_technical_setup,
-                   step_7_app_testing, step_8_first_contribution
-            FROM onboarding_progress
-            ORDER BY start_date DESC
-        ''')
-        
-        columns = [desc[0] for desc in cursor.description]
-        results = [dict(zip(columns, row)) for row in cursor.fetchall()]
-        
-        conn.close()
-        return results
+        return self.cache.get(('progress',), self._load_all_progress)
     
-    def get_analytics_data(self) -> Dict:
-        """Get analytics data for dashboard."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM onboarding_progress')
-        total_employees = cursor.fetchone()[0]
+    def _load_all_progress(self) -> List[Dict]:
+        return self._query_progress('', ())
+    
+    def get_progress_page(self, query: ProgressQuery) -> Dict:
+        """Get one page of progress as ``{'items': [...], 'next_cursor': ...}``."""
+        return self.cache.get(('progress_page', query), lambda: self._load_progress_page(query))
+    
+    def _load_progress_page(self, query: ProgressQuery) -> Dict:
+        conditions, params = [], []
+        if query.step is not None:
+            conditions.append('current_step = ?')
+            params.append(query.step)
+        if query.min_completion is not None:
+            conditions.append('completion_percentage >= ?')
+            params.append(query.min_completion)
+        if query.max_completion is not None:
+            conditions.append('completion_percentage <= ?')
+            params.append(query.max_completion)
+        if query.inactive_days is not None:
+            # Whole days, so the result only moves when the data or the date does
+            conditions.append('last_activity < ?')
+            params.append((date.today() - timedelta(days=query.inactive_days)).isoformat())
+        direction = 'DESC' if query.descending else 'ASC'
+        if query.cursor:
+            conditions.append(f"(start_date, employee_id) {'<' if query.descending else '>'} (?, ?)")
+            params.extend(query.cursor)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+        params.append(query.limit + 1)
         
-        cursor.execute('SELECT COUNT(*) FROM onboarding_progress WHERE completion_percentage = 100')
-        completed_employees = cursor.fetchone()[0]
+        # Seek the page in the narrow table first; step values are pivoted for that page only
+        sql = f'''
+            SELECT {', '.join(PROGRESS_COLUMNS)} FROM onboarding_progress {where}
+            ORDER BY start_date {direction}, employee_id {direction} LIMIT ?
+        '''
+        if any(field not in PROGRESS_COLUMNS for field in query.fields):
+            sql = f'''
+                SELECT p.*, {step_pivot_columns('e')}
+                FROM ({sql}) p
+                LEFT JOIN step_events e ON e.employee_id = p.employee_id
+                GROUP BY p.employee_id
+                ORDER BY p.start_date {direction}, p.employee_id {direction}
+            '''
+        with self.pool.connection() as conn:
+            cursor = conn.execute(sql, params)
+            columns = [desc[0] for desc in cursor.description]
+            rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
         
-        cursor.execute('SELECT AVG(completion_percentage) FROM onboarding_progress')
-        avg_completion = cursor.fetchone()[0] or 0
+        next_cursor = encode_cursor(rows[query.limit - 1]) if len(rows) > query.limit else None
+        items = [{field: row[field] for field in query.fields} for row in rows[:query.limit]]
+        return {'items': items, 'next_cursor': next_cursor}
+    
+    def get_progress_changes(self, since: str, limit: Optional[int] = None) -> List[Dict]:
+        """Get (up to ``limit``) progress rows whose last activity is after ``since``."""
+        return self.cache.get(('changes', since, limit),
+                              lambda: self._query_progress('WHERE p.last_activity > ?', (since,), limit))
+    
+    def _query_progress(self, where: str, params: Tuple, limit: Optional[int] = None) -> List[Dict]:
+        with self.pool.connection() as conn:
+            cursor = conn.execute(f'''
+                SELECT p.employee_id, p.employee_name, p.slack_user_id, p.start_date,
+                       p.current_step, p.completion_percentage, p.completed_date,
+                       p.last_activity, {step_pivot_columns('e')}
+                FROM onboarding_progress p
+                LEFT JOIN step_events e ON e.employee_id = p.employee_id
+                {where}
+                GROUP BY p.employee_id
+                ORDER BY p.start_date DESC
+                {'LIMIT ?' if limit is not None else ''}
+            ''', params + ((limit,) if limit is not None else ()))
+            
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    
+    def get_analytics_snapshot(self) -> AnalyticsSnapshot:
+        """Get every dashboard metric as one (cached) snapshot."""
+        return self.cache.get(('analytics',), self._compute_analytics)
+    
+    def _compute_analytics(self) -> AnalyticsSnapshot:
+        """Compute every dashboard metric in one pass over onboarding_progress
+        plus one grouped query over step_events."""
+        with self.pool.connection() as conn:
+            # Grouping by start day gives the daily starts chart directly; the
+            # overall totals are sums of the per-day conditional aggregates.
+            days = conn.execute('''
+                SELECT DATE(start_date) AS day,
+                       COUNT(*),
+                       SUM(CASE WHEN completion_percentage = 100 THEN 1 ELSE 0 END),
+                       SUM(completion_percentage),
+                       SUM(julianday(completed_date) - julianday(start_date)),
+                       COUNT(completed_date),
+                       DATE(start_date) >= date('now', '-30 days')
+                FROM onboarding_progress
+                GROUP BY day
+                ORDER BY day
+            ''').fetchall()
+            
+            step_rows = conn.execute('''
+                SELECT s.name, COUNT(e.employee_id)
+                FROM onboarding_steps s
+                LEFT JOIN step_events e ON e.step = s.step AND e.value >= s.required_score
+                GROUP BY s.step
+                ORDER BY s.step
+            ''').fetchall()
         
-        step_completion = {}
-        steps = [
-            ('step_1_github', 'GitHub Account'),
-            ('step_2_environment', 'Dev Environment'),
-            ('step_3_history_quiz', 'History Quiz'),
-            ('step_4_product_quiz', 'Product Quiz'),
-            ('step_5_team_integration', 'Team Integration'),
-            ('step_6_technical_setup', 'Technical Setup'),
-            ('step_7_app_testing', 'App Testing'),
-            ('step_8_first_contribution', 'First Contribution')
-        ]
+        total_employees = sum(row[1] for row in days)
+        completed_employees = sum(row[2] for row in days)
+        completion_sum = sum(row[3] or 0 for row in days)
+        days_to_complete = sum(row[4] or 0 for row in days)
+        completed_with_date = sum(row[5] for row in days)
         
-        for step_field, step_name in steps:
-            if 'quiz' in step_field:
-                min_score = 3 if 'history' in step_field else 2
-                cursor.execute(f'SELECT COUNT(*) FROM onboarding_progress WHERE {step_field} >= ?', (min_score,))
-            else:
-                cursor.execute(f'SELECT COUNT(*) FROM onboarding_progress WHERE {step_field} = 1')
-            
-            completed = cursor.fetchone()[0]
-            step_completion[step_name] = {
+        step_completion = {
+            step_name: {
                 'completed': completed,
                 'total': total_employees,
                 'percentage': (completed / total_employees * 100) if total_employees > 0 else 0
             }
-        
-        cursor.execute('''
-            SELECT DATE(start_date) as date, COUNT(*) as count
-            FROM onboarding_progress
-            WHERE start_date >= date('now', '-30 days')
-            GROUP BY DATE(start_date)
-            ORDER BY date
-        ''')
-        
-        daily_starts = cursor.fetchall()
-        
-        cursor.execute('''
-            SELECT AVG(julianday(completed_date) - julianday(start_date)) as avg_days
-            FROM onboarding_progress
-            WHERE completed_date IS NOT NULL
-        ''')
-        
-        avg_completion_days = cursor.fetchone()[0] or 0
-        
-        conn.close()
-        
-        return {
-            'total_employees': total_employees,
-            'completed_employees': completed_employees,
-            'avg_completion': avg_completion,
-            'completion_rate': (completed_employees / total_employees * 100) if total_employees > 0 else 0,
-            'step_completion': step_completion,
-            'daily_starts': daily_starts,
-            'avg_completion_days': avg_completion_days
+            for step_name, completed in step_rows
         }
+        
+        return AnalyticsSnapshot(
+            total_employees=total_employees,
+            completed_employees=completed_employees,
+            avg_completion=(completion_sum / total_employees) if total_employees > 0 else 0,
+            completion_rate=(completed_employees / total_employees * 100) if total_employees > 0 else 0,
+            step_completion=step_completion,
+            daily_starts=[(row[0], row[1]) for row in days if row[6]],
+            avg_completion_days=(days_to_complete / completed_with_date) if completed_with_date > 0 else 0,
+        )
+    
+    def get_analytics_data(self) -> Dict:
+        """Get analytics data for dashboard."""
+        return self.get_analytics_snapshot().to_dict()
     
     def get_employee_details(self, employee_id: str) -> Optional[Dict]:
         """Get detailed information for a specific employee."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM onboarding_progress WHERE employee_id = ?
-        ''', (employee_id,))
+        return self.cache.get(('employee', employee_id), lambda: self._load_employee_details(employee_id))
+    
+    def _load_employee_details(self, employee_id: str) -> Optional[Dict]:
+        with self.pool.connection() as conn:
+            cursor = conn.cursor()
         
-        result = cursor.fetchone()
-        if result:
-            columns = [desc[0] for desc in cursor.description]
-            employee_data = dict(zip(columns, result))
-            
             cursor.execute('''
-                SELECT quiz_type, score, total_questions, attempt_date
-                FROM quiz_attempts
-                WHERE employee_id = ?
-                ORDER BY attempt_date DESC
+                SELECT * FROM onboarding_progress WHERE employee_id = ?
             ''', (employee_id,))
+        
+            result = cursor.fetchone()
+            if result:
+                columns = [desc[0] for desc in cursor.description]
+                employee_data = dict(zip(columns, result))
+                employee_data.update(step_values(conn, employee_id))
             
-            quiz_attempts = cursor.fetchall()
-            employee_data['quiz_attempts'] = [
-                {
-                    'quiz_type': attempt[0],
-                    'score': attempt[1],
-                    'total_questions': attempt[2],
-                    'attempt_date': attempt[3],
-                    'percentage': (attempt[1] / attempt[2] * 100) if attempt[2] > 0 else 0
-                }
-                for attempt in quiz_attempts
-            ]
+                cursor.execute('''
+                    SELECT quiz_type, score, total_questions, attempt_date
+                    FROM quiz_attempts
+                    WHERE employee_id = ?
+                    ORDER BY attempt_date DESC
+                ''', (employee_id,))
             
-            conn.close()
-            return employee_data
+                quiz_attempts = cursor.fetchall()
+                employee_data['quiz_attempts'] = [
+                    {
+                        'quiz_type': attempt[0],
+                        'score': attempt[1],
+                        'total_questions': attempt[2],
+                        'attempt_date': attempt[3],
+                        'percentage': (attempt[1] / attempt[2] * 100) if attempt[2] > 0 else 0
+                    }
+                    for attempt in quiz_attempts
+                ]
+            
+                return employee_data
         
-        conn.close()
         return None
 
+class ChangeNotifier:
+    """Watches a dashboard's data version on one thread and wakes the streams waiting on it.
+    
+    Open streams block in wait() instead of each polling the database, so
+    any number of them cost one version check per ``poll_interval``. The
+    watcher thread runs only while someone is waiting.
+    """
+    
+    def __init__(self, board: 'OnboardingDashboard', poll_interval: float = 1.0):
+        self.board = board
+        self.poll_interval = poll_interval
+        self._cond = threading.Condition()
+        self._version: Optional[int] = None
+        self._waiters = 0
+        self._running = False
+        self._pid: Optional[int] = None
+    
+    def _watch(self):
+        while True:
+            try:
+                version = self.board.cache.version()
+            except sqlite3.Error as e:
+                app.logger.warning(f"Checking for dashboard changes failed: {e}")
+                version = self._version
+            with self._cond:
+                if version != self._version:
+                    self._version = version
+                    self._cond.notify_all()
+                if not self._waiters or draining.is_set():
+                    self._running = False
+                    self._cond.notify_all()
+                    return
+            draining.wait(self.poll_interval)
+    
+    def wait(self, seen: Optional[int], timeout: float) -> Optional[int]:
+        """Block until the data version differs from ``seen``, ``timeout`` passes
+        or the server drains; return the current version."""
+        with self._cond:
+            self._waiters += 1
+            # Forked workers inherit the flag but not the thread
+            if not self._running or self._pid != os.getpid():
+                self._running = True
+                self._pid = os.getpid()
+                threading.Thread(target=self._watch, name='dashboard-changes', daemon=True).start()
+            try:
+                self._cond.wait_for(
+                    lambda: (self._version is not None and self._version != seen) or draining.is_set(), timeout)
+            finally:
+                self._waiters -= 1
+            return self._version
+
+_notifiers: Dict[int, ChangeNotifier] = {}
+_notifiers_lock = threading.Lock()
+
+def change_notifier(board: 'OnboardingDashboard', poll_interval: float = 1.0) -> ChangeNotifier:
+    """The shared ChangeNotifier for ``board``."""
+    with _notifiers_lock:
+        notifier = _notifiers.get(id(board))
+        if notifier is None or notifier.board is not board:
+            notifier = _notifiers[id(board)] = ChangeNotifier(board, poll_interval)
+        return notifier
+
+def progress_events(board: OnboardingDashboard, since: str, poll_interval: float = 1.0,
+                    keepalive: float = 15.0, max_rows: int = MAX_PAGE_SIZE) -> Iterator[str]:
+    """Yield Server-Sent Events describing what changed after ``since``.
+    
+    ``since`` is a last_activity watermark (the latest activity now, when
+    empty); each ``progress`` event carries the rows that changed after it
+    plus fresh aggregates, and its event id is the new watermark so a
+    reconnecting browser resumes where it left off. When more than
+    ``max_rows`` rows changed, or someone was removed, a ``reload`` event
+    replaces the delta.
+    """
+    notifier = change_notifier(board, poll_interval)
+    if not since:
+        # A new subscriber already has the page it rendered; only later changes matter
+        since = board.get_content_version().last_activity or ''
+    return _progress_events(board, notifier, since, keepalive, max_rows)
+
+def _progress_events(board: OnboardingDashboard, notifier: ChangeNotifier, since: str,
+                     keepalive: float, max_rows: int) -> Iterator[str]:
+    # Sent at once so the response headers go out (and the browser's retry delay is set)
+    yield f'retry: {STREAM_RETRY_AFTER * 1000}\n\n'
+    last_version = None
+    known_total = None
+    # Ends when the server drains, so shutdown isn't held up by open streams
+    while not draining.is_set():
+        version = notifier.wait(last_version, keepalive)
+        if draining.is_set():
+            return
+        if version == last_version:
+            yield ': keepalive\n\n'
+            continue
+        analytics = board.get_analytics_snapshot()
+        rows = board.get_progress_changes(since, limit=max_rows + 1)
+        if (known_total is not None and analytics.total_employees < known_total) or len(rows) > max_rows:
+            # Deletions or a bulk change; a reload is simpler (and smaller) than the delta
+            yield 'event: reload\ndata: {}\n\n'
+            return
+        if rows or last_version is not None:
+            since = max([since] + [row['last_activity'] for row in rows if row['last_activity']])
+            payload = json.dumps({'rows': rows, 'analytics': analytics.to_dict()})
+            yield f'id: {since}\nevent: progress\ndata: {payload}\n\n'
+        last_version = version
+        known_total = analytics.total_employees
+
 dashboard = OnboardingDashboard()
+compressed_bodies = TTLCache(maxsize=64, ttl=300)
+
+def _not_modified(etag: str) -> bool:
+    """Whether the client's cached copy is current.
+    
+    Only the ETag is trusted: no single timestamp changes on deletes, quiz
+    attempts and the day rolling over, so there is no Last-Modified.
+    """
+    # A compressed body carries its encoding in the ETag; any of them is current
+    return any(request.if_none_match.contains(tag) for tag in (etag, f'{etag}-gzip', f'{etag}-br'))
+
+def json_endpoint(key: Tuple, build: Callable[[], Optional[str]], not_found: str = 'Not found'):
+    """Serve the JSON ``build`` returns with an ETag validator.
+    
+    Conditional requests for unchanged data get a 304 without building or
+    serializing anything; otherwise the serialized body is cached until the
+    data changes. ``build`` returns None for a missing resource.
+    """
+    content = dashboard.get_content_version()
+    # The date is part of the tag because some payloads cover "the last 30 days"
+    etag = content.etag(date.today().isoformat(), *key)
+    if _not_modified(etag):
+        response = Response(status=304)
+    else:
+        body = dashboard.cache.get(('json',) + key, build)
+        if body is None:
+            return jsonify({'error': not_found}), 404
+        response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.cache_control.no_cache = True
+    return response
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == 'br':
+        return brotli.compress(body, quality=5)
+    return gzip.compress(body, compresslevel=6, mtime=0)
+
+@app.before_request
+def require_schema():
+    """Make sure the database is migrated before any endpoint reads it."""
+    try:
+        dashboard.ensure_schema()
+    except sqlite3.Error as e:
+        app.logger.error(f"Migrating {dashboard.db_path} failed: {e}")
+        return jsonify({'status': 'unavailable',
+                        'error': f"database schema is out of date ({e}); "
+                                 f"run `python onboarding_store.py --migrate {dashboard.db_path}`"}), 503
+
+@app.after_request
+def compress_response(response: Response) -> Response:
+    """Gzip (or brotli, when installed and accepted) larger JSON responses."""
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype != 'application/json' or 'Content-Encoding' in response.headers):
+        return response
+    response.vary.add('Accept-Encoding')
+    body = response.get_data()
+    if len(body) < COMPRESS_MIN_BYTES:
+        return response
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        encoding = 'br'
+    elif accepted['gzip']:
+        encoding = 'gzip'
+    else:
+        return response
+    etag, _ = response.get_etag()
+    if etag:
+        cache_key = (etag, encoding)
+        compressed = compressed_bodies.get(cache_key)
+        if compressed is None:
+            compressed = _compress(body, encoding)
+            compressed_bodies.set(cache_key, compressed)
+        # Each encoding is a different representation, so it needs its own strong tag
+        response.set_etag(f'{etag}-{encoding}')
+    else:
+        compressed = _compress(body, encoding)
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+    return response
 
 @app.route('/')
 def index():
     """Main dashboard page."""
-    progress_data = dashboard.get_all_progress()
-    analytics = dashboard.get_analytics_data()
+    page = dashboard.get_progress_page(ProgressQuery())
+    analytics = dashboard.get_analytics_snapshot()
     
     return render_template('dashboard.html', 
-                         progress_data=progress_data,
-                         analytics=analytics)
+                         progress_data=page['items'],
+                         next_cursor=page['next_cursor'],
+                         analytics=analytics,
+                         stream_since=dashboard.get_content_version().last_activity or '')
+
+@app.route('/readyz')
+def readyz():
+    """Readiness probe: 200 while the database answers and we aren't shutting down."""
+    if draining.is_set():
+        return jsonify({'status': 'draining'}), 503
+    try:
+        with dashboard.pool.connection() as conn:
+            version = data_version(conn)
+    except sqlite3.Error as e:
+        return jsonify({'status': 'unavailable', 'error': str(e)}), 503
+    return jsonify({'status': 'ready', 'data_version': version, 'pid': os.getpid()})
+
+@app.route('/api/stream')
+def api_stream():
+    """Server-Sent Events stream of progress changes for the dashboard page."""
+    if not stream_slots.acquire(blocking=False):
+        return Response('Too many live dashboards are open; try again shortly.\n', status=503,
+                        mimetype='text/plain', headers={'Retry-After': str(STREAM_RETRY_AFTER)})
+    try:
+        since = request.headers.get('Last-Event-ID') or request.args.get('since', '')
+        poll_interval = float(os.getenv('DASHBOARD_STREAM_POLL', 1.0))
+        response = Response(
+            stream_with_context(progress_events(dashboard, since, poll_interval)),
+            mimetype='text/event-stream',
+            headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+        )
+    except BaseException:
+        stream_slots.release()
+        raise
+    response.call_on_close(stream_slots.release)
+    return response
 
 @app.route('/api/progress')
 def api_progress():
-    """API endpoint for progress data."""
-    return jsonify(dashboard.get_all_progress())
+    """API endpoint for a page of progress data.
+    
+    Query arguments: ``limit``, ``cursor`` (from ``next_cursor``), ``order``
+    (asc/desc by start date), ``step`` (current step), ``min_completion`` /
+    ``max_completion``, ``inactive_days`` and ``fields`` (comma-separated).
+    """
+    try:
+        query = ProgressQuery.from_args(request.args)
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+    return json_endpoint(('progress', query), lambda: app.json.dumps(dashboard.get_progress_page(query)))
 
 @app.route('/api/analytics')
 def api_analytics():
     """API endpoint for analytics data."""
-    return jsonify(dashboard.get_analytics_data())
+    return json_endpoint(('analytics',), lambda: app.json.dumps(dashboard.get_analytics_data()))
 
 @app.route('/api/employee/<employee_id>')
 def api_employee_details(employee_id):
     """API endpoint for employee details."""
-    employee_data = dashboard.get_employee_details(employee_id)
-    if employee_data:
-        return jsonify(employee_data)
-    return jsonify({'error': 'Employee not found'}), 404
+    def build() -> Optional[str]:
+        employee_data = dashboard.get_employee_details(employee_id)
+        return app.json.dumps(employee_data) if employee_data else None
+    
+    return json_endpoint(('employee', employee_id), build, not_found='Employee not found')
 
 @app.route('/employee/<employee_id>')
 def employee_details(employee_id):
@@ -194,60 +667,23 @@ def employee_details(employee_id):
 
 @app.route('/api/charts/completion_progress')
 def completion_progress_chart():
+    """Completion progress chart data."""
+    return json_endpoint(('chart', 'completion_progress'), build_completion_progress_chart)
+
+def build_completion_progress_chart() -> str:
     """Generate completion progress chart data."""
-    analytics = dashboard.get_analytics_data()
-    
-    steps = list(analytics['step_completion'].keys())
-    percentages = [analytics['step_completion'][step]['percentage'] for step in steps]
-    
-    fig = go.Figure(data=[
-        go.Bar(
-            x=steps,
-            y=percentages,
-            marker_color=['#FF6B9D', '#C44569', '#F8B500', '#6C5CE7', '#A29BFE', '#74B9FF', '#00CEC9', '#55A3FF'],
-            text=[f"{p:.1f}%" for p in percentages],
-            textposition='auto'
-        )
-    ])
-    
-    fig.update_layout(
-        title='Step Completion Rates',
-        xaxis_title='Onboarding Steps',
-        yaxis_title='Completion Percentage',
-        template='plotly_white',
-        height=400
-    )
-    
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return json.dumps(charts.completion_progress_figure(dashboard.get_analytics_snapshot()))
 
 @app.route('/api/charts/daily_starts')
 def daily_starts_chart():
+    """Daily starts chart data."""
+    return json_endpoint(('chart', 'daily_starts'), build_daily_starts_chart)
+
+def build_daily_starts_chart() -> str:
     """Generate daily starts chart data."""
-    analytics = dashboard.get_analytics_data()
-    
-    dates = [item[0] for item in analytics['daily_starts']]
-    counts = [item[1] for item in analytics['daily_starts']]
-    
-    fig = go.Figure(data=[
-        go.Scatter(
-            x=dates,
-            y=counts,
-            mode='lines+markers',
-            line=dict(color='#6C5CE7', width=3),
-            marker=dict(size=8, color='#A29BFE')
-        )
-    ])
-    
-    fig.update_layout(
-        title='Daily Onboarding Starts (Last 30 Days)',
-        xaxis_title='Date',
-        yaxis_title='New Employees',
-        template='plotly_white',
-        height=300
-    )
-    
-    return json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder)
+    return json.dumps(charts.daily_starts_figure(dashboard.get_analytics_snapshot()))
 
 if __name__ == '__main__':
+    dashboard.ensure_schema()
     port = int(os.getenv('DASHBOARD_PORT', 5000))
     app.run(debug=True, host='0.0.0.0', port=port)
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+Production server for the Katbus Onboarding Dashboard
+
+Serves the dashboard's Flask app on Werkzeug's WSGI server, either as one
+process with a fixed-size thread pool or as several pre-forked worker
+processes sharing one listening socket (each with its own thread pool and
+its own read-only database connections). Templates and the chart layout are
+loaded once, before any worker starts.
+
+Signals (sent to the main process):
+    SIGTERM / SIGINT  stop accepting, finish in-flight requests, exit
+    SIGHUP            start a fresh set of workers, then retire the old ones
+                      (process mode; code changes still need a full restart)
+
+``python dashboard.py`` remains the single-threaded development server.
+"""
+
+import argparse
+import logging
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Set
+
+from werkzeug.serving import BaseWSGIServer
+
+import charts
+import dashboard
+
+logger = logging.getLogger(__name__)
+
+WORKER_CLASSES = ('process', 'thread')
+
+# Start of the request line for the dashboard's live-update stream
+STREAM_REQUEST = b'GET /api/stream'
+
+
+class PooledWSGIServer(BaseWSGIServer):
+    """Werkzeug's WSGI server with requests handled on a bounded thread pool.
+
+    Live-update streams stay open as long as a dashboard does, so they get a
+    thread of their own instead of a pool thread (the app caps how many).
+    """
+
+    multithread = True
+    # How long to wait for a new connection's request line before treating it as an ordinary request
+    peek_timeout = 5.0
+
+    def __init__(self, host: str, port: int, app, threads: int = 16, **kwargs):
+        super().__init__(host, port, app, **kwargs)
+        self.threads = threads
+        # Created per process by serve_forever(), so forked workers get their own
+        self.executor: Optional[ThreadPoolExecutor] = None
+        self._stopping = threading.Event()
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self.executor = ThreadPoolExecutor(max_workers=self.threads, thread_name_prefix='dashboard')
+        super().serve_forever(poll_interval)
+
+    def process_request(self, request, client_address):
+        self.executor.submit(self._process_request_thread, request, client_address)
+
+    def _process_request_thread(self, request, client_address):
+        if self._is_stream(request):
+            threading.Thread(target=self._handle_request, args=(request, client_address),
+                             name='dashboard-stream', daemon=True).start()
+            return
+        self._handle_request(request, client_address)
+
+    def _is_stream(self, request) -> bool:
+        """Whether the connection asks for the live stream (peeked, so nothing is consumed)."""
+        timeout = request.gettimeout()
+        try:
+            request.settimeout(self.peek_timeout)
+            return request.recv(len(STREAM_REQUEST), socket.MSG_PEEK) == STREAM_REQUEST
+        except OSError:
+            return False
+        finally:
+            request.settimeout(timeout)
+
+    def _handle_request(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def begin_shutdown(self):
+        """Stop accepting connections; safe to call from a signal handler, more than once."""
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        dashboard.draining.set()
+        # shutdown() blocks until serve_forever() returns, so it can't run on that thread
+        threading.Thread(target=self.shutdown, daemon=True).start()
+
+    def drain(self, timeout: float) -> bool:
+        """Wait up to ``timeout`` seconds for in-flight requests; True if they all finished."""
+        if self.executor is None:
+            return True
+        waiter = threading.Thread(target=self.executor.shutdown, daemon=True)
+        waiter.start()
+        waiter.join(timeout)
+        return not waiter.is_alive()
+
+
+def preload():
+    """Migrate the database, compile every template and build the chart layout before serving."""
+    try:
+        dashboard.dashboard.ensure_schema()
+    except sqlite3.Error as e:
+        logger.error(f"Migrating {dashboard.dashboard.db_path} failed: {e}; requests will answer 503")
+    env = dashboard.app.jinja_env
+    for name in env.list_templates():
+        env.get_template(name)
+    try:
+        charts.layout_template()
+    except ImportError:
+        logger.warning("plotly is not installed; chart endpoints will fail")
+
+
+def _run(server: PooledWSGIServer, graceful_timeout: float):
+    """Serve until SIGTERM/SIGINT, then drain."""
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, lambda *_: server.begin_shutdown())
+    server.serve_forever()
+    if not server.drain(graceful_timeout):
+        logger.warning(f"Requests still running after {graceful_timeout}s; exiting anyway")
+
+
+def serve_threads(server: PooledWSGIServer, graceful_timeout: float):
+    """Serve from this process on the server's thread pool."""
+    logger.info(f"Serving on {server.host}:{server.port} with {server.threads} threads (pid {os.getpid()})")
+    _run(server, graceful_timeout)
+
+
+def serve_processes(server: PooledWSGIServer, workers: int, graceful_timeout: float):
+    """Fork ``workers`` processes that accept from the server's socket, and supervise them.
+
+    Workers that die unexpectedly are replaced. The main process never
+    touches the database, so nothing connection-related is inherited.
+    """
+    server.multiprocess = True
+    # Every worker wakes up for each new connection; only one wins the accept(),
+    # and the rest must get EAGAIN rather than block (and miss shutdown)
+    server.socket.setblocking(False)
+    children: Set[int] = set()
+    retired: Set[int] = set()
+    stop = threading.Event()
+    reload = threading.Event()
+
+    def spawn():
+        pid = os.fork()
+        if pid == 0:
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            code = 0
+            try:
+                _run(server, graceful_timeout)
+            except BaseException:
+                logger.exception("Dashboard worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        children.add(pid)
+
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    signal.signal(signal.SIGHUP, lambda *_: reload.set())
+
+    logger.info(f"Serving on {server.host}:{server.port} with {workers} workers "
+                f"x {server.threads} threads (main pid {os.getpid()})")
+    for _ in range(workers):
+        spawn()
+
+    stopping = False
+    while children:
+        if stop.is_set() and not stopping:
+            stopping = True
+            for pid in children:
+                os.kill(pid, signal.SIGTERM)
+        if reload.is_set() and not stopping:
+            reload.clear()
+            # New workers start accepting before the old ones stop, so nothing is refused
+            old = set(children)
+            for _ in range(workers):
+                spawn()
+            for pid in old:
+                retired.add(pid)
+                os.kill(pid, signal.SIGTERM)
+            logger.info(f"Reloaded {workers} workers")
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if not pid:
+            time.sleep(0.1)
+            continue
+        children.discard(pid)
+        if pid in retired:
+            retired.discard(pid)
+        elif not stopping:
+            logger.warning(f"Worker {pid} exited unexpectedly (status {status}); starting a new one")
+            spawn()
+    server.server_close()
+
+
+def serve(host: str, port: int, workers: int, worker_class: str = 'process',
+          threads: int = 16, graceful_timeout: float = 30.0):
+    """Bind ``host:port`` and serve the dashboard until told to stop."""
+    if worker_class == 'process' and not hasattr(os, 'fork'):
+        logger.warning("Process workers need os.fork(); using threads instead")
+        worker_class = 'thread'
+    preload()
+    server = PooledWSGIServer(host, port, dashboard.app, threads=threads)
+    if worker_class == 'thread':
+        serve_threads(server, graceful_timeout)
+    else:
+        serve_processes(server, workers, graceful_timeout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the onboarding dashboard in production.")
+    parser.add_argument('--host', default=os.getenv('DASHBOARD_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=int(os.getenv('DASHBOARD_PORT', 5000)))
+    parser.add_argument('--workers', type=int, default=int(os.getenv('DASHBOARD_WORKERS', os.cpu_count() or 1)),
+                        help="worker processes (process mode)")
+    parser.add_argument('--worker-class', choices=WORKER_CLASSES,
+                        default=os.getenv('DASHBOARD_WORKER_CLASS', 'process'))
+    parser.add_argument('--threads', type=int, default=int(os.getenv('DASHBOARD_THREADS', 16)),
+                        help="request threads per worker")
+    parser.add_argument('--graceful-timeout', type=float,
+                        default=float(os.getenv('DASHBOARD_GRACEFUL_TIMEOUT', 30)),
+                        help="seconds to let in-flight requests finish on shutdown")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(process)d %(levelname)s %(message)s')
+    serve(args.host, args.port, args.workers, args.worker_class, args.threads, args.graceful_timeout)
+
+
+if __name__ == '__main__':
+    main()
@@ -94,15 +94,9 @@ def clear_demo_data():
     """Clear all demo employee records"""
     db = OnboardingDatabase()
     
-    import sqlite3
-    conn = sqlite3.connect(db.db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("DELETE FROM onboarding_progress WHERE slack_user_id LIKE 'U00%'")
-    cursor.execute("DELETE FROM quiz_attempts WHERE employee_id LIKE 'U00%'")
-    
-    conn.commit()
-    conn.close()
+    with db.pool.transaction() as conn:
+        conn.execute("DELETE FROM onboarding_progress WHERE slack_user_id LIKE 'U00%'")
+        conn.execute("DELETE FROM quiz_attempts WHERE employee_id LIKE 'emp_U00%'")
     
     print("🧹 Demo data cleared!")
 
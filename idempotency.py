@@ -0,0 +1,154 @@
+#!/usr/bin/env python3
+"""
+Duplicate delivery detection for the Slack bot.
+
+Slack redelivers a command, action or event when it doesn't see an ack in
+time (HTTP requests then carry ``X-Slack-Retry-Num``). Each delivery has an
+identity that stays the same across redeliveries: ``event_id`` for events,
+the clicked action's ``action_ts`` for block actions and the ``trigger_id``
+for commands. The bot claims that identity before doing any work and drops
+deliveries whose identity was already claimed.
+
+A double-click is two deliveries with their own ``action_ts``, so it is
+caught separately: a click on the same ``(user, action_id, value)`` within
+``click_window`` seconds of the last one is dropped too. Click claims are
+only kept in memory.
+
+Claims are kept in a bounded LRU with a TTL. With a SQLite path they are
+also written to a ``slack_deliveries`` table, which still catches duplicates
+after the LRU has evicted a key, after a restart, or when another bot
+process got the first delivery. The ack waits at most ``db_timeout`` for that
+write; a slower one finishes in the background and the delivery goes ahead.
+"""
+
+import concurrent.futures
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from onboarding_store import get_pool
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Drop claims older than the TTL every this many SQLite claims
+PURGE_EVERY = 1000
+
+_CREATE_TABLE_SQL = '''
+    CREATE TABLE IF NOT EXISTS slack_deliveries (
+        key TEXT PRIMARY KEY,
+        seen_at REAL NOT NULL
+    ) WITHOUT ROWID
+'''
+
+
+def delivery_key(body: Dict) -> Optional[str]:
+    """The identity Slack keeps across redeliveries of ``body``; None if it has none."""
+    if body.get('event_id'):
+        return f"event:{body['event_id']}"
+    actions = body.get('actions') or []
+    if actions and actions[0].get('action_ts'):
+        user_id = (body.get('user') or {}).get('id')
+        return f"action:{user_id}:{actions[0].get('action_id')}:{actions[0]['action_ts']}"
+    if body.get('trigger_id'):
+        return f"trigger:{body['trigger_id']}"
+    return None
+
+
+def click_key(body: Dict) -> Optional[str]:
+    """What a user clicked in ``body``, the same for every click on that button; None if not a click."""
+    actions = body.get('actions') or []
+    if body.get('type') != 'block_actions' or not actions:
+        return None
+    user_id = (body.get('user') or {}).get('id')
+    return f"click:{user_id}:{actions[0].get('action_id')}:{actions[0].get('value')}"
+
+
+class DeliveryDeduplicator:
+    """Remembers which deliveries have been claimed, for ``ttl`` seconds."""
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 900.0, db_path: Optional[str] = None,
+                 db_timeout: float = 0.05, click_window: float = 2.0):
+        self.ttl = ttl
+        self.db_timeout = db_timeout
+        self.recent = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.recent_clicks = TTLCache(maxsize=maxsize, ttl=click_window)
+        self._lock = threading.Lock()
+        self.pool = None
+        if db_path:
+            self.pool = get_pool(db_path)
+            self.pool.run_in_transaction(lambda conn: conn.execute(_CREATE_TABLE_SQL))
+        self.claims = 0
+        self.duplicates = 0
+        self.retries = 0
+        self.db_timeouts = 0
+        self.double_clicks = 0
+        self._db_claims = 0
+
+    def claim(self, key: str, retry: bool = False) -> bool:
+        """True the first time ``key`` is seen, False for every duplicate.
+
+        ``retry`` marks a delivery Slack labelled as a redelivery; it only
+        feeds the counters. When the SQLite claim doesn't commit within
+        ``db_timeout`` (or fails), the delivery is let through.
+        """
+        with self._lock:
+            if retry:
+                self.retries += 1
+            if self.recent.get(key) is not None:
+                self.duplicates += 1
+                return False
+            self.recent.set(key, True)
+            self.claims += 1
+        if self.pool is not None and not self._claim_in_db(key):
+            with self._lock:
+                self.duplicates += 1
+            return False
+        return True
+
+    def claim_click(self, key: str) -> bool:
+        """False when the same button was clicked within ``click_window`` seconds."""
+        with self._lock:
+            if self.recent_clicks.get(key) is not None:
+                self.double_clicks += 1
+                return False
+            self.recent_clicks.set(key, True)
+            return True
+
+    def _claim_in_db(self, key: str) -> bool:
+        now = time.time()
+        with self._lock:
+            self._db_claims += 1
+            purge = self._db_claims % PURGE_EVERY == 0
+
+        def insert(conn):
+            if purge:
+                conn.execute('DELETE FROM slack_deliveries WHERE seen_at < ?', (now - self.ttl,))
+            else:
+                conn.execute('DELETE FROM slack_deliveries WHERE key = ? AND seen_at < ?', (key, now - self.ttl))
+            cursor = conn.execute('INSERT OR IGNORE INTO slack_deliveries (key, seen_at) VALUES (?, ?)', (key, now))
+            return cursor.rowcount == 1
+        try:
+            return self.pool.writer.submit(insert).result(timeout=self.db_timeout)
+        except concurrent.futures.TimeoutError:
+            # Still written once the writer gets to it, for later duplicates
+            with self._lock:
+                self.db_timeouts += 1
+            return True
+        except sqlite3.Error as e:
+            logger.warning(f"Recording delivery {key} failed: {e}")
+            return True
+
+    def stats(self) -> dict:
+        """Claims, dropped duplicates and double clicks, and deliveries Slack marked as retries."""
+        with self._lock:
+            return {
+                'claims': self.claims,
+                'duplicates': self.duplicates,
+                'retries': self.retries,
+                'db_timeouts': self.db_timeouts,
+                'double_clicks': self.double_clicks,
+                'cached': len(self.recent),
+            }
@@ -1,7 +1,15 @@
+import queue
+import threading
 import tkinter as tk
 from tkinter import ttk, scrolledtext
 from tkinter import font as tkfont
 
+from story_templates import DEFAULT_TEMPLATE_ID, chunk_spans, get_library
+
+# How often the story window checks for new text, and how much it adds at a time
+RENDER_POLL_MS = 15
+STORY_CHUNK_CHARS = 4000
+
 class KATLibsGUI:
     def __init__(self, root):
         self.root = root
@@ -54,6 +62,31 @@ class KATLibsGUI:
         )
         self.subtitle_label.pack(pady=10)
 
+        # Story picker, listed from the template index
+        self.library = get_library()
+        self.template_entries = self.library.entries()
+        self.template_id = DEFAULT_TEMPLATE_ID
+        self.picker_frame = tk.Frame(self.main_frame, bg=self.colors['bg'])
+        self.picker_frame.pack()
+        tk.Label(
+            self.picker_frame,
+            text="Pick a story:",
+            font=self.label_font,
+            bg=self.colors['bg'],
+            fg=self.colors['label']
+        ).pack(side=tk.LEFT, padx=10)
+        self.template_picker = ttk.Combobox(
+            self.picker_frame,
+            values=[entry.title for entry in self.template_entries],
+            state="readonly",
+            width=40
+        )
+        self.template_picker.current(
+            [entry.id for entry in self.template_entries].index(self.template_id)
+        )
+        self.template_picker.bind("<<ComboboxSelected>>", self.select_template)
+        self.template_picker.pack(side=tk.LEFT)
+
         # Input frame with pink background
         self.input_frame = tk.Frame(self.main_frame, bg=self.colors['bg'])
         self.input_frame.pack(pady=20)
@@ -73,8 +106,8 @@ class KATLibsGUI:
             ("idol_name", "A KATSEYE member's name:"),
             ("emoji", "Your favorite emoji:")
         ]
-        for idx, (field, label) in enumerate(self.input_fields):
-            self.create_input_field(field, label, idx)
+        self.field_widgets = {}
+        self.show_fields(self.library.entry(self.template_id).slots)
 
         # Create story button, vertically centered next to input fields
         self.create_button = tk.Button(
@@ -89,7 +122,40 @@ class KATLibsGUI:
             pady=10,
             cursor="heart"
         )
-        self.create_button.grid(row=0, column=2, rowspan=len(self.input_fields), padx=(30,0), pady=5, sticky="nsw")
+        self.create_button.grid(row=0, column=2, rowspan=len(self.entries), padx=(30,0), pady=5, sticky="nsw")
+
+        # Background story rendering state
+        self.render_queue = queue.Queue()
+        self.render_generation = 0
+        self.render_after_id = None
+        self.story_window = None
+        self.story_text = None
+
+    def select_template(self, event=None):
+        """Switch to the story picked in the template picker."""
+        entry = self.template_entries[self.template_picker.current()]
+        self.template_id = entry.id
+        self.show_fields(entry.slots)
+        self.create_button.grid_configure(rowspan=len(self.entries))
+
+    def show_fields(self, slots):
+        """Show one input field per word in the story, hiding the rest."""
+        labels = dict(self.input_fields)
+        fields = [field for field in labels if field in slots]
+        fields += [field for field in slots if field not in labels]
+        for widgets in self.field_widgets.values():
+            for widget in widgets:
+                widget.grid_remove()
+        self.entries = {}
+        for idx, field in enumerate(fields):
+            if field in self.field_widgets:
+                label, entry = self.field_widgets[field]
+                label.grid(row=idx)
+                entry.grid(row=idx)
+                self.entries[field] = entry
+            else:
+                label_text = labels.get(field, f"A {field.replace('_', ' ')}:")
+                self.create_input_field(field, label_text, idx)
 
     def create_input_field(self, field_name, label_text, row):
         label = tk.Label(
@@ -113,33 +179,17 @@ class KATLibsGUI:
         )
         entry.grid(row=row, column=1, padx=10, pady=5, sticky="w")
         self.entries[field_name] = entry
+        self.field_widgets[field_name] = (label, entry)
 
     def create_story(self):
         # Get all input values
         inputs = {field: entry.get() for field, entry in self.entries.items()}
-        
-        # Create the story using the madlibs module
-        story = f"""
-🎒 Chapter 1: Arrival in {inputs['city']}
 
-{inputs['name1']} and {inputs['name2']} landed in {inputs['city']} with their bags stuffed full of {inputs['kpop_merch']}s, extra phone chargers, and emergency {inputs['snack']} packs. They were feeling super {inputs['adjective1']}, because tonight was the big KATSEYE concert at the magical GlowBop Arena. The entire airport was buzzing with fans holding banners that said, "WE LOVE YOU, {inputs['idol_name'].upper()}!"
+        # Clicking again cancels a story that is still being written
+        self.cancel_story()
+        self.render_generation += 1
+        generation = self.render_generation
 
-They got lost trying to find their hotel and accidentally walked into a store that only sold robotic alpacas. One of the alpacas made a loud {inputs['embarrassing_sound']} and scared {inputs['name2']} so badly she dropped her {inputs['weird_object']} in a fountain. A security guard offered them directions... but only if they could do the {inputs['dance_move']} perfectly.
-
-🕺 Chapter 2: The Concert Mayhem
-
-At the arena, a mysterious glitter cannon exploded near their seats and showered the crowd with confetti shaped like {inputs['emoji']}. {inputs['name1']} screamed so loud, even {inputs['idol_name']} looked confused for a second. During the encore, the music stopped and the stage lights turned off. A voice over the speakers said, "We need two brave fans to save the show!"
-
-Without thinking, {inputs['name2']} leapt onto the stage, armed with her {inputs['kpop_merch']} and {inputs['name1']} behind her. The crowd chanted their names, and someone handed them microphones made of cotton candy.
-
-💫 Chapter 3: Legends of the Night
-
-They performed a chaotic freestyle that included the {inputs['dance_move']}, moonwalking with a {inputs['snack']} in each hand, and dramatic slow-motion karaoke. Somehow, it worked. The stage lights came back on, {inputs['idol_name']} hugged them both, and confetti exploded in every direction.
-
-As they walked back to their hotel—now minor celebrities—they looked at each other and said, "This was the most {inputs['adjective1']} day of our lives." And in that exact moment, a fan ran up to them and whispered, "Are you the girls from the glitter cannon incident?"
-
-Legendary. {inputs['emoji']}
-"""
         # Open a new window for the story
         story_win = tk.Toplevel(self.root)
         story_win.title("Your K-pop Katlib Story!")
@@ -154,31 +204,64 @@ Legendary. {inputs['emoji']}
             height=25
         )
         text_widget.pack(padx=20, pady=20, fill=tk.BOTH, expand=True)
-        # Insert story and highlight user words
-        start = 0
-        for key, value in inputs.items():
-            if value:
-                # Replace all occurrences with a unique marker
-                story = story.replace(value, f"[[[{key}]]]")
-        # Insert story and tag user words
-        idx = 0
-        while idx < len(story):
-            if story[idx:idx+3] == "[[[":
-                end_idx = story.find("]]]", idx)
-                if end_idx != -1:
-                    key = story[idx+3:end_idx]
-                    value = inputs.get(key, "")
-                    if value:
-                        text_widget.insert(tk.END, value, ("userword",))
-                    idx = end_idx + 3
-                else:
-                    text_widget.insert(tk.END, story[idx], ())
-                    idx += 1
-            else:
-                text_widget.insert(tk.END, story[idx], ())
-                idx += 1
         text_widget.tag_configure("userword", foreground="#C800A1", font=("Helvetica", 12, "bold"))
-        text_widget.config(state=tk.DISABLED)
+        self.story_window = story_win
+        self.story_text = text_widget
+
+        # Render in the background; _poll_story fills the window as chunks arrive
+        worker = threading.Thread(
+            target=self._render_story_worker,
+            args=(generation, self.template_id, inputs),
+            daemon=True
+        )
+        worker.start()
+        self.render_after_id = self.root.after(RENDER_POLL_MS, self._poll_story)
+
+    def cancel_story(self):
+        """Stop filling a story window that hasn't finished yet."""
+        if self.render_after_id is not None:
+            self.root.after_cancel(self.render_after_id)
+            self.render_after_id = None
+            if self.story_window is not None and self.story_window.winfo_exists():
+                self.story_window.destroy()
+        self.render_generation += 1
+        self.story_window = None
+        self.story_text = None
+
+    def _render_story_worker(self, generation, template_id, inputs):
+        """Compute the story spans off the Tk main loop."""
+        try:
+            spans = self.library.get(template_id).spans(inputs)
+        except Exception as e:
+            spans = [(f"Oops! This story couldn't be made: {e}", ())]
+        for chunk in chunk_spans(spans, STORY_CHUNK_CHARS):
+            if generation != self.render_generation:
+                return
+            self.render_queue.put((generation, chunk))
+        self.render_queue.put((generation, None))
+
+    def _poll_story(self):
+        """Insert the next chunk of story text, then check back shortly."""
+        self.render_after_id = None
+        while True:
+            try:
+                generation, chunk = self.render_queue.get_nowait()
+            except queue.Empty:
+                break
+            if generation != self.render_generation:
+                continue
+            if not self.story_text.winfo_exists():
+                self.cancel_story()
+                return
+            if chunk is None:
+                self.story_text.config(state=tk.DISABLED)
+                self.story_window = None
+                self.story_text = None
+                return
+            # Each span carries its own tags, so a chunk is one insert call
+            self.story_text.insert(tk.END, *(item for span in chunk for item in span))
+            break
+        self.render_after_id = self.root.after(RENDER_POLL_MS, self._poll_story)
 
 def main():
     root = tk.Tk()
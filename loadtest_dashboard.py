@@ -0,0 +1,185 @@
+#!/usr/bin/env python3
+"""
+Load test for the Katbus Onboarding Dashboard
+
+Starts dashboard_server.py with each requested worker count in turn, hammers
+a few endpoints from concurrent client threads, and prints requests per
+second and latency percentiles for each run:
+
+    python loadtest_dashboard.py --workers 1 2 4 --duration 10
+    python loadtest_dashboard.py --url http://localhost:5000   # an already-running server
+    python loadtest_dashboard.py --streams 50                  # with 50 live streams held open
+
+Run ``python demo_data.py`` first so there is something to serve.
+"""
+
+import argparse
+import http.client
+import os
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+DEFAULT_PATHS = ['/api/analytics', '/api/progress', '/api/charts/completion_progress', '/']
+
+
+def wait_until_ready(host: str, port: int, timeout: float = 30.0):
+    """Poll /readyz until the server answers 200."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=1)
+            conn.request('GET', '/readyz')
+            if conn.getresponse().status == 200:
+                return
+        except OSError:
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Dashboard on {host}:{port} wasn't ready after {timeout}s")
+
+
+def run_load(host: str, port: int, paths: List[str], concurrency: int, duration: float) -> Dict:
+    """Request ``paths`` round-robin from ``concurrency`` threads for ``duration`` seconds."""
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    stop_at = time.monotonic() + duration
+
+    def client(offset: int):
+        mine, failed, i = [], 0, offset
+        while time.monotonic() < stop_at:
+            path = paths[i % len(paths)]
+            i += 1
+            started = time.perf_counter()
+            try:
+                conn = http.client.HTTPConnection(host, port, timeout=10)
+                conn.request('GET', path, headers={'Accept-Encoding': 'gzip'})
+                response = conn.getresponse()
+                response.read()
+                conn.close()
+                if response.status >= 400:
+                    failed += 1
+                    continue
+            except OSError:
+                failed += 1
+                continue
+            mine.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(mine)
+            errors[0] += failed
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies.sort()
+    def percentile(p: float) -> float:
+        return latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000 if latencies else 0.0
+    return {
+        'requests': len(latencies),
+        'errors': errors[0],
+        'rps': len(latencies) / duration,
+        'p50_ms': percentile(0.50),
+        'p99_ms': percentile(0.99),
+    }
+
+
+def open_streams(host: str, port: int, count: int) -> Tuple[List[http.client.HTTPResponse], int]:
+    """Open ``count`` /api/stream connections and keep them open; returns them and how many were refused."""
+    streams, refused = [], 0
+    for _ in range(count):
+        conn = http.client.HTTPConnection(host, port, timeout=10)
+        try:
+            conn.request('GET', '/api/stream', headers={'Accept': 'text/event-stream'})
+            response = conn.getresponse()
+        except OSError:
+            refused += 1
+            conn.close()
+            continue
+        if response.status == 200:
+            # The response owns the socket once the server says it will close it
+            streams.append(response)
+        else:
+            refused += 1
+            response.read()
+            conn.close()
+    return streams, refused
+
+
+def close_streams(streams: List[http.client.HTTPResponse]):
+    for response in streams:
+        response.close()
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(workers: int, worker_class: str, threads: int) -> Tuple[subprocess.Popen, int]:
+    """Start dashboard_server.py on a free local port."""
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'dashboard_server.py'),
+         '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+         '--worker-class', worker_class, '--threads', str(threads)],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    return server, port
+
+
+def print_result(label: str, result: Dict):
+    print(f"{label:>12}  {result['rps']:9.1f} req/s  p50 {result['p50_ms']:7.2f} ms  "
+          f"p99 {result['p99_ms']:7.2f} ms  ({result['requests']} ok, {result['errors']} errors)")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Measure dashboard throughput at different worker counts.")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--worker-class', choices=('process', 'thread'), default='process')
+    parser.add_argument('--threads', type=int, default=16, help="request threads per worker")
+    parser.add_argument('--concurrency', type=int, default=32, help="concurrent client threads")
+    parser.add_argument('--duration', type=float, default=10.0, help="seconds per run")
+    parser.add_argument('--path', action='append', dest='paths', help="endpoint to request (repeatable)")
+    parser.add_argument('--url', help="load test this running server instead of starting one")
+    parser.add_argument('--streams', type=int, default=0, help="live /api/stream connections to hold open while measuring")
+    args = parser.parse_args(argv)
+    paths = args.paths or DEFAULT_PATHS
+
+    print(f"🔨 {args.concurrency} clients, {args.streams} open streams, {args.duration:.0f}s per run, "
+          f"paths: {', '.join(paths)}\n")
+
+    def measure(label: str, host: str, port: int):
+        wait_until_ready(host, port)
+        streams, refused = open_streams(host, port, args.streams)
+        try:
+            if args.streams:
+                print(f"{'':>12}  {len(streams)} streams open, {refused} refused")
+            print_result(label, run_load(host, port, paths, args.concurrency, args.duration))
+        finally:
+            close_streams(streams)
+
+    if args.url:
+        target = urlsplit(args.url)
+        measure(target.netloc, target.hostname, target.port or 80)
+        return
+
+    for workers in args.workers:
+        server, port = start_server(workers, args.worker_class, args.threads)
+        try:
+            measure(f"{workers} x {args.worker_class}", '127.0.0.1', port)
+        finally:
+            server.send_signal(signal.SIGTERM)
+            server.wait(timeout=60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,680 @@
+#!/usr/bin/env python3
+"""
+Katbus Onboarding Storage
+
+Shared SQLite access for the Slack bot, the dashboard and the demo data
+scripts. Connections are pooled so handlers reuse an open connection (and its
+prepared statement cache) instead of connecting and tearing down per call.
+
+The bot and the dashboard open the same database from separate processes, so
+every connection runs in WAL mode (readers never block the writer), write
+transactions start with ``BEGIN IMMEDIATE`` and are retried when the database
+is busy, and step updates are grouped into short batched transactions.
+"""
+
+import logging
+import os
+import queue
+import random
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar('T')
+
+
+@dataclass
+class StorageConfig:
+    """SQLite settings applied to every pooled connection."""
+    journal_mode: str = 'WAL'
+    synchronous: str = 'NORMAL'
+    busy_timeout_ms: int = 5000
+    cache_size_kb: int = 16384
+    mmap_size: int = 64 * 1024 * 1024
+    retry_attempts: int = 5
+    retry_base_delay: float = 0.02
+
+    @classmethod
+    def from_env(cls) -> 'StorageConfig':
+        """Build a config from ONBOARDING_DB_* environment variables."""
+        defaults = cls()
+        return cls(
+            journal_mode=os.getenv('ONBOARDING_DB_JOURNAL_MODE', defaults.journal_mode),
+            synchronous=os.getenv('ONBOARDING_DB_SYNCHRONOUS', defaults.synchronous),
+            busy_timeout_ms=int(os.getenv('ONBOARDING_DB_BUSY_TIMEOUT_MS', defaults.busy_timeout_ms)),
+            cache_size_kb=int(os.getenv('ONBOARDING_DB_CACHE_SIZE_KB', defaults.cache_size_kb)),
+            mmap_size=int(os.getenv('ONBOARDING_DB_MMAP_SIZE', defaults.mmap_size)),
+            retry_attempts=int(os.getenv('ONBOARDING_DB_RETRY_ATTEMPTS', defaults.retry_attempts)),
+        )
+
+    def apply(self, conn: sqlite3.Connection):
+        """Set this config's pragmas on ``conn``."""
+        conn.execute(f'PRAGMA busy_timeout = {int(self.busy_timeout_ms)}')
+        conn.execute(f'PRAGMA journal_mode = {self.journal_mode}')
+        conn.execute(f'PRAGMA synchronous = {self.synchronous}')
+        conn.execute(f'PRAGMA cache_size = {-int(self.cache_size_kb)}')
+        conn.execute(f'PRAGMA mmap_size = {int(self.mmap_size)}')
+
+
+def is_busy_error(error: Exception) -> bool:
+    """Whether ``error`` is SQLite reporting a locked or busy database."""
+    message = str(error).lower()
+    return isinstance(error, sqlite3.OperationalError) and ('locked' in message or 'busy' in message)
+
+
+def retry_on_busy(func: Callable[[], T], attempts: int = 5, base_delay: float = 0.02) -> T:
+    """Call ``func``, retrying with jittered backoff while the database is busy."""
+    for attempt in range(attempts):
+        try:
+            return func()
+        except sqlite3.OperationalError as e:
+            if not is_busy_error(e) or attempt == attempts - 1:
+                raise
+            delay = base_delay * (2 ** attempt)
+            logger.warning(f"Database busy, retrying in {delay:.3f}s: {e}")
+            time.sleep(delay * random.uniform(0.5, 1.5))
+
+
+@dataclass(frozen=True)
+class StepDefinition:
+    """One onboarding step and what counts as complete.
+
+    ``key`` is the name the step's value is reported under in progress rows
+    (e.g. ``progress['step_3_history_quiz']``).
+    """
+    step: int
+    key: str
+    name: str
+    required_score: int = 1
+    total_questions: Optional[int] = None
+
+    @property
+    def is_quiz(self) -> bool:
+        return self.total_questions is not None
+
+
+# Adding a step only needs a new entry here: it is seeded into the
+# onboarding_steps table and step values live in step_events.
+STEP_DEFINITIONS: Tuple[StepDefinition, ...] = (
+    StepDefinition(1, 'step_1_github', 'GitHub Account'),
+    StepDefinition(2, 'step_2_environment', 'Dev Environment'),
+    StepDefinition(3, 'step_3_history_quiz', 'History Quiz', required_score=3, total_questions=4),
+    StepDefinition(4, 'step_4_product_quiz', 'Product Quiz', required_score=2, total_questions=3),
+    StepDefinition(5, 'step_5_team_integration', 'Team Integration'),
+    StepDefinition(6, 'step_6_technical_setup', 'Technical Setup'),
+    StepDefinition(7, 'step_7_app_testing', 'App Testing'),
+    StepDefinition(8, 'step_8_first_contribution', 'First Contribution'),
+)
+STEPS_BY_NUMBER: Dict[int, StepDefinition] = {step.step: step for step in STEP_DEFINITIONS}
+
+SCHEMA_VERSION = 4
+
+_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS onboarding_progress (
+        employee_id TEXT PRIMARY KEY,
+        slack_user_id TEXT UNIQUE,
+        employee_name TEXT,
+        start_date TIMESTAMP,
+        current_step INTEGER DEFAULT 1,
+        completion_percentage DECIMAL(5,2) DEFAULT 0.00,
+        completed_date TIMESTAMP NULL,
+        last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS quiz_attempts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        employee_id TEXT,
+        quiz_type TEXT,
+        score INTEGER,
+        total_questions INTEGER,
+        attempt_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        answered INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (employee_id) REFERENCES onboarding_progress (employee_id)
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS onboarding_steps (
+        step INTEGER PRIMARY KEY,
+        key TEXT UNIQUE NOT NULL,
+        name TEXT NOT NULL,
+        required_score INTEGER NOT NULL DEFAULT 1,
+        total_questions INTEGER
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS step_events (
+        employee_id TEXT NOT NULL,
+        step INTEGER NOT NULL,
+        value INTEGER NOT NULL DEFAULT 0,
+        ts TIMESTAMP NOT NULL,
+        PRIMARY KEY (employee_id, step)
+    ) WITHOUT ROWID
+    ''',
+    # Per-step aggregation ("how many reached the pass score") reads only this index
+    'CREATE INDEX IF NOT EXISTS idx_step_events_step_value ON step_events (step, value)',
+    # An employee's quiz history, newest first
+    'CREATE INDEX IF NOT EXISTS idx_quiz_attempts_employee ON quiz_attempts (employee_id, attempt_date)',
+    # Keyset pagination of the dashboard's employee list, optionally by current step
+    'CREATE INDEX IF NOT EXISTS idx_onboarding_progress_start ON onboarding_progress (start_date, employee_id)',
+    'CREATE INDEX IF NOT EXISTS idx_onboarding_progress_step_start ON onboarding_progress (current_step, start_date, employee_id)',
+    # Finds rows changed since a watermark for the dashboard's live updates
+    'CREATE INDEX IF NOT EXISTS idx_onboarding_progress_last_activity ON onboarding_progress (last_activity)',
+    '''
+    CREATE TABLE IF NOT EXISTS onboarding_meta (
+        key TEXT PRIMARY KEY,
+        value INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    "INSERT OR IGNORE INTO onboarding_meta (key, value) VALUES ('data_version', 0)",
+]
+
+# Recompute the employee's derived progress whenever one of their steps changes
+_PROGRESS_REFRESH = '''
+    UPDATE onboarding_progress
+    SET current_step = COALESCE(
+            (SELECT MIN(s.step) FROM onboarding_steps s
+             WHERE NOT EXISTS (SELECT 1 FROM step_events e
+                               WHERE e.employee_id = NEW.employee_id
+                                 AND e.step = s.step AND e.value >= s.required_score)),
+            (SELECT MAX(step) FROM onboarding_steps) + 1),
+        completion_percentage =
+            (SELECT COUNT(*) FROM step_events e JOIN onboarding_steps s ON s.step = e.step
+             WHERE e.employee_id = NEW.employee_id AND e.value >= s.required_score)
+            * 100.0 / (SELECT COUNT(*) FROM onboarding_steps),
+        last_activity = NEW.ts
+    WHERE employee_id = NEW.employee_id;
+    UPDATE onboarding_progress
+    SET completed_date = NEW.ts
+    WHERE employee_id = NEW.employee_id AND completed_date IS NULL AND completion_percentage >= 100;
+'''
+
+_BUMP_DATA_VERSION = "UPDATE onboarding_meta SET value = value + 1 WHERE key = 'data_version';"
+
+# The same derived progress for every employee, after the step rules changed
+_RECOMPUTE_PROGRESS = [
+    '''
+    UPDATE onboarding_progress
+    SET current_step = COALESCE(
+            (SELECT MIN(s.step) FROM onboarding_steps s
+             WHERE NOT EXISTS (SELECT 1 FROM step_events e
+                               WHERE e.employee_id = onboarding_progress.employee_id
+                                 AND e.step = s.step AND e.value >= s.required_score)),
+            (SELECT MAX(step) FROM onboarding_steps) + 1),
+        completion_percentage =
+            (SELECT COUNT(*) FROM step_events e JOIN onboarding_steps s ON s.step = e.step
+             WHERE e.employee_id = onboarding_progress.employee_id AND e.value >= s.required_score)
+            * 100.0 / (SELECT COUNT(*) FROM onboarding_steps)
+    ''',
+    '''
+    UPDATE onboarding_progress
+    SET completed_date = CASE WHEN completion_percentage >= 100
+                              THEN COALESCE(completed_date, last_activity, CURRENT_TIMESTAMP) END
+    ''',
+    _BUMP_DATA_VERSION,
+]
+
+_TRIGGERS = [
+    f'''
+    CREATE TRIGGER IF NOT EXISTS step_events_after_insert AFTER INSERT ON step_events
+    BEGIN {_PROGRESS_REFRESH} {_BUMP_DATA_VERSION} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS step_events_after_update AFTER UPDATE ON step_events
+    BEGIN {_PROGRESS_REFRESH} {_BUMP_DATA_VERSION} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS onboarding_progress_after_insert AFTER INSERT ON onboarding_progress
+    BEGIN {_BUMP_DATA_VERSION} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS onboarding_progress_after_delete AFTER DELETE ON onboarding_progress
+    BEGIN
+        DELETE FROM step_events WHERE employee_id = OLD.employee_id;
+        {_BUMP_DATA_VERSION}
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS quiz_attempts_after_insert AFTER INSERT ON quiz_attempts
+    BEGIN {_BUMP_DATA_VERSION} END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS quiz_attempts_after_update AFTER UPDATE OF score, answered ON quiz_attempts
+    BEGIN {_BUMP_DATA_VERSION} END
+    ''',
+]
+
+# Record a step value for a Slack user in one statement; a quiz step keeps its best score
+UPSERT_STEP_EVENT_SQL = '''
+    INSERT INTO step_events (employee_id, step, value, ts)
+    SELECT employee_id, ?, ?, ? FROM onboarding_progress WHERE slack_user_id = ?
+    ON CONFLICT (employee_id, step) DO UPDATE SET
+        value = CASE WHEN (SELECT total_questions FROM onboarding_steps WHERE step = excluded.step) IS NULL
+                     THEN excluded.value ELSE MAX(step_events.value, excluded.value) END,
+        ts = excluded.ts
+'''
+
+# Record a quiz score only while the user is on the quiz's step, keeping the best score
+COMPLETE_QUIZ_STEP_SQL = '''
+    INSERT INTO step_events (employee_id, step, value, ts)
+    SELECT employee_id, ?, ?, ? FROM onboarding_progress WHERE slack_user_id = ? AND current_step = ?
+    ON CONFLICT (employee_id, step) DO UPDATE SET value = MAX(step_events.value, excluded.value), ts = excluded.ts
+'''
+
+# Open a quiz attempt for a Slack user; ``answered`` is a bitmask of answered questions
+INSERT_QUIZ_ATTEMPT_SQL = '''
+    INSERT INTO quiz_attempts (employee_id, quiz_type, score, total_questions, answered, attempt_date)
+    SELECT employee_id, ?, 0, ?, 0, ? FROM onboarding_progress WHERE slack_user_id = ?
+'''
+
+# Count one answer towards an attempt; a question already answered is left alone
+RECORD_QUIZ_ANSWER_SQL = '''
+    UPDATE quiz_attempts SET score = score + ?, answered = answered | ?
+    WHERE id = ? AND answered & ? = 0
+'''
+
+
+DATA_VERSION_SQL = "SELECT value FROM onboarding_meta WHERE key = 'data_version'"
+
+
+def data_version(conn: sqlite3.Connection) -> int:
+    """The counter bumped by triggers on every onboarding data change."""
+    row = conn.execute(DATA_VERSION_SQL).fetchone()
+    return row[0] if row else 0
+
+
+def _legacy_step_columns(conn: sqlite3.Connection) -> List[str]:
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(onboarding_progress)')}
+    return [step.key for step in STEP_DEFINITIONS if step.key in columns]
+
+
+def _migrate_step_columns(conn: sqlite3.Connection, legacy_columns: List[str]):
+    """Move per-step columns of onboarding_progress into step_events."""
+    logger.info(f"Migrating {len(legacy_columns)} step columns into step_events")
+    conn.execute('DROP TRIGGER IF EXISTS onboarding_progress_metrics')
+    for step in STEP_DEFINITIONS:
+        if step.key not in legacy_columns:
+            continue
+        # Insert directly (no triggers exist yet); derived columns are recomputed afterwards
+        conn.execute(f'''
+            INSERT OR REPLACE INTO step_events (employee_id, step, value, ts)
+            SELECT employee_id, ?, {step.key}, COALESCE(last_activity, start_date, CURRENT_TIMESTAMP)
+            FROM onboarding_progress
+            WHERE COALESCE({step.key}, 0) != 0
+        ''', (step.step,))
+    for column in legacy_columns:
+        conn.execute(f'ALTER TABLE onboarding_progress DROP COLUMN {column}')
+
+
+def ensure_schema(conn: sqlite3.Connection):
+    """Create or migrate the onboarding schema to SCHEMA_VERSION.
+
+    Version 1 databases kept one ``step_N_*`` column per step on
+    onboarding_progress; version 2 stores step values in step_events;
+    version 3 adds the ``data_version`` counter in onboarding_meta;
+    version 4 tracks which questions each quiz attempt has answered.
+    Stored progress is recomputed whenever the step rules it was derived
+    under changed (including the move out of legacy columns).
+    """
+    for statement in _SCHEMA:
+        conn.execute(statement)
+    if 'answered' not in {row[1] for row in conn.execute('PRAGMA table_info(quiz_attempts)')}:
+        conn.execute('ALTER TABLE quiz_attempts ADD COLUMN answered INTEGER NOT NULL DEFAULT 0')
+    rules_sql = 'SELECT step, required_score FROM onboarding_steps ORDER BY step'
+    old_rules = conn.execute(rules_sql).fetchall()
+    conn.executemany('''
+        INSERT INTO onboarding_steps (step, key, name, required_score, total_questions)
+        VALUES (?, ?, ?, ?, ?)
+        ON CONFLICT (step) DO UPDATE SET key = excluded.key, name = excluded.name,
+            required_score = excluded.required_score, total_questions = excluded.total_questions
+    ''', [(s.step, s.key, s.name, s.required_score, s.total_questions) for s in STEP_DEFINITIONS])
+    legacy_columns = _legacy_step_columns(conn)
+    if legacy_columns:
+        _migrate_step_columns(conn, legacy_columns)
+    if legacy_columns or (old_rules and old_rules != conn.execute(rules_sql).fetchall()):
+        logger.info("Recomputing stored progress under the current step rules")
+        for statement in _RECOMPUTE_PROGRESS:
+            conn.execute(statement)
+    for statement in _TRIGGERS:
+        conn.execute(statement)
+    if conn.execute('PRAGMA user_version').fetchone()[0] == 2:
+        # Version 2 step_events triggers don't bump data_version yet
+        for trigger in ('step_events_after_insert', 'step_events_after_update', 'onboarding_progress_after_delete'):
+            conn.execute(f'DROP TRIGGER {trigger}')
+        for statement in _TRIGGERS:
+            conn.execute(statement)
+    conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+def step_values(conn: sqlite3.Connection, employee_id: str) -> Dict[str, int]:
+    """Return ``{step key: value}`` for every step, 0 where nothing is recorded."""
+    rows = conn.execute('''
+        SELECT s.key, COALESCE(e.value, 0)
+        FROM onboarding_steps s
+        LEFT JOIN step_events e ON e.step = s.step AND e.employee_id = ?
+        ORDER BY s.step
+    ''', (employee_id,))
+    return dict(rows.fetchall())
+
+
+def step_pivot_columns(alias: str = 'e') -> str:
+    """SELECT-list SQL that pivots step_events back into one column per step key.
+
+    Use with ``LEFT JOIN step_events e ... GROUP BY`` the employee.
+    """
+    return ', '.join(
+        f'COALESCE(MAX(CASE WHEN {alias}.step = {step.step} THEN {alias}.value END), 0) AS {step.key}'
+        for step in STEP_DEFINITIONS
+    )
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection frees up in time."""
+
+
+class ConnectionPool:
+    """A bounded, thread-safe pool of SQLite connections.
+
+    A thread holds at most one connection at a time: nested ``connection()``
+    calls on the same thread reuse the connection it already checked out.
+    Idle connections are health-checked before reuse when they have been
+    sitting for longer than ``health_check_interval`` seconds. A
+    ``read_only`` pool's connections refuse writes (``PRAGMA query_only``).
+    Connections are never shared across ``fork()``: a child process that
+    inherits the pool starts over with fresh connections.
+    """
+
+    def __init__(self, db_path: str, size: int = 8, timeout: float = 10.0,
+                 cached_statements: int = 256, health_check_interval: float = 30.0,
+                 config: Optional[StorageConfig] = None, read_only: bool = False):
+        self.db_path = db_path
+        self.config = config or StorageConfig()
+        self.read_only = read_only
+        self.size = size
+        self.timeout = timeout
+        self.cached_statements = cached_statements
+        self.health_check_interval = health_check_interval
+        self._idle: 'queue.LifoQueue' = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._writer: Optional['WriteBatcher'] = None
+        self._pid = os.getpid()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly by transaction()
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self.config.busy_timeout_ms / 1000,
+            check_same_thread=False,
+            cached_statements=self.cached_statements,
+            isolation_level=None,
+        )
+        self.config.apply(conn)
+        if self.read_only:
+            conn.execute('PRAGMA query_only = ON')
+        return conn
+
+    def _reset_after_fork(self):
+        # SQLite connections must not be used across fork(); drop the
+        # parent's without closing them (that would touch its file locks)
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._idle = queue.LifoQueue()
+            self._created = 0
+            self._local = threading.local()
+            self._writer = None
+            self._pid = os.getpid()
+
+    def _is_healthy(self, conn: sqlite3.Connection) -> bool:
+        try:
+            conn.execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def _checkout(self) -> sqlite3.Connection:
+        if self._pid != os.getpid():
+            self._reset_after_fork()
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_create = self._created < self.size
+                if can_create:
+                    self._created += 1
+            if can_create:
+                try:
+                    return self._connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+            try:
+                conn, last_used = self._idle.get(timeout=self.timeout)
+            except queue.Empty:
+                raise PoolTimeoutError(
+                    f"No database connection available after {self.timeout}s (pool size {self.size})"
+                )
+        if time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(conn):
+            try:
+                conn.close()
+            except sqlite3.Error:
+                pass
+            conn = self._connect()
+        return conn
+
+    def _checkin(self, conn: sqlite3.Connection):
+        if conn.in_transaction:
+            conn.rollback()
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection for the duration of the ``with`` block."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._pid == os.getpid():
+            yield conn
+            return
+        conn = self._checkout()
+        self._local.conn = conn
+        try:
+            yield conn
+        finally:
+            self._local.conn = None
+            self._checkin(conn)
+
+    @contextmanager
+    def transaction(self) -> Iterator[sqlite3.Connection]:
+        """Borrow a connection and commit (or roll back) when the block ends.
+
+        The write lock is taken up front with ``BEGIN IMMEDIATE``. A block
+        nested inside another transaction on the same thread joins it.
+        """
+        with self.connection() as conn:
+            if conn.in_transaction:
+                yield conn
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def run_in_transaction(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Run ``func(conn)`` in a write transaction, retrying while the database is busy."""
+        def attempt():
+            with self.transaction() as conn:
+                return func(conn)
+        return retry_on_busy(attempt, self.config.retry_attempts, self.config.retry_base_delay)
+
+    @property
+    def writer(self) -> 'WriteBatcher':
+        """The batched writer for this database, started on first use."""
+        with self._lock:
+            if self._writer is None:
+                self._writer = WriteBatcher(self)
+            return self._writer
+
+    def close(self):
+        """Stop the batched writer and close every idle connection."""
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            conn.close()
+            with self._lock:
+                self._created -= 1
+
+
+class WriteBatcher:
+    """Groups small concurrent writes into short shared transactions.
+
+    ``run(func)`` queues ``func(conn)`` and blocks until it is committed. A
+    background thread takes up to ``max_batch`` queued writes (waiting at most
+    ``max_delay`` seconds for more to arrive) and runs them in a single
+    ``BEGIN IMMEDIATE`` transaction. Each write gets its own savepoint, so one
+    failing write is rolled back and reported without affecting the others.
+    """
+
+    def __init__(self, pool: ConnectionPool, max_batch: int = 64, max_delay: float = 0.002):
+        self.pool = pool
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self._queue: 'queue.Queue' = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name='onboarding-db-writer', daemon=True)
+        self._thread.start()
+
+    def submit(self, func: Callable[[sqlite3.Connection], T]) -> 'Future[T]':
+        """Queue ``func(conn)``; the returned future resolves after commit."""
+        future: Future = Future()
+        self._queue.put((func, future))
+        return future
+
+    def run(self, func: Callable[[sqlite3.Connection], T]) -> T:
+        """Queue ``func(conn)`` and wait for its committed result."""
+        return self.submit(func).result()
+
+    def close(self):
+        """Finish queued writes and stop the writer thread."""
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            stop = False
+            while len(batch) < self.max_batch:
+                try:
+                    item = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    stop = True
+                    break
+                batch.append(item)
+            self._write_batch(batch)
+            if stop:
+                return
+
+    def _write_batch(self, batch: List[Tuple[Callable, Future]]):
+        try:
+            results = self.pool.run_in_transaction(lambda conn: self._apply(conn, batch))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        for (_, future), (ok, value) in zip(batch, results):
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _apply(self, conn: sqlite3.Connection, batch: List[Tuple[Callable, Future]]) -> List[Tuple[bool, object]]:
+        results = []
+        for func, _ in batch:
+            conn.execute('SAVEPOINT batched_write')
+            try:
+                results.append((True, func(conn)))
+            except Exception as e:
+                if is_busy_error(e):
+                    raise
+                conn.execute('ROLLBACK TO batched_write')
+                results.append((False, e))
+            conn.execute('RELEASE batched_write')
+        return results
+
+
+def migrate(db_path: str) -> int:
+    """Bring ``db_path`` up to SCHEMA_VERSION if it is behind; returns the version it was at.
+
+    Uses a short-lived writable connection, so read-only processes (the
+    dashboard) can call it before serving.
+    """
+    pool = ConnectionPool(db_path, size=1, config=StorageConfig.from_env())
+    try:
+        with pool.connection() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+        if version < SCHEMA_VERSION:
+            logger.info(f"Migrating {db_path} from schema version {version} to {SCHEMA_VERSION}")
+            pool.run_in_transaction(ensure_schema)
+        return version
+    finally:
+        pool.close()
+
+
+_pools: Dict[Tuple[str, bool], ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str = "onboarding.db", size: Optional[int] = None,
+             read_only: bool = False) -> ConnectionPool:
+    """Return the process-wide pool for ``db_path``, creating it on first use.
+
+    Read-only and read-write pools for the same file are separate.
+    """
+    key = (os.path.abspath(db_path), read_only)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(
+                db_path,
+                size=size or int(os.getenv('ONBOARDING_DB_POOL_SIZE', 8)),
+                config=StorageConfig.from_env(),
+                read_only=read_only,
+            )
+            _pools[key] = pool
+        return pool
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--migrate':
+        db_path = sys.argv[2] if len(sys.argv) > 2 else 'onboarding.db'
+        logging.basicConfig(level=logging.INFO)
+        pool = get_pool(db_path)
+        pool.run_in_transaction(ensure_schema)
+        with pool.connection() as conn:
+            version = conn.execute('PRAGMA user_version').fetchone()[0]
+        print(f"✅ {db_path} is at schema version {version}")
+    else:
+        print("Usage: python onboarding_store.py --migrate [path/to/onboarding.db]")
@@ -0,0 +1,293 @@
+#!/usr/bin/env python3
+"""
+Rate-limit-aware delivery of the Slack bot's outgoing messages.
+
+Handlers reply through a Responder instead of calling Bolt's ``respond``
+directly. A Responder buffers everything one piece of work says and hands it
+to the OutboundDispatcher, which merges it into a single message, so "🎉
+Correct!", "Quiz completed!" and the next step's blocks arrive as one post
+instead of three.
+The dispatcher sends on background threads (in order per user), waits for a
+token from the user's rate-limit bucket, honours ``Retry-After`` on HTTP 429
+and retries 5xx answers and failed connections with jittered backoff. A
+response_url POST isn't idempotent, so anything that may already have reached
+Slack (a timeout, a reset connection) and any other 4xx is logged and dropped.
+"""
+
+import logging
+import random
+import socket
+import threading
+import time
+import urllib.error
+from typing import Callable, Dict, List, Optional
+
+from task_queue import KeyedTaskQueue
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+# Slack allows at most 50 blocks per message
+MAX_BLOCKS = 50
+
+# Sustained posts per second to one response_url
+# (https://api.slack.com/apis/rate-limits)
+RESPONSE_URL_RATE = 1.0
+
+# Keyword arguments that change how a response is applied; only responses
+# that agree on all of them can be merged
+_MODE_KEYS = ('response_type', 'replace_original', 'delete_original', 'thread_ts')
+
+
+class RateLimited(Exception):
+    """Slack answered 429; ``retry_after`` is how long it asked us to wait."""
+
+    def __init__(self, retry_after: float):
+        super().__init__(f"rate limited for {retry_after}s")
+        self.retry_after = retry_after
+
+
+class ResponseFailed(Exception):
+    """Slack answered a response_url POST with an error status other than 429."""
+
+    def __init__(self, status: int):
+        super().__init__(f"response_url returned HTTP {status}")
+        self.status = status
+
+
+def _retryable(error: Exception) -> bool:
+    """Whether ``error`` means the message certainly wasn't accepted and may succeed later."""
+    if isinstance(error, ResponseFailed):
+        return error.status >= 500
+    if isinstance(error, urllib.error.URLError) and not isinstance(error, urllib.error.HTTPError):
+        error = error.reason
+    # Only failures to connect; after the request went out it may have been delivered
+    return isinstance(error, (ConnectionRefusedError, socket.gaierror))
+
+
+class TokenBucket:
+    """Allows ``rate`` acquisitions per second on average, in bursts of up to ``burst``."""
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Block until a token is available, then take it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._paused_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._paused_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def pause(self, seconds: float):
+        """Hand out no tokens for ``seconds`` (a server-sent ``Retry-After``)."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+            self._tokens = 0
+
+
+def merge_messages(messages: List[Dict]) -> List[Dict]:
+    """Combine consecutive responses into as few Slack messages as possible.
+
+    Plain-text messages become sections when merged with block messages;
+    each result's ``text`` is the joined plain text (used for notifications).
+    """
+    merged: List[Dict] = []
+    for message in messages:
+        previous = merged[-1] if merged else None
+        compatible = previous is not None and all(previous.get(k) == message.get(k) for k in _MODE_KEYS)
+        if compatible and not previous.get('blocks') and not message.get('blocks'):
+            previous['text'] = '\n\n'.join(filter(None, [previous.get('text'), message.get('text')]))
+            continue
+        if compatible:
+            blocks = _as_blocks(previous) + _as_blocks(message)
+            if len(blocks) <= MAX_BLOCKS:
+                previous['blocks'] = blocks
+                previous['text'] = '\n\n'.join(filter(None, [previous.get('text'), message.get('text')]))
+                continue
+        merged.append(dict(message))
+    return merged
+
+
+def _as_blocks(message: Dict) -> List[Dict]:
+    if message.get('blocks'):
+        return list(message['blocks'])
+    if message.get('text'):
+        return [{"type": "section", "text": {"type": "mrkdwn", "text": message['text']}}]
+    return []
+
+
+def _header(headers, name: str, default=None):
+    for key, value in (headers or {}).items():
+        if key.lower() == name.lower():
+            return value[0] if isinstance(value, list) else value
+    return default
+
+
+class Responder:
+    """A stand-in for Bolt's ``respond`` that buffers until ``flush()``."""
+
+    def __init__(self, dispatcher: 'OutboundDispatcher', key: str, respond: Callable):
+        self.dispatcher = dispatcher
+        self.key = key
+        self.respond = respond
+        self._messages: List[Dict] = []
+
+    def __call__(self, text: str = '', blocks: Optional[List[Dict]] = None, **kwargs):
+        message = {k: v for k, v in kwargs.items() if v is not None}
+        message['text'] = text
+        if blocks:
+            message['blocks'] = list(blocks)
+        self._messages.append(message)
+
+    def flush(self):
+        """Queue everything said so far for delivery (where it is merged)."""
+        messages, self._messages = self._messages, []
+        for message in messages:
+            self.dispatcher.enqueue(self.key, self.respond, message)
+
+
+class OutboundDispatcher:
+    """Sends Slack responses in order per user, within rate limits.
+
+    Messages queued for the same user and destination while an earlier send
+    is in flight are merged into one. ``depth`` is the number of messages
+    waiting; ``stats()`` adds delivery counters.
+    """
+
+    def __init__(self, workers: int = 4, max_attempts: int = 5, base_delay: float = 0.5,
+                 rate: float = RESPONSE_URL_RATE):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.rate = rate
+        self._senders = KeyedTaskQueue(workers=workers, max_pending=100000, name='slack-outbound')
+        # response_url limits are per URL, and each user's replies go to their
+        # own, so buckets are per user
+        self._buckets = TTLCache(maxsize=10000, ttl=600)
+        self._pending: Dict[str, List[tuple]] = {}
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.sent = 0
+        self.merged = 0
+        self.retries = 0
+        self.rate_limited = 0
+        self.dropped = 0
+
+    def responder(self, key: str, respond: Callable) -> Responder:
+        """A buffering ``respond`` for work done on behalf of ``key``."""
+        return Responder(self, key, respond)
+
+    def enqueue(self, key: str, respond: Callable, message: Dict):
+        """Queue ``respond(**message)`` after everything already queued for ``key``."""
+        item = (respond, message)
+        with self._lock:
+            pending = self._pending.get(key)
+            self.queued += 1
+            if pending is not None:
+                # A drain for this key is already scheduled and will pick this up
+                pending.append(item)
+                return
+            self._pending[key] = [item]
+        self._senders.submit(key, self._drain, key)
+
+    def _drain(self, key: str):
+        with self._lock:
+            items = self._pending.pop(key)
+        batches: List[tuple] = []
+        for respond, message in items:
+            if batches and batches[-1][0] is respond:
+                batches[-1][1].append(message)
+            else:
+                batches.append((respond, [message]))
+        for respond, queued in batches:
+            messages = merge_messages(queued)
+            with self._lock:
+                self.merged += len(queued) - len(messages)
+            for message in messages:
+                self._deliver(key, lambda r=respond, m=message: self._send_response(r, m))
+
+    def _bucket(self, key: str) -> TokenBucket:
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, burst=max(1.0, self.rate * 5))
+                self._buckets.set(key, bucket)
+            return bucket
+
+    def _deliver(self, key: str, send: Callable[[], None]):
+        bucket = self._bucket(key)
+        for attempt in range(1, self.max_attempts + 1):
+            bucket.acquire()
+            try:
+                send()
+                with self._lock:
+                    self.sent += 1
+                return
+            except RateLimited as e:
+                with self._lock:
+                    self.rate_limited += 1
+                bucket.pause(e.retry_after)
+                delay = e.retry_after
+            except Exception as e:
+                if not _retryable(e):
+                    with self._lock:
+                        self.dropped += 1
+                    logger.error(f"Dropped a response to {key}: {e}")
+                    return
+                logger.warning(f"Responding to {key} failed (attempt {attempt}/{self.max_attempts}): {e}")
+                delay = self.base_delay * 2 ** (attempt - 1)
+            if attempt < self.max_attempts:
+                with self._lock:
+                    self.retries += 1
+                # Jitter keeps many retrying senders from waking up together
+                time.sleep(delay + random.uniform(0, delay / 2))
+        with self._lock:
+            self.dropped += 1
+        logger.error(f"Gave up responding to {key} after {self.max_attempts} attempts")
+
+    @staticmethod
+    def _send_response(respond: Callable, message: Dict):
+        response = respond(**message)
+        status = getattr(response, 'status_code', 200)
+        if status == 429:
+            raise RateLimited(float(_header(response.headers, 'Retry-After', 1)))
+        if status >= 400:
+            raise ResponseFailed(status)
+
+    @property
+    def depth(self) -> int:
+        """Messages queued and not yet handed to a sender."""
+        with self._lock:
+            return sum(len(items) for items in self._pending.values())
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until everything queued has been sent (or given up on)."""
+        return self._senders.join(timeout)
+
+    def close(self, timeout: Optional[float] = None):
+        """Send what is queued, then stop the sender threads."""
+        self._senders.close(timeout)
+
+    def stats(self) -> dict:
+        """Queue depth and delivery counters."""
+        depth = self.depth
+        with self._lock:
+            return {
+                'depth': depth,
+                'queued': self.queued,
+                'sent': self.sent,
+                'merged': self.merged,
+                'retries': self.retries,
+                'rate_limited': self.rate_limited,
+                'dropped': self.dropped,
+            }
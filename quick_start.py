@@ -6,15 +6,28 @@ This script helps you get the Slack onboarding bot running quickly
 by checking prerequisites and guiding you through the setup process.
 """
 
+import importlib.util
 import os
 import sys
 import subprocess
-import sqlite3
+import time
 from pathlib import Path
+from typing import List, Tuple
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# Importable module -> pip package for each runtime dependency
+REQUIRED_MODULES = {
+    'slack_bolt': 'slack-bolt',
+    'slack_sdk': 'slack-sdk',
+    'flask': 'flask',
+    'plotly': 'plotly',
+}
+
+# Entry points whose cold start the startup report measures
+STARTUP_MODULES = ['dashboard', 'slack_bot']
+
 def check_python_version():
     """Check if Python version is 3.8+"""
     if sys.version_info < (3, 8):
@@ -24,17 +37,15 @@ def check_python_version():
     return True
 
 def check_dependencies():
-    """Check if required dependencies are installed"""
-    try:
-        import slack_bolt
-        import flask
-        import plotly
-        print("✅ All required dependencies are installed")
-        return True
-    except ImportError as e:
-        print(f"❌ Missing dependency: {e}")
+    """Check if required dependencies are installed (without importing them)"""
+    missing = [package for module, package in REQUIRED_MODULES.items()
+               if importlib.util.find_spec(module) is None]
+    if missing:
+        print(f"❌ Missing dependencies: {', '.join(missing)}")
         print("Run: pip install -r requirements_slack.txt")
         return False
+    print("✅ All required dependencies are installed")
+    return True
 
 def check_env_variables():
     """Check if Slack environment variables are set"""
@@ -114,7 +125,7 @@ def run_system_check():
         print("🎉 All checks passed! System is ready to run.")
         print("\n🚀 Next Steps:")
         print("1. Start the Slack bot: python slack_bot.py")
-        print("2. Start the dashboard: python dashboard.py")
+        print("2. Start the dashboard: python dashboard.py (production: python dashboard_server.py)")
         print("3. In Slack, use: /onboard @username")
         print("\n📊 Dashboard will be available at: http://localhost:5000")
     else:
@@ -123,6 +134,53 @@ def run_system_check():
     
     return all_passed
 
+def measure_startup(module: str) -> Tuple[float, float, List[Tuple[str, float]]]:
+    """Import ``module`` in a fresh interpreter with ``-X importtime``.
+    
+    Returns the process wall time and the module's import time (both in
+    milliseconds) plus its direct imports, slowest first.
+    """
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        capture_output=True, text=True, cwd=Path(__file__).resolve().parent
+    )
+    wall_ms = (time.perf_counter() - started) * 1000
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    
+    # -X importtime prints each module after its own imports, so the direct
+    # imports seen since the previous top-level entry belong to the next one
+    total_ms, children, pending = 0.0, [], []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # One space before a top-level name, two more per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:
+            pending.append((name.strip(), int(cumulative) / 1000))
+        elif depth == 0:
+            if name.strip() == module:
+                total_ms, children = int(cumulative) / 1000, pending
+            pending = []
+    
+    return wall_ms, total_ms, sorted(children, key=lambda child: child[1], reverse=True)
+
+def show_startup_report(modules: List[str] = STARTUP_MODULES, top: int = 5):
+    """Print how long each entry point takes to start, and what dominates it"""
+    print("⏱️  Startup Time Report (fresh interpreter per module)\n")
+    for module in modules:
+        try:
+            wall_ms, total_ms, children = measure_startup(module)
+        except RuntimeError as e:
+            print(f"❌ {module}: import failed ({e})")
+            continue
+        print(f"📦 {module}: {total_ms:.0f} ms importing, {wall_ms:.0f} ms process start to exit")
+        for name, ms in children[:top]:
+            print(f"   {ms:8.1f} ms  {name}")
+        print()
+
 def show_slack_setup_guide():
     """Show quick Slack app setup guide"""
     print("\n🔧 Slack App Setup Guide:")
@@ -146,6 +204,8 @@ def show_slack_setup_guide():
 if __name__ == "__main__":
     if len(sys.argv) > 1 and sys.argv[1] == "--slack-setup":
         show_slack_setup_guide()
+    elif len(sys.argv) > 1 and sys.argv[1] == "--startup-report":
+        show_startup_report(sys.argv[2:] or STARTUP_MODULES)
     else:
         success = run_system_check()
         if not success:
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Quiz sessions for the Slack bot.
+
+Each run through a quiz is one quiz_attempts row. While the user is answering,
+their attempt lives in memory (answered questions and running score), so a
+click costs one small UPDATE and no reads. A question counts once per attempt,
+on its first answer. When every question has been answered the attempt is
+scored: a passing attempt completes the quiz's step if the user is on that
+step (a retake from an old message never lowers a stored score), a failing
+one ends and the next click starts a new attempt. Sessions left idle for ``ttl`` seconds
+expire the same way.
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Optional, Sequence
+
+from onboarding_store import STEPS_BY_NUMBER
+from ttl_cache import TTLCache
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class QuizSession:
+    """One user's attempt at one quiz."""
+    attempt_id: int
+    quiz_type: str
+    total_questions: int
+    answered: int = 0  # bitmask of answered question indexes
+    score: int = 0
+
+    @property
+    def answered_count(self) -> int:
+        return bin(self.answered).count('1')
+
+    @property
+    def finished(self) -> bool:
+        return self.answered_count >= self.total_questions
+
+
+@dataclass
+class QuizAnswer:
+    """What one click did to the user's session."""
+    session: QuizSession
+    question_index: int
+    correct: bool
+    duplicate: bool = False      # question already answered in this attempt
+    passed: bool = False         # attempt finished at or above the required score
+    recorded: bool = False       # the pass completed the user's current step
+    required_score: int = 0
+
+
+class QuizEngine:
+    """Scores quiz answers and completes the step when a user passes.
+
+    ``quizzes`` maps quiz type to its questions (each with ``correct_answer``)
+    and ``step_quizzes`` maps a step number to its quiz type.
+    """
+
+    def __init__(self, db, quizzes: Dict[str, Sequence], step_quizzes: Dict[int, str],
+                 ttl: float = 1800, maxsize: int = 10000):
+        self.db = db
+        self.quizzes = quizzes
+        self.quiz_steps = {quiz_type: step for step, quiz_type in step_quizzes.items()}
+        self.sessions = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def session(self, user_id: str, quiz_type: str) -> Optional[QuizSession]:
+        """The user's attempt in progress, starting one if needed; None if they aren't onboarding."""
+        session = self.sessions.get((user_id, quiz_type))
+        if session is None:
+            total = len(self.quizzes[quiz_type])
+            attempt_id = self.db.start_quiz_attempt(user_id, quiz_type, total)
+            if attempt_id is None:
+                return None
+            session = QuizSession(attempt_id, quiz_type, total)
+        return session
+
+    def answer(self, user_id: str, quiz_type: str, question_index: int, answer_index: int) -> Optional[QuizAnswer]:
+        """Record one answer; None if the user has no onboarding record.
+
+        Answers for one user must not be processed concurrently (the bot's
+        task queue runs each user's work in order).
+        """
+        question = self.quizzes[quiz_type][question_index]
+        session = self.session(user_id, quiz_type)
+        if session is None:
+            return None
+        step = STEPS_BY_NUMBER[self.quiz_steps[quiz_type]]
+        result = QuizAnswer(session, question_index, answer_index == question.correct_answer,
+                            required_score=step.required_score)
+        bit = 1 << question_index
+        if session.answered & bit:
+            result.duplicate = True
+            self.sessions.set((user_id, quiz_type), session)
+            return result
+
+        self.db.record_quiz_answer(session.attempt_id, question_index, result.correct)
+        session.answered |= bit
+        session.score += int(result.correct)
+        if not session.finished:
+            # Re-set on every answer so only idle sessions expire
+            self.sessions.set((user_id, quiz_type), session)
+            return result
+
+        self.sessions.invalidate((user_id, quiz_type))
+        result.passed = session.score >= step.required_score
+        if result.passed:
+            result.recorded = self.db.complete_quiz_step(user_id, step.step, session.score)
+            logger.info(f"{user_id} passed the {quiz_type} quiz with {session.score}/{session.total_questions}"
+                        f"{'' if result.recorded else ' (not their current step)'}")
+        return result
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Block Kit payloads for the onboarding bot.
+
+Almost everything the bot shows is fixed when it starts: step titles and
+instructions, quiz questions and their buttons, the welcome and completion
+copy. BlockRenderer builds those blocks once and hands out the same block
+dicts on every call, so a handler only builds the one or two blocks that
+carry a user's name or progress. Rendered blocks are shared: don't mutate them.
+"""
+
+from typing import Dict, List, Sequence
+
+from actions import encode_value
+
+WELCOME_SECTIONS = [
+    "*Get ready for an amazing coding journey!* 🚀\n\nI'm your onboarding guide, and I'll help you through our 8-step process to become a full Katbus team member. Each step is designed to be fun and engaging - just like a K-pop concert! 🎤",
+    "*What you'll accomplish:*\n• Set up your development environment 💻\n• Learn our company history and mission 📚\n• Master our product knowledge 🎮\n• Join our amazing team 👥\n• Make your first contribution 🌟",
+    "I'll track your progress and celebrate each milestone with you. Ready to start? Let's make coding as exciting as a K-pop concert! 🎊",
+]
+
+COMPLETION_TEXT = "*Amazing work, {name}!* 🌟\n\nYou've successfully completed all 8 steps of the Katbus onboarding process. Welcome to the team! 🎵\n\n*What's next?*\n• Join our team channels\n• Start contributing to projects\n• Attend team meetings\n• Keep learning and growing with us!"
+
+
+def header(text: str) -> Dict:
+    return {"type": "header", "text": {"type": "plain_text", "text": text}}
+
+
+def section(text: str) -> Dict:
+    return {"type": "section", "text": {"type": "mrkdwn", "text": text}}
+
+
+def button(text: str, action_id: str, value: str = None, style: str = None) -> Dict:
+    element = {"type": "button", "text": {"type": "plain_text", "text": text}, "action_id": action_id}
+    if value is not None:
+        element["value"] = value
+    if style:
+        element["style"] = style
+    return element
+
+
+def quiz_blocks(step_number: int, questions: Sequence) -> List[Dict]:
+    """A section and a row of answer buttons per question."""
+    blocks = []
+    for i, question in enumerate(questions):
+        blocks.append(section(f"*Question {i+1}:* {question.question}"))
+        blocks.append({
+            "type": "actions",
+            "elements": [
+                button(f"{chr(65+j)}) {option}", "quiz_answer", encode_value(step_number, i, j))
+                for j, option in enumerate(question.options)
+            ],
+        })
+    return blocks
+
+
+class BlockRenderer:
+    """Precompiled blocks for every step, quiz and fixed message.
+
+    ``quizzes`` maps quiz type to its questions and ``step_quizzes`` maps a
+    quiz step's number to its quiz type.
+    """
+
+    def __init__(self, steps: Dict, quizzes: Dict[str, Sequence], step_quizzes: Dict[int, str]):
+        self.quizzes = {quiz_type: quiz_blocks(step, quizzes[quiz_type]) for step, quiz_type in step_quizzes.items()}
+        self._step_headers = {}
+        self._step_descriptions = {}
+        self._step_bodies = {}
+        for number, step in steps.items():
+            self._step_headers[number] = header(f"Step {step.step_number}: {step.title}")
+            self._step_descriptions[number] = step.description
+            instructions_text = "\n".join(f"• {instruction}" for instruction in step.instructions)
+            body = [section(f"*Instructions:*\n{instructions_text}")]
+            if step.validation_type == "quiz":
+                body.extend(self.quizzes.get(step_quizzes.get(number), []))
+            else:
+                body.append({
+                    "type": "actions",
+                    "elements": [
+                        button("✅ Mark Complete", "complete_step", encode_value(number), style="primary"),
+                        button("❓ Need Help", "get_help", encode_value(number)),
+                    ],
+                })
+            self._step_bodies[number] = body
+        self._welcome = [section(text) for text in WELCOME_SECTIONS]
+        self._completion_header = header("🎉 Congratulations! Onboarding Complete! 🎉")
+        self._completion_footer = section(
+            "The entire team is excited to work with you. Let's make coding as exciting as a K-pop concert! 🎤✨"
+        )
+        self._continue = {
+            "type": "actions",
+            "elements": [button("Continue Onboarding", "next_step", style="primary")],
+        }
+
+    def welcome(self, user_name: str) -> List[Dict]:
+        return [header(f"Welcome to Katbus, {user_name}! 🎵✨")] + self._welcome
+
+    def step(self, step_number: int, completion_pct: float) -> List[Dict]:
+        progress = section(f"*Progress: {completion_pct:.0f}% Complete* 📊\n\n{self._step_descriptions[step_number]}")
+        return [self._step_headers[step_number], progress] + self._step_bodies[step_number]
+
+    def completion(self, employee_name: str) -> List[Dict]:
+        return [self._completion_header, section(COMPLETION_TEXT.format(name=employee_name)), self._completion_footer]
+
+    def progress(self, completion_pct: float, employee_name: str, progress_text: str) -> List[Dict]:
+        blocks = [
+            header(f"Onboarding Progress: {completion_pct:.0f}%"),
+            section(f"*{employee_name}*\n\n{progress_text}"),
+        ]
+        if completion_pct < 100:
+            blocks.append(self._continue)
+        return blocks
@@ -7,23 +7,36 @@ with progress tracking and automated validation.
 """
 
 import os
-import sqlite3
+import re
+import threading
 from datetime import datetime
 from typing import Dict, List, Optional
 import logging
 from dataclasses import dataclass
 
 from dotenv import load_dotenv
-from slack_bolt import App
 
 load_dotenv()
-from slack_bolt.adapter.socket_mode import SocketModeHandler
-from slack_sdk import WebClient
-from slack_sdk.errors import SlackApiError
+
+from actions import ActionRouter, ActionValueError
+from idempotency import DeliveryDeduplicator, click_key, delivery_key
+from outbound import OutboundDispatcher
+from quiz_sessions import QuizEngine
+from slack_blocks import BlockRenderer
+from slack_dashboard import USAGE as DASHBOARD_USAGE, DashboardQuery, SlackDashboard
+from task_queue import KeyedTaskQueue, QueueFullError
+from ttl_cache import TTLCache
+from onboarding_store import (
+    COMPLETE_QUIZ_STEP_SQL, INSERT_QUIZ_ATTEMPT_SQL, RECORD_QUIZ_ANSWER_SQL, STEP_DEFINITIONS, STEPS_BY_NUMBER, UPSERT_STEP_EVENT_SQL,
+    ensure_schema, get_pool, step_values,
+)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+BUSY_MESSAGE = "⏳ I'm handling a lot of requests right now. Please try again in a moment!"
+STALE_BUTTON_MESSAGE = "That button is out of date. Use `/progress` to pick up where you left off!"
+
 @dataclass
 class OnboardingStep:
     step_number: int
@@ -43,174 +56,72 @@ class QuizQuestion:
 class OnboardingDatabase:
     def __init__(self, db_path: str = "onboarding.db"):
         self.db_path = db_path
+        self.pool = get_pool(db_path)
         self.init_database()
     
     def init_database(self):
         """Initialize the onboarding database with required tables."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS onboarding_progress (
-                employee_id TEXT PRIMARY KEY,
-                slack_user_id TEXT UNIQUE,
-                employee_name TEXT,
-                start_date TIMESTAMP,
-                current_step INTEGER DEFAULT 1,
-                step_1_github BOOLEAN DEFAULT FALSE,
-                step_2_environment BOOLEAN DEFAULT FALSE,
-                step_3_history_quiz INTEGER DEFAULT 0,
-                step_4_product_quiz INTEGER DEFAULT 0,
-                step_5_team_integration BOOLEAN DEFAULT FALSE,
-                step_6_technical_setup BOOLEAN DEFAULT FALSE,
-                step_7_app_testing BOOLEAN DEFAULT FALSE,
-                step_8_first_contribution BOOLEAN DEFAULT FALSE,
-                completion_percentage DECIMAL(5,2) DEFAULT 0.00,
-                completed_date TIMESTAMP NULL,
-                last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS quiz_attempts (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                employee_id TEXT,
-                quiz_type TEXT,
-                score INTEGER,
-                total_questions INTEGER,
-                attempt_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (employee_id) REFERENCES onboarding_progress (employee_id)
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        self.pool.run_in_transaction(ensure_schema)
     
     def create_employee_record(self, slack_user_id: str, employee_name: str) -> str:
         """Create a new employee onboarding record."""
         employee_id = f"emp_{slack_user_id}_{int(datetime.now().timestamp())}"
         
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
+        now = datetime.now()
+        self.pool.run_in_transaction(lambda conn: conn.execute('''
             INSERT INTO onboarding_progress 
-            (employee_id, slack_user_id, employee_name, start_date)
-            VALUES (?, ?, ?, ?)
-        ''', (employee_id, slack_user_id, employee_name, datetime.now()))
-        
-        conn.commit()
-        conn.close()
+            (employee_id, slack_user_id, employee_name, start_date, last_activity)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (employee_id, slack_user_id, employee_name, now, now)))
         
         return employee_id
     
     def get_employee_progress(self, slack_user_id: str) -> Optional[Dict]:
         """Get employee progress by Slack user ID."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT * FROM onboarding_progress WHERE slack_user_id = ?
-        ''', (slack_user_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
+        with self.pool.connection() as conn:
+            cursor = conn.execute('''
+                SELECT * FROM onboarding_progress WHERE slack_user_id = ?
+            ''', (slack_user_id,))
+            result = cursor.fetchone()
+            if not result:
+                return None
+            
             columns = [desc[0] for desc in cursor.description]
-            return dict(zip(columns, result))
-        return None
+            progress = dict(zip(columns, result))
+            progress.update(step_values(conn, progress['employee_id']))
+            return progress
     
     def update_step_completion(self, slack_user_id: str, step: int, completed: bool = True, score: Optional[int] = None):
-        """Update completion status for a specific step."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        step_column = f"step_{step}_"
-        if step == 3:
-            step_column += "history_quiz"
-            cursor.execute(f'''
-                UPDATE onboarding_progress 
-                SET {step_column} = ?, last_activity = ?
-                WHERE slack_user_id = ?
-            ''', (score or 0, datetime.now(), slack_user_id))
-        elif step == 4:
-            step_column += "product_quiz"
-            cursor.execute(f'''
-                UPDATE onboarding_progress 
-                SET {step_column} = ?, last_activity = ?
-                WHERE slack_user_id = ?
-            ''', (score or 0, datetime.now(), slack_user_id))
-        else:
-            step_mapping = {
-                1: "github",
-                2: "environment", 
-                5: "team_integration",
-                6: "technical_setup",
-                7: "app_testing",
-                8: "first_contribution"
-            }
-            step_column += step_mapping[step]
-            cursor.execute(f'''
-                UPDATE onboarding_progress 
-                SET {step_column} = ?, last_activity = ?
-                WHERE slack_user_id = ?
-            ''', (completed, datetime.now(), slack_user_id))
-        
-        self._update_progress_metrics(cursor, slack_user_id)
-        
-        conn.commit()
-        conn.close()
-    
-    def _update_progress_metrics(self, cursor, slack_user_id: str):
-        """Update current step and completion percentage."""
-        cursor.execute('''
-            SELECT step_1_github, step_2_environment, step_3_history_quiz, 
-                   step_4_product_quiz, step_5_team_integration, step_6_technical_setup,
-                   step_7_app_testing, step_8_first_contribution
-            FROM onboarding_progress WHERE slack_user_id = ?
-        ''', (slack_user_id,))
-        
-        result = cursor.fetchone()
-        if not result:
-            return
-        
-        completed_steps = 0
-        total_steps = 8
-        
-        boolean_steps = [result[0], result[1], result[4], result[5], result[6], result[7]]
-        completed_steps += sum(boolean_steps)
-        
-        if result[2] >= 3:  # History quiz: 3/4 = 75%
-            completed_steps += 1
-        if result[3] >= 3:  # Product quiz: 3/3 = 100% (but we'll accept 2/3 = 67%)
-            completed_steps += 1
-        
-        completion_percentage = (completed_steps / total_steps) * 100
+        """Update completion status for a specific step.
         
-        current_step = 1
-        for i, step_completed in enumerate([
-            result[0], result[1], result[2] >= 3, result[3] >= 2,
-            result[4], result[5], result[6], result[7]
-        ]):
-            if not step_completed:
-                current_step = i + 1
-                break
-        else:
-            current_step = 9  # All steps completed
-        
-        cursor.execute('''
-            UPDATE onboarding_progress 
-            SET current_step = ?, completion_percentage = ?
-            WHERE slack_user_id = ?
-        ''', (current_step, completion_percentage, slack_user_id))
-        
-        if completion_percentage == 100:
-            cursor.execute('''
-                UPDATE onboarding_progress 
-                SET completed_date = ?
-                WHERE slack_user_id = ? AND completed_date IS NULL
-            ''', (datetime.now(), slack_user_id))
+        Concurrent step updates are committed together in one short batched
+        transaction by the pool's writer thread.
+        """
+        self.pool.writer.run(lambda conn: self._update_step(conn.cursor(), slack_user_id, step, completed, score))
+    
+    def _update_step(self, cursor, slack_user_id: str, step: int, completed: bool, score: Optional[int]):
+        """Record one step value; step_events triggers refresh the progress row."""
+        step_def = STEPS_BY_NUMBER[step]
+        value = (score or 0) if step_def.is_quiz else int(completed)
+        cursor.execute(UPSERT_STEP_EVENT_SQL, (step, value, datetime.now(), slack_user_id))
+    
+    def complete_quiz_step(self, slack_user_id: str, step: int, score: int) -> bool:
+        """Record a passing quiz score; False (and nothing written) unless ``step`` is the user's current step."""
+        return self.pool.writer.run(lambda conn: conn.execute(
+            COMPLETE_QUIZ_STEP_SQL, (step, score, datetime.now(), slack_user_id, step)).rowcount == 1)
+    
+    def start_quiz_attempt(self, slack_user_id: str, quiz_type: str, total_questions: int) -> Optional[int]:
+        """Open a quiz_attempts row; returns its id, or None if the user has no onboarding record."""
+        def insert(conn):
+            cursor = conn.execute(INSERT_QUIZ_ATTEMPT_SQL, (quiz_type, total_questions, datetime.now(), slack_user_id))
+            return cursor.lastrowid if cursor.rowcount else None
+        return self.pool.writer.run(insert)
+    
+    def record_quiz_answer(self, attempt_id: int, question_index: int, correct: bool):
+        """Count one answer towards an attempt (a single-row UPDATE)."""
+        answered_bit = 1 << question_index
+        self.pool.writer.run(lambda conn: conn.execute(
+            RECORD_QUIZ_ANSWER_SQL, (int(correct), answered_bit, attempt_id, answered_bit)))
 
 class KatbusOnboardingBot:
     def __init__(self):
@@ -221,11 +132,40 @@ class KatbusOnboardingBot:
             raise ValueError(f"Missing required environment variables: {', '.join(missing_vars)}. "
                            f"Please check your .env file contains these tokens.")
         
+        # Imported here so OnboardingDatabase users (dashboard, scripts) don't load Bolt
+        from slack_bolt import App
+        
         self.app = App(
             token=os.environ.get("SLACK_BOT_TOKEN"),
             signing_secret=os.environ.get("SLACK_SIGNING_SECRET")
         )
         self.db = OnboardingDatabase()
+        self.team_dashboard = SlackDashboard(
+            self.db.pool,
+            page_size=int(os.getenv('SLACK_DASHBOARD_PAGE_SIZE', 20)),
+            stalled_days=int(os.getenv('SLACK_DASHBOARD_STALLED_DAYS', 7)),
+        )
+        # Handlers only ack; the work runs here, in order per user
+        self.tasks = KeyedTaskQueue(
+            workers=int(os.getenv('SLACK_HANDLER_WORKERS', 8)),
+            max_pending=int(os.getenv('SLACK_HANDLER_QUEUE_SIZE', 1000)),
+            name='slack-handler',
+        )
+        # Replies are merged per user and sent within Slack's rate limits
+        self.outbound = OutboundDispatcher(workers=int(os.getenv('SLACK_OUTBOUND_WORKERS', 4)))
+        # Slack deliveries already handled, so redeliveries are dropped before any work
+        self.deliveries = DeliveryDeduplicator(
+            maxsize=int(os.getenv('SLACK_DEDUP_CACHE_SIZE', 10000)),
+            ttl=float(os.getenv('SLACK_DEDUP_TTL', 900)),
+            db_path=os.getenv('SLACK_DEDUP_DB') or None,
+            db_timeout=float(os.getenv('SLACK_DEDUP_DB_TIMEOUT', 0.05)),
+            click_window=float(os.getenv('SLACK_DOUBLE_CLICK_WINDOW', 2)),
+        )
+        # Display names by Slack user ID; filled in bulk at startup, then per lookup
+        self.user_names = TTLCache(
+            maxsize=int(os.getenv('SLACK_USER_CACHE_SIZE', 10000)),
+            ttl=float(os.getenv('SLACK_USER_CACHE_TTL', 3600)),
+        )
         self.setup_handlers()
         
         self.onboarding_steps = {
@@ -370,63 +310,182 @@ class KatbusOnboardingBot:
                 "The unique combination of K-pop culture and coding education makes Katlib special!"
             )
         ]
+        
+        quizzes = {'history': self.history_quiz, 'product': self.product_quiz}
+        self.step_quizzes = {3: 'history', 4: 'product'}
+        # Every step's and quiz's blocks, built once
+        self.blocks = BlockRenderer(self.onboarding_steps, quizzes, self.step_quizzes)
+        self.quiz_engine = QuizEngine(self.db, quizzes, self.step_quizzes,
+                                      ttl=float(os.getenv('SLACK_QUIZ_SESSION_TTL', 1800)))
+        
+        self.actions = ActionRouter()
+        self.actions.register("quiz_answer", self.handle_quiz_answer_action, self.parse_quiz_answer)
+        self.actions.register("complete_step", self.complete_step, self.parse_manual_step)
+        self.actions.register("get_help", self.show_step_help, self.parse_step)
+        self.actions.register("next_step", self.show_next_step)
+    
+    def dispatch(self, user_id: str, respond, work) -> bool:
+        """Queue ``work(respond)`` behind the user's earlier work; False if the queue is full.
+        
+        ``work`` gets a buffering responder: whatever it says is sent as one
+        merged message once it returns.
+        """
+        out = self.outbound.responder(user_id, respond)
+        
+        def run():
+            try:
+                work(out)
+            finally:
+                out.flush()
+        
+        try:
+            self.tasks.submit(user_id, run)
+            return True
+        except QueueFullError:
+            logger.warning(f"Handler queue full, shedding work for {user_id}: {self.tasks.stats()}")
+            return False
+    
+    @staticmethod
+    def command_target(command) -> str:
+        """The user a command is about: a mentioned user, or whoever ran it."""
+        text = command.get('text', '').strip()
+        if text.startswith('<@') and text.endswith('>'):
+            return text[2:-1].split('|')[0]
+        return command['user_id']
     
     def setup_handlers(self):
-        """Set up Slack event handlers."""
+        """Set up Slack event handlers.
+        
+        Redelivered requests and double clicks are dropped first. Every handler acks straight
+        away and queues the real work with dispatch(); when the queue is full
+        the user is told to retry.
+        """
+        
+        @self.app.middleware
+        def drop_duplicate_deliveries(req, body, next):
+            key = delivery_key(body)
+            retry = bool(req.headers.get('x-slack-retry-num'))
+            if key is None or self.deliveries.claim(key, retry=retry):
+                click = click_key(body)
+                if click is None or self.deliveries.claim_click(click):
+                    return next()
+                key = click
+            from slack_bolt import BoltResponse
+            
+            # Ack the duplicate (so Slack stops retrying) without running any listener
+            logger.info(f"Dropped duplicate delivery {key}")
+            return BoltResponse(status=200, body="")
+        
+        def queue_command(ack, respond, user_id: str, work):
+            # A command's ack can carry text, so "busy" costs no extra request
+            if self.dispatch(user_id, respond, work):
+                ack()
+            else:
+                ack(BUSY_MESSAGE)
         
         @self.app.command("/onboard")
         def handle_onboard_command(ack, respond, command):
-            ack()
-            user_id = command['user_id']
-            text = command.get('text', '').strip()
-            
-            if text.startswith('<@') and text.endswith('>'):
-                target_user_id = text[2:-1].split('|')[0]
-                self.start_onboarding(respond, target_user_id)
-            else:
-                self.start_onboarding(respond, user_id)
+            target_user_id = self.command_target(command)
+            queue_command(ack, respond, target_user_id, lambda out: self.start_onboarding(out, target_user_id))
         
         @self.app.command("/progress")
         def handle_progress_command(ack, respond, command):
-            ack()
-            user_id = command['user_id']
-            text = command.get('text', '').strip()
-            
-            if text.startswith('<@') and text.endswith('>'):
-                target_user_id = text[2:-1].split('|')[0]
-                self.show_progress(respond, target_user_id)
-            else:
-                self.show_progress(respond, user_id)
+            target_user_id = self.command_target(command)
+            queue_command(ack, respond, target_user_id, lambda out: self.show_progress(out, target_user_id))
         
         @self.app.command("/dashboard")
         def handle_dashboard_command(ack, respond, command):
-            ack()
-            self.show_dashboard(respond)
+            text = command.get('text', '')
+            queue_command(ack, respond, command['user_id'], lambda out: self.show_dashboard(out, text))
         
-        @self.app.action("quiz_answer")
-        def handle_quiz_answer(ack, body, respond):
+        # Every button click comes through here and is routed by self.actions;
+        # clicks nobody handles are acked too, so Slack doesn't show an error
+        @self.app.action({"type": "block_actions", "action_id": re.compile(".*")})
+        def handle_action(ack, body, respond):
             ack()
-            self.handle_quiz_answer_action(body, respond)
-        
-        @self.app.action("complete_step")
-        def handle_step_completion(ack, body, respond):
-            ack()
-            self.complete_step(body, respond)
+            try:
+                resolved = self.actions.resolve(body)
+            except ActionValueError as e:
+                logger.warning(f"Rejected action from {body['user']['id']}: {e}")
+                respond(STALE_BUTTON_MESSAGE, replace_original=False)
+                return
+            if resolved is None:
+                return
+            handler, action = resolved
+            if not self.dispatch(action.user_id, respond, lambda out: handler(action, out)):
+                respond(BUSY_MESSAGE, replace_original=False)
+    
+    def parse_quiz_answer(self, version: int, fields):
+        """``(quiz_type, question_index, answer_index)`` from a quiz button value."""
+        if version == 0:
+            quiz_type, question_index, answer_index = fields
+        else:
+            step, question_index, answer_index = fields
+            quiz_type = self.step_quizzes[step]
+        questions = self.quiz_engine.quizzes[quiz_type]
+        if not 0 <= question_index < len(questions) or not 0 <= answer_index < len(questions[question_index].options):
+            raise ValueError("no such question or answer")
+        return quiz_type, question_index, answer_index
+    
+    def parse_step(self, version: int, fields) -> int:
+        """The step number from a step button value."""
+        (step_number,) = fields
+        if step_number not in self.onboarding_steps:
+            raise ValueError(f"no step {step_number}")
+        return step_number
+    
+    def parse_manual_step(self, version: int, fields) -> int:
+        """The step number from a Mark Complete button; quiz steps are only completed by passing."""
+        step_number = self.parse_step(version, fields)
+        if STEPS_BY_NUMBER[step_number].is_quiz:
+            raise ValueError(f"step {step_number} is completed by its quiz")
+        return step_number
+    
+    @staticmethod
+    def display_name(user: Dict) -> str:
+        """The name to greet a Slack user by."""
+        return user.get('real_name') or user.get('profile', {}).get('real_name') or user['name']
+    
+    def warm_user_cache(self, page_size: int = 200) -> int:
+        """Cache every workspace member's name from ``users.list``; returns how many."""
+        from slack_sdk.errors import SlackApiError
         
-        @self.app.action("next_step")
-        def handle_next_step(ack, body, respond):
-            ack()
-            self.show_next_step(body, respond)
+        count, cursor = 0, None
+        try:
+            while True:
+                response = self.app.client.users_list(limit=page_size, cursor=cursor)
+                for member in response['members']:
+                    if not member.get('deleted'):
+                        self.user_names.set(member['id'], self.display_name(member))
+                        count += 1
+                cursor = response.get('response_metadata', {}).get('next_cursor')
+                if not cursor:
+                    break
+        except SlackApiError as e:
+            logger.warning(f"Stopped warming the user cache after {count} users: {e}")
+        logger.info(f"Cached {count} user names")
+        return count
+    
+    def get_user_name(self, user_id: str) -> str:
+        """A user's display name, from the cache or ``users.info``."""
+        user_name = self.user_names.get(user_id)
+        if user_name is None:
+            user_info = self.app.client.users_info(user=user_id)
+            user_name = self.display_name(user_info['user'])
+            self.user_names.set(user_id, user_name)
+        return user_name
     
     def start_onboarding(self, respond, user_id: str):
         """Start the onboarding process for a user."""
+        from slack_sdk.errors import SlackApiError
+        
         try:
-            client = WebClient(token=os.environ.get("SLACK_BOT_TOKEN"))
-            user_info = client.users_info(user=user_id)
-            user_name = user_info['user']['real_name'] or user_info['user']['name']
-            
             progress = self.db.get_employee_progress(user_id)
-            if not progress:
+            if progress:
+                # Already onboarding: we have their name, no need to ask Slack
+                user_name = progress['employee_name']
+            else:
+                user_name = self.get_user_name(user_id)
                 self.db.create_employee_record(user_id, user_name)
                 logger.info(f"Started onboarding for {user_name} ({user_id})")
             
@@ -439,38 +498,7 @@ class KatbusOnboardingBot:
     
     def send_welcome_message(self, respond, user_name: str):
         """Send personalized welcome message."""
-        welcome_blocks = [
-            {
-                "type": "header",
-                "text": {
-                    "type": "plain_text",
-                    "text": f"Welcome to Katbus, {user_name}! 🎵✨"
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": "*Get ready for an amazing coding journey!* 🚀\n\nI'm your onboarding guide, and I'll help you through our 8-step process to become a full Katbus team member. Each step is designed to be fun and engaging - just like a K-pop concert! 🎤"
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": "*What you'll accomplish:*\n• Set up your development environment 💻\n• Learn our company history and mission 📚\n• Master our product knowledge 🎮\n• Join our amazing team 👥\n• Make your first contribution 🌟"
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": "I'll track your progress and celebrate each milestone with you. Ready to start? Let's make coding as exciting as a K-pop concert! 🎊"
-                }
-            }
-        ]
-        
-        respond(blocks=welcome_blocks)
+        respond(blocks=self.blocks.welcome(user_name))
     
     def show_current_step(self, respond, user_id: str):
         """Show the current onboarding step for a user."""
@@ -484,99 +512,7 @@ class KatbusOnboardingBot:
             self.show_completion_message(respond, progress)
             return
         
-        step = self.onboarding_steps[current_step]
-        completion_pct = progress['completion_percentage']
-        
-        step_blocks = [
-            {
-                "type": "header",
-                "text": {
-                    "type": "plain_text",
-                    "text": f"Step {step.step_number}: {step.title}"
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"*Progress: {completion_pct:.0f}% Complete* 📊\n\n{step.description}"
-                }
-            }
-        ]
-        
-        instructions_text = "\n".join([f"• {instruction}" for instruction in step.instructions])
-        step_blocks.append({
-            "type": "section",
-            "text": {
-                "type": "mrkdwn",
-                "text": f"*Instructions:*\n{instructions_text}"
-            }
-        })
-        
-        if step.validation_type == "quiz":
-            if current_step == 3:
-                step_blocks.extend(self.create_quiz_blocks("history", self.history_quiz))
-            elif current_step == 4:
-                step_blocks.extend(self.create_quiz_blocks("product", self.product_quiz))
-        else:
-            step_blocks.append({
-                "type": "actions",
-                "elements": [
-                    {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "✅ Mark Complete"
-                        },
-                        "action_id": "complete_step",
-                        "value": str(current_step),
-                        "style": "primary"
-                    },
-                    {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "❓ Need Help"
-                        },
-                        "action_id": "get_help",
-                        "value": str(current_step)
-                    }
-                ]
-            })
-        
-        respond(blocks=step_blocks)
-    
-    def create_quiz_blocks(self, quiz_type: str, questions: List[QuizQuestion]) -> List[Dict]:
-        """Create interactive quiz blocks."""
-        quiz_blocks = []
-        
-        for i, question in enumerate(questions):
-            quiz_blocks.append({
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"*Question {i+1}:* {question.question}"
-                }
-            })
-            
-            options = []
-            for j, option in enumerate(question.options):
-                options.append({
-                    "type": "button",
-                    "text": {
-                        "type": "plain_text",
-                        "text": f"{chr(65+j)}) {option}"
-                    },
-                    "action_id": "quiz_answer",
-                    "value": f"{quiz_type}_{i}_{j}"
-                })
-            
-            quiz_blocks.append({
-                "type": "actions",
-                "elements": options
-            })
-        
-        return quiz_blocks
+        respond(blocks=self.blocks.step(current_step, progress['completion_percentage']))
     
     def show_progress(self, respond, user_id: str):
         """Show detailed progress for a user."""
@@ -586,103 +522,31 @@ class KatbusOnboardingBot:
             return
         
         steps_status = []
-        step_fields = [
-            ('step_1_github', 'GitHub Account'),
-            ('step_2_environment', 'Dev Environment'),
-            ('step_3_history_quiz', 'History Quiz'),
-            ('step_4_product_quiz', 'Product Quiz'),
-            ('step_5_team_integration', 'Team Integration'),
-            ('step_6_technical_setup', 'Technical Setup'),
-            ('step_7_app_testing', 'App Testing'),
-            ('step_8_first_contribution', 'First Contribution')
-        ]
-        
-        for i, (field, name) in enumerate(step_fields, 1):
-            value = progress[field]
-            if field in ['step_3_history_quiz', 'step_4_product_quiz']:
-                status = "✅" if value >= (3 if field == 'step_3_history_quiz' else 2) else f"📝 {value}/{'4' if field == 'step_3_history_quiz' else '3'}"
+        for step in STEP_DEFINITIONS:
+            value = progress[step.key]
+            if step.is_quiz:
+                status = "✅" if value >= step.required_score else f"📝 {value}/{step.total_questions}"
             else:
                 status = "✅" if value else "⏳"
             
-            steps_status.append(f"{i}. {name}: {status}")
+            steps_status.append(f"{step.step}. {step.name}: {status}")
         
         progress_text = "\n".join(steps_status)
-        
-        progress_blocks = [
-            {
-                "type": "header",
-                "text": {
-                    "type": "plain_text",
-                    "text": f"Onboarding Progress: {progress['completion_percentage']:.0f}%"
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"*{progress['employee_name']}*\n\n{progress_text}"
-                }
-            }
-        ]
-        
-        if progress['completion_percentage'] < 100:
-            progress_blocks.append({
-                "type": "actions",
-                "elements": [
-                    {
-                        "type": "button",
-                        "text": {
-                            "type": "plain_text",
-                            "text": "Continue Onboarding"
-                        },
-                        "action_id": "next_step",
-                        "style": "primary"
-                    }
-                ]
-            })
-        
-        respond(blocks=progress_blocks)
+        respond(blocks=self.blocks.progress(progress['completion_percentage'], progress['employee_name'], progress_text))
     
-    def show_dashboard(self, respond):
-        """Show manager dashboard with all employee progress."""
-        conn = sqlite3.connect(self.db.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            SELECT employee_name, completion_percentage, current_step, 
-                   start_date, completed_date, last_activity
-            FROM onboarding_progress
-            ORDER BY start_date DESC
-        ''')
-        
-        results = cursor.fetchall()
-        conn.close()
-        
-        if not results:
-            respond("No onboarding records found.")
+    def show_dashboard(self, respond, text: str = ''):
+        """Show the manager dashboard: team summary and one page of employees."""
+        try:
+            query = DashboardQuery.parse(text)
+        except ValueError as e:
+            respond(f"{e}\n{DASHBOARD_USAGE}")
             return
-        
-        dashboard_text = "*Team Onboarding Dashboard* 📊\n\n"
-        
-        for name, completion, current_step, start_date, completed_date, last_activity in results:
-            status = "✅ Complete" if completion == 100 else f"Step {current_step}/8"
-            dashboard_text += f"• *{name}*: {completion:.0f}% - {status}\n"
-        
-        total_employees = len(results)
-        completed_employees = sum(1 for r in results if r[1] == 100)
-        avg_completion = sum(r[1] for r in results) / total_employees if total_employees > 0 else 0
-        
-        dashboard_text += "\n*Summary:*\n"
-        dashboard_text += f"• Total Employees: {total_employees}\n"
-        dashboard_text += f"• Completed: {completed_employees}\n"
-        dashboard_text += f"• Average Progress: {avg_completion:.1f}%"
-        
-        respond(dashboard_text)
+        respond("Team Onboarding Dashboard", blocks=self.team_dashboard.render(query))
     
-    def complete_step(self, body, respond):
+    def complete_step(self, action, respond):
         """Handle step completion."""
-        user_id = body['user']['id']
-        step_number = int(body['actions'][0]['value'])
+        user_id = action.user_id
+        step_number = action.value
         
         self.db.update_step_completion(user_id, step_number, True)
         
@@ -700,76 +564,74 @@ class KatbusOnboardingBot:
         
         self.show_current_step(respond, user_id)
     
-    def show_next_step(self, body, respond):
+    def show_next_step(self, action, respond):
         """Show the next step in onboarding."""
-        user_id = body['user']['id']
-        self.show_current_step(respond, user_id)
+        self.show_current_step(respond, action.user_id)
+    
+    def show_step_help(self, action, respond):
+        """Repeat a step's instructions with where to ask for help."""
+        step = self.onboarding_steps[action.value]
+        instructions_text = "\n".join(f"{n}. {instruction}" for n, instruction in enumerate(step.instructions, 1))
+        respond(f"*Need help with Step {step.step_number}: {step.title}?*\n\n{instructions_text}\n\n"
+                f"Still stuck? Ask in the team channel or message your onboarding buddy, "
+                f"then click *✅ Mark Complete* when you're done.", replace_original=False)
     
-    def handle_quiz_answer_action(self, body, respond):
+    def handle_quiz_answer_action(self, action, respond):
         """Handle quiz answer selection."""
-        user_id = body['user']['id']
-        action_value = body['actions'][0]['value']
-        
-        parts = action_value.split('_')
-        quiz_type = parts[0]
-        question_index = int(parts[1])
-        answer_index = int(parts[2])
+        user_id = action.user_id
+        quiz_type, question_index, answer_index = action.value
         
-        quiz_questions = self.history_quiz if quiz_type == 'history' else self.product_quiz
-        question = quiz_questions[question_index]
+        result = self.quiz_engine.answer(user_id, quiz_type, question_index, answer_index)
+        if result is None:
+            respond("Please start your onboarding first with `/onboard`")
+            return
+        session = result.session
+        question = self.quiz_engine.quizzes[quiz_type][question_index]
         
-        is_correct = answer_index == question.correct_answer
+        if result.duplicate:
+            respond(f"You've already answered question {question_index + 1} in this attempt. "
+                    f"Answered {session.answered_count}/{session.total_questions} so far.")
+            return
         
-        if is_correct:
+        if result.correct:
             respond(f"✅ Correct! {question.explanation}")
         else:
             correct_option = question.options[question.correct_answer]
             respond(f"❌ Not quite. The correct answer is: {correct_option}\n{question.explanation}")
         
-        progress = self.db.get_employee_progress(user_id)
-        if progress:
-            current_step = progress['current_step']
-            if current_step == 3 and quiz_type == 'history':
-                self.db.update_step_completion(user_id, 3, True, 4)
-                respond("🎉 History quiz completed! Moving to the next step...")
-                self.show_current_step(respond, user_id)
-            elif current_step == 4 and quiz_type == 'product':
-                self.db.update_step_completion(user_id, 4, True, 3)
-                respond("🎉 Product quiz completed! Moving to the next step...")
-                self.show_current_step(respond, user_id)
+        if not session.finished:
+            respond(f"📝 {session.answered_count}/{session.total_questions} answered")
+        elif result.passed and result.recorded:
+            respond(f"🎉 {quiz_type.capitalize()} quiz completed with {session.score}/{session.total_questions}! "
+                    f"Moving to the next step...")
+            self.show_current_step(respond, user_id)
+        elif result.passed:
+            respond(f"🎉 You scored {session.score}/{session.total_questions} on the {quiz_type} quiz! "
+                    f"It isn't your current step, so your progress is unchanged.")
+            self.show_current_step(respond, user_id)
+        else:
+            respond(f"📚 You scored {session.score}/{session.total_questions}; {result.required_score} "
+                    f"are needed to pass. Answer the questions again to retry!")
 
     def show_completion_message(self, respond, progress):
         """Show completion celebration message."""
-        completion_blocks = [
-            {
-                "type": "header",
-                "text": {
-                    "type": "plain_text",
-                    "text": "🎉 Congratulations! Onboarding Complete! 🎉"
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": f"*Amazing work, {progress['employee_name']}!* 🌟\n\nYou've successfully completed all 8 steps of the Katbus onboarding process. Welcome to the team! 🎵\n\n*What's next?*\n• Join our team channels\n• Start contributing to projects\n• Attend team meetings\n• Keep learning and growing with us!"
-                }
-            },
-            {
-                "type": "section",
-                "text": {
-                    "type": "mrkdwn",
-                    "text": "The entire team is excited to work with you. Let's make coding as exciting as a K-pop concert! 🎤✨"
-                }
-            }
-        ]
-        
-        respond(blocks=completion_blocks)
+        respond(blocks=self.blocks.completion(progress['employee_name']))
     
     def run(self):
         """Start the Slack bot."""
+        from slack_bolt.adapter.socket_mode import SocketModeHandler
+        
         handler = SocketModeHandler(self.app, os.environ["SLACK_APP_TOKEN"])
-        handler.start()
+        if os.getenv('SLACK_USER_CACHE_WARM', '1') == '1':
+            threading.Thread(target=self.warm_user_cache, name='user-cache-warm', daemon=True).start()
+        try:
+            handler.start()
+        finally:
+            self.tasks.close(timeout=30)
+            self.outbound.close(timeout=30)
+            logger.info(f"Outbound messages: {self.outbound.stats()}")
+            logger.info(f"Deliveries: {self.deliveries.stats()}")
+            logger.info(f"User name cache: {self.user_names.stats()}")
 
 if __name__ == "__main__":
     bot = KatbusOnboardingBot()
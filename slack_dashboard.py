@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+The ``/dashboard`` Slack command.
+
+    /dashboard                  everyone, newest hires first
+    /dashboard page 3           a later page
+    /dashboard stalled          unfinished and idle for a while, longest idle first
+    /dashboard complete         finished onboarding
+    /dashboard active           not finished yet
+    /dashboard step 4           currently on step 4
+
+Filters combine (``/dashboard stalled step 3 page 2``). The team summary
+comes from one aggregate query and the list shows one bounded page, so the
+cost doesn't grow with the number of hires. Output is split into sections
+that stay under Slack's per-block text limit.
+"""
+
+from dataclasses import dataclass
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from onboarding_store import STEP_DEFINITIONS, ConnectionPool
+from outbound import MAX_BLOCKS
+from slack_blocks import header, section
+
+# Slack rejects section text longer than this
+SECTION_TEXT_LIMIT = 3000
+
+STATUSES = ('all', 'stalled', 'complete', 'active')
+
+USAGE = ("Usage: `/dashboard [stalled|complete|active] [step N] [page N]`\n"
+         "e.g. `/dashboard stalled`, `/dashboard step 4 page 2`")
+
+_ORDER_BY = {
+    'stalled': 'last_activity ASC, employee_id ASC',
+    'all': 'start_date DESC, employee_id DESC',
+}
+
+
+@dataclass(frozen=True)
+class DashboardQuery:
+    """What ``/dashboard`` was asked to list."""
+    status: str = 'all'
+    step: Optional[int] = None
+    page: int = 1
+
+    @classmethod
+    def parse(cls, text: str) -> 'DashboardQuery':
+        """Parse the command text; raises ValueError for anything unrecognised."""
+        status, step, page = 'all', None, 1
+        words = text.lower().split()
+        while words:
+            word = words.pop(0)
+            if word in STATUSES:
+                status = word
+            elif word in ('page', 'step'):
+                if not words or not words[0].isdigit() or int(words[0]) < 1:
+                    raise ValueError(f"`{word}` needs a number")
+                number = int(words.pop(0))
+                if word == 'page':
+                    page = number
+                elif number > len(STEP_DEFINITIONS):
+                    raise ValueError(f"there is no step {number}")
+                else:
+                    step = number
+            else:
+                raise ValueError(f"I don't know `{word}`")
+        return cls(status, step, page)
+
+    def describe(self) -> str:
+        parts = [] if self.status == 'all' else [self.status]
+        if self.step is not None:
+            parts.append(f"step {self.step}")
+        return ' '.join(parts)
+
+
+class SlackDashboard:
+    """Team progress for the ``/dashboard`` command."""
+
+    def __init__(self, pool: ConnectionPool, page_size: int = 20, stalled_days: int = 7):
+        self.pool = pool
+        self.page_size = page_size
+        self.stalled_days = stalled_days
+
+    def _stalled_condition(self) -> Tuple[str, List]:
+        # Whole days, like the web dashboard's inactive_days filter
+        cutoff = (date.today() - timedelta(days=self.stalled_days)).isoformat()
+        return 'completed_date IS NULL AND last_activity < ?', [cutoff]
+
+    def _where(self, query: DashboardQuery) -> Tuple[str, List]:
+        conditions, params = [], []
+        if query.status == 'stalled':
+            condition, condition_params = self._stalled_condition()
+            conditions.append(condition)
+            params.extend(condition_params)
+        elif query.status == 'complete':
+            conditions.append('completed_date IS NOT NULL')
+        elif query.status == 'active':
+            conditions.append('completed_date IS NULL')
+        if query.step is not None:
+            conditions.append('current_step = ?')
+            params.append(query.step)
+        return ' AND '.join(conditions) or '1', params
+
+    def summary(self, query: DashboardQuery) -> Dict:
+        """Team totals plus how many employees match ``query``, in one pass."""
+        stalled, stalled_params = self._stalled_condition()
+        where, params = self._where(query)
+        with self.pool.connection() as conn:
+            total, completed, average, stalled_count, matching = conn.execute(f'''
+                SELECT COUNT(*),
+                       COALESCE(SUM(completed_date IS NOT NULL), 0),
+                       COALESCE(AVG(completion_percentage), 0),
+                       COALESCE(SUM({stalled}), 0),
+                       COALESCE(SUM({where}), 0)
+                FROM onboarding_progress
+            ''', stalled_params + params).fetchone()
+        return {'total': total, 'completed': completed, 'average': average,
+                'stalled': stalled_count, 'matching': matching}
+
+    def page(self, query: DashboardQuery) -> List[Tuple]:
+        """``(name, completion, current_step, last_activity)`` for the requested page."""
+        where, params = self._where(query)
+        order_by = _ORDER_BY.get(query.status, _ORDER_BY['all'])
+        with self.pool.connection() as conn:
+            return conn.execute(f'''
+                SELECT employee_name, completion_percentage, current_step, last_activity
+                FROM onboarding_progress
+                WHERE {where}
+                ORDER BY {order_by}
+                LIMIT ? OFFSET ?
+            ''', params + [self.page_size, (query.page - 1) * self.page_size]).fetchall()
+
+    def render(self, query: DashboardQuery) -> List[Dict]:
+        """The command's reply as Block Kit blocks."""
+        summary = self.summary(query)
+        rows = self.page(query)
+        pages = max(1, -(-summary['matching'] // self.page_size))
+        label = query.describe()
+
+        blocks = [
+            header("Team Onboarding Dashboard 📊"),
+            section("\n".join([
+                "*Summary:*",
+                f"• Total Employees: {summary['total']}",
+                f"• Completed: {summary['completed']}",
+                f"• Average Progress: {summary['average']:.1f}%",
+                f"• Stalled ({self.stalled_days}+ days idle): {summary['stalled']}",
+            ])),
+        ]
+        if not rows:
+            blocks.append(section(f"No {label + ' ' if label else ''}employees on page {query.page}."
+                                  if summary['matching'] else f"No {label + ' ' if label else ''}employees found."))
+            return blocks
+
+        steps = len(STEP_DEFINITIONS)
+        lines = []
+        for name, completion, current_step, last_activity in rows:
+            status = "✅ Complete" if completion >= 100 else f"Step {current_step}/{steps}"
+            line = f"• *{escape(name)}*: {completion:.0f}% - {status}"
+            if query.status == 'stalled':
+                line += f" (last active {str(last_activity)[:10]})"
+            lines.append(line)
+        title = f"*{label.capitalize() if label else 'Everyone'}* ({summary['matching']})"
+        blocks.extend(section(text) for text in chunk_lines([title] + lines, SECTION_TEXT_LIMIT))
+
+        footer = f"Page {query.page} of {pages}"
+        if query.page < pages:
+            footer += f" · `/dashboard {label + ' ' if label else ''}page {query.page + 1}` for more"
+        blocks.append({"type": "context", "elements": [{"type": "mrkdwn", "text": footer}]})
+        return blocks[:MAX_BLOCKS]
+
+
+def escape(text: str) -> str:
+    """Escape the characters Slack treats as markup in mrkdwn text."""
+    return str(text).replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
+
+
+def chunk_lines(lines: List[str], limit: int) -> List[str]:
+    """Join lines into as few texts of at most ``limit`` characters as possible."""
+    chunks, current, size = [], [], 0
+    for line in lines:
+        line = line[:limit]
+        if current and size + 1 + len(line) > limit:
+            chunks.append("\n".join(current))
+            current, size = [], 0
+        size += len(line) + (1 if current else 0)
+        current.append(line)
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
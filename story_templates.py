@@ -0,0 +1,358 @@
+"""
+Story template engine for KATLibs.
+
+Stories are written like the f-strings they used to be: ``{city}`` fills in a
+word and ``{idol_name.upper()}`` fills in a word with a transform applied.
+Use ``{{`` and ``}}`` for literal braces. A template is parsed once into a
+compiled list of literal segments and slot references, then every render is
+a single ``str.join``.
+
+Templates live in the ``stories`` directory. ``stories/index.json`` records
+each template's id, title, slot names, byte offsets and content hash, so the
+library can be listed without opening every file.
+"""
+
+import csv
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from typing import Callable, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+TRANSFORMS: Dict[str, Callable[[str], str]] = {
+    'upper': str.upper,
+    'lower': str.lower,
+    'title': str.title,
+    'capitalize': str.capitalize,
+}
+
+_TOKEN_RE = re.compile(r'\{\{|\}\}|\{(\w+)(?:\.(\w+)\(\))?\}|[{}]')
+
+
+@dataclass(frozen=True)
+class Slot:
+    name: str
+    transform: Optional[str] = None
+
+
+class TemplateSyntaxError(ValueError):
+    """Raised when a story template cannot be parsed."""
+
+
+class CompiledTemplate:
+    """A parsed story: literal text interleaved with slots."""
+
+    def __init__(self, segments: List):
+        self.segments: Tuple = tuple(segments)
+        # Literals are placed once; renders only overwrite the slot positions.
+        self._parts = [seg if isinstance(seg, str) else '' for seg in self.segments]
+        self._slot_plan = [
+            (idx, seg.name, TRANSFORMS[seg.transform] if seg.transform else None)
+            for idx, seg in enumerate(self.segments)
+            if isinstance(seg, Slot)
+        ]
+        self.slot_names: Tuple[str, ...] = tuple(dict.fromkeys(name for _, name, _ in self._slot_plan))
+
+    def render(self, words: Mapping[str, str]) -> str:
+        """Fill the slots with ``words`` and return the finished story."""
+        parts = self._parts.copy()
+        for idx, name, transform in self._slot_plan:
+            value = words[name]
+            parts[idx] = transform(value) if transform else value
+        return ''.join(parts)
+
+    def spans(self, words: Mapping[str, str], tag: str = 'userword') -> List[Tuple[str, Tuple[str, ...]]]:
+        """Render as ``(text, tags)`` spans, tagging every filled-in word.
+
+        Slot text is tagged by position, so a user word that also appears in
+        the template's own text is never mis-tagged.
+        """
+        spans = []
+        slot_tags = (tag,)
+        for seg in self.segments:
+            if isinstance(seg, str):
+                spans.append((seg, ()))
+            else:
+                value = words[seg.name]
+                if seg.transform:
+                    value = TRANSFORMS[seg.transform](value)
+                if value:
+                    spans.append((value, slot_tags))
+        return spans
+
+    def render_batch(self, rows: List[Mapping[str, str]]) -> List[str]:
+        """Render many word sets, filling slots column by column."""
+        columns = []
+        for _, name, transform in self._slot_plan:
+            values = [row[name] for row in rows]
+            columns.append(list(map(transform, values)) if transform else values)
+        # One parts list per batch: literals are written once and only the
+        # slot positions are overwritten for each story.
+        parts = self._parts.copy()
+        positions = [idx for idx, _, _ in self._slot_plan]
+        stories = []
+        for row_values in zip(*columns):
+            for idx, value in zip(positions, row_values):
+                parts[idx] = value
+            stories.append(''.join(parts))
+        if not columns:
+            stories = [''.join(parts)] * len(rows)
+        return stories
+
+
+def chunk_spans(spans: List[Tuple[str, Tuple[str, ...]]], max_chars: int) -> Iterator[List[Tuple[str, Tuple[str, ...]]]]:
+    """Group spans into chunks of about ``max_chars`` characters.
+
+    Spans longer than ``max_chars`` (such as a pasted paragraph) are split.
+    """
+    chunk = []
+    size = 0
+    for text, tags in spans:
+        while size + len(text) > max_chars:
+            room = max_chars - size
+            if room:
+                chunk.append((text[:room], tags))
+            yield chunk
+            chunk, size = [], 0
+            text = text[room:]
+        if text:
+            chunk.append((text, tags))
+            size += len(text)
+    if chunk:
+        yield chunk
+
+
+def parse_template(source: str) -> CompiledTemplate:
+    """Parse template source into a CompiledTemplate."""
+    segments: List = []
+    literal: List[str] = []
+    pos = 0
+    for match in _TOKEN_RE.finditer(source):
+        literal.append(source[pos:match.start()])
+        pos = match.end()
+        token = match.group(0)
+        if token == '{{':
+            literal.append('{')
+        elif token == '}}':
+            literal.append('}')
+        elif match.group(1):
+            name, transform = match.group(1), match.group(2)
+            if transform and transform not in TRANSFORMS:
+                raise TemplateSyntaxError(f"Unknown transform '{transform}' for slot '{name}'")
+            if literal:
+                segments.append(''.join(literal))
+                literal = []
+            segments.append(Slot(name, transform))
+        else:
+            raise TemplateSyntaxError(f"Unmatched '{token}' at offset {match.start()}")
+    literal.append(source[pos:])
+    text = ''.join(literal)
+    if text:
+        segments.append(text)
+    return CompiledTemplate(segments)
+
+
+@lru_cache(maxsize=128)
+def compile_template(source: str) -> CompiledTemplate:
+    """Parse ``source`` once and cache the compiled template."""
+    return parse_template(source)
+
+
+STORIES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'stories')
+INDEX_FILE = 'index.json'
+DEFAULT_TEMPLATE_ID = 'kpop_concert'
+
+_INDEX_FIELDS = ('id', 'title', 'file', 'offset', 'length', 'slots', 'sha256')
+
+
+@dataclass(frozen=True)
+class TemplateEntry:
+    id: str
+    title: str
+    file: str
+    offset: int
+    length: int
+    slots: Tuple[str, ...]
+    sha256: str
+
+
+def scan_template_file(path: str) -> TemplateEntry:
+    """Read one template file and describe it for the index.
+
+    Template files start with ``key: value`` header lines (``title`` is the
+    only one used today), then a ``---`` line, then the story body.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+    headers = {}
+    offset = 0
+    for line in data.splitlines(keepends=True):
+        offset += len(line)
+        text = line.decode('utf-8').strip()
+        if text == '---':
+            break
+        key, _, value = text.partition(':')
+        headers[key.strip()] = value.strip()
+    else:
+        raise TemplateSyntaxError(f"{path}: missing '---' line after the template header")
+    body = data[offset:]
+    template_id = os.path.splitext(os.path.basename(path))[0]
+    return TemplateEntry(
+        id=template_id,
+        title=headers.get('title', template_id),
+        file=os.path.basename(path),
+        offset=offset,
+        length=len(body),
+        slots=parse_template(body.decode('utf-8')).slot_names,
+        sha256=hashlib.sha256(body).hexdigest(),
+    )
+
+
+def build_index(directory: str = STORIES_DIR) -> List[TemplateEntry]:
+    """Scan every ``*.txt`` template in ``directory`` and write its index."""
+    entries = [
+        scan_template_file(os.path.join(directory, name))
+        for name in sorted(os.listdir(directory))
+        if name.endswith('.txt')
+    ]
+    index = {
+        'fields': list(_INDEX_FIELDS),
+        'rows': [[getattr(entry, field) for field in _INDEX_FIELDS] for entry in entries],
+    }
+    tmp_path = os.path.join(directory, INDEX_FILE + '.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, ensure_ascii=False, separators=(',', ':'))
+    os.replace(tmp_path, os.path.join(directory, INDEX_FILE))
+    return entries
+
+
+class StoryLibrary:
+    """A directory of story templates, listed from its index and parsed lazily."""
+
+    def __init__(self, directory: str = STORIES_DIR, cache_size: int = 64):
+        self.directory = directory
+        self.cache_size = cache_size
+        self._cache: 'OrderedDict[str, CompiledTemplate]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._entries: Dict[str, TemplateEntry] = {}
+        self._load_index()
+
+    def _load_index(self):
+        try:
+            with open(os.path.join(self.directory, INDEX_FILE), encoding='utf-8') as f:
+                index = json.load(f)
+            fields = index['fields']
+            entries = []
+            for row in index['rows']:
+                values = dict(zip(fields, row))
+                values['slots'] = tuple(values['slots'])
+                entries.append(TemplateEntry(**values))
+        except FileNotFoundError:
+            entries = build_index(self.directory)
+        self._entries = {entry.id: entry for entry in entries}
+
+    def reindex(self):
+        """Rebuild the on-disk index and drop every cached template."""
+        with self._lock:
+            self._entries = {entry.id: entry for entry in build_index(self.directory)}
+            self._cache.clear()
+
+    def entries(self) -> List[TemplateEntry]:
+        """List every template without reading any template file."""
+        return list(self._entries.values())
+
+    def entry(self, template_id: str) -> TemplateEntry:
+        """Return the index entry for ``template_id``."""
+        return self._entries[template_id]
+
+    def get(self, template_id: str) -> CompiledTemplate:
+        """Return the compiled template, parsing it on first use."""
+        with self._lock:
+            template = self._cache.get(template_id)
+            if template is not None:
+                self._cache.move_to_end(template_id)
+                return template
+        template = parse_template(self._read_body(self._entries[template_id]))
+        with self._lock:
+            self._cache[template_id] = template
+            self._cache.move_to_end(template_id)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return template
+
+    def _read_body(self, entry: TemplateEntry) -> str:
+        with open(os.path.join(self.directory, entry.file), 'rb') as f:
+            f.seek(entry.offset)
+            body = f.read(entry.length)
+        if hashlib.sha256(body).hexdigest() != entry.sha256:
+            raise TemplateSyntaxError(
+                f"Template '{entry.id}' changed since it was indexed; run python story_templates.py --reindex"
+            )
+        return body.decode('utf-8')
+
+
+_default_library: Optional[StoryLibrary] = None
+
+
+def get_library() -> StoryLibrary:
+    """Return the shared library for the bundled ``stories`` directory."""
+    global _default_library
+    if _default_library is None:
+        _default_library = StoryLibrary()
+    return _default_library
+
+
+def load_rows(path: Union[str, os.PathLike]) -> Iterator[Dict[str, str]]:
+    """Stream word sets from a .csv (with a header row) or .jsonl file."""
+    with open(path, newline='', encoding='utf-8') as f:
+        if os.fspath(path).endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+def render_many(template: Union[str, CompiledTemplate],
+                rows: Union[Iterable[Mapping[str, str]], str, os.PathLike],
+                batch_size: int = 1000) -> Iterator[str]:
+    """Stream rendered stories for every word set in ``rows``.
+
+    ``template`` is template source or a CompiledTemplate; ``rows`` is an
+    iterable of word dicts or a path to a CSV/JSONL file of them.
+    """
+    compiled = template if isinstance(template, CompiledTemplate) else compile_template(template)
+    if isinstance(rows, (str, os.PathLike)):
+        rows = load_rows(rows)
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield from compiled.render_batch(batch)
+
+
+def render_story(words: Mapping[str, str], template_id: str = DEFAULT_TEMPLATE_ID) -> str:
+    """Render a library story (the K-pop concert story by default)."""
+    return get_library().get(template_id).render(words)
+
+
+def story_spans(words: Mapping[str, str], template_id: str = DEFAULT_TEMPLATE_ID) -> List[Tuple[str, Tuple[str, ...]]]:
+    """Render a library story as ``(text, tags)`` spans for highlighting."""
+    return get_library().get(template_id).spans(words)
+
+
+if __name__ == '__main__':
+    import sys
+
+    if len(sys.argv) > 1 and sys.argv[1] == '--reindex':
+        entries = build_index()
+        print(f"Indexed {len(entries)} story templates in {STORIES_DIR}")
+    else:
+        for entry in get_library().entries():
+            print(f"{entry.id}: {entry.title} ({len(entry.slots)} words)")
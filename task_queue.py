@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Background task execution for the Slack bot.
+
+Slack expects handlers to acknowledge within three seconds, so the bot acks
+right away and hands the real work (database writes, API calls, responses)
+to a KeyedTaskQueue.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(RuntimeError):
+    """Raised by ``KeyedTaskQueue.submit`` when ``max_pending`` tasks are already waiting."""
+
+
+class KeyedTaskQueue:
+    """Runs tasks on a fixed pool of worker threads, in order per key.
+
+    Tasks that share a key (a Slack user ID, say) run one at a time in the
+    order they were submitted; tasks with different keys run in parallel.
+    At most ``max_pending`` tasks may wait: beyond that ``submit`` raises
+    QueueFullError so callers can shed load instead of queueing without bound.
+    """
+
+    def __init__(self, workers: int = 8, max_pending: int = 1000, name: str = 'tasks'):
+        self.workers = workers
+        self.max_pending = max_pending
+        self._cond = threading.Condition()
+        # key -> tasks not started yet; a key stays here while one of its tasks runs
+        self._queues: Dict[Hashable, Deque[tuple]] = {}
+        # Keys with queued tasks and nothing running, in the order they became ready
+        self._ready: Deque[Hashable] = deque()
+        self._pending = 0
+        self._running = 0
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_depth = 0
+        self.max_wait = 0.0
+        self._total_wait = 0.0
+        self._threads = [
+            threading.Thread(target=self._work, name=f'{name}-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, key: Hashable, func: Callable, *args, **kwargs):
+        """Queue ``func(*args, **kwargs)`` to run after every earlier task for ``key``."""
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("KeyedTaskQueue is closed")
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise QueueFullError(f"{self._pending} tasks already waiting (limit {self.max_pending})")
+            tasks = self._queues.get(key)
+            if tasks is None:
+                tasks = self._queues[key] = deque()
+                self._ready.append(key)
+                self._cond.notify()
+            tasks.append((func, args, kwargs, time.monotonic()))
+            self._pending += 1
+            self.submitted += 1
+            self.max_depth = max(self.max_depth, self._pending)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._ready and not self._closed:
+                    self._cond.wait()
+                if not self._ready:
+                    return
+                key = self._ready.popleft()
+                func, args, kwargs, queued_at = self._queues[key].popleft()
+                self._pending -= 1
+                self._running += 1
+                waited = time.monotonic() - queued_at
+                self._total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+            ok = True
+            try:
+                func(*args, **kwargs)
+            except Exception:
+                ok = False
+                logger.exception(f"Background task for {key!r} failed")
+            with self._cond:
+                self._running -= 1
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+                if self._queues[key]:
+                    self._ready.append(key)
+                else:
+                    del self._queues[key]
+                self._cond.notify_all()
+
+    @property
+    def depth(self) -> int:
+        """Tasks waiting to start."""
+        return self._pending
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """Wait until nothing is queued or running; False if ``timeout`` ran out first."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while self._pending or self._running:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return True
+
+    def close(self, timeout: Optional[float] = None):
+        """Stop accepting tasks, finish the queued ones and stop the workers."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for thread in self._threads:
+            thread.join(None if deadline is None else max(0.0, deadline - time.monotonic()))
+
+    def stats(self) -> dict:
+        """Queue depth, throughput counters and queueing delay."""
+        with self._cond:
+            started = self.completed + self.failed + self._running
+            return {
+                'pending': self._pending,
+                'running': self._running,
+                'keys': len(self._queues),
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'failed': self.failed,
+                'rejected': self.rejected,
+                'max_depth': self.max_depth,
+                'avg_wait_ms': self._total_wait / started * 1000 if started else 0.0,
+                'max_wait_ms': self.max_wait * 1000,
+                'workers': self.workers,
+                'max_pending': self.max_pending,
+            }
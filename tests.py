@@ -1,7 +1,43 @@
+import csv
+import gzip
+import http.client
+import json
+import os
+import shutil
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
 import unittest
-from unittest.mock import patch
+import urllib.error
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+from unittest.mock import patch
+
+import plotly.graph_objs as go
+import plotly.utils
+from slack_bolt.context.respond import Respond
+
+import charts
+import dashboard
 import katlibs
+import onboarding_store
+import quick_start
+import slack_bot
+import story_templates
+from actions import ActionValueError, decode_value
+from dashboard_server import PooledWSGIServer
+from idempotency import DeliveryDeduplicator
+from outbound import OutboundDispatcher, _retryable, merge_messages
+from slack_bot import OnboardingDatabase
+from slack_dashboard import chunk_lines
+from task_queue import KeyedTaskQueue, QueueFullError
+from ttl_cache import TTLCache
 
 class TestMadLibs(unittest.TestCase):
     def test_welcome_message(self):
@@ -58,6 +94,23 @@ class TestMadLibs(unittest.TestCase):
             self.assertIn("Chapter 3: Legends of the Night", output)
             self.assertIn("Legendary.", output)
 
+    @patch('builtins.input', return_value="Luna")
+    def test_story_title_follows_template(self, mock_input):
+        """Test that the story is announced with its own template's title"""
+        with patch('sys.stdout', new=StringIO()) as fake_output:
+            katlibs.play_madlibs("dance_practice")
+        output = fake_output.getvalue()
+        self.assertIn("💥 Your Midnight Dance Practice 💥", output)
+        self.assertNotIn("Concert Adventure", output)
+
+    def test_unknown_template_is_a_usage_error(self):
+        """Test that --template with an unknown id exits with a usage message, not a traceback"""
+        result = subprocess.run([sys.executable, katlibs.__file__, "--template", "nope"],
+                                capture_output=True, text=True)
+        self.assertEqual(result.returncode, 2)
+        self.assertIn("invalid choice: 'nope'", result.stderr)
+        self.assertNotIn("Traceback", result.stderr)
+
     def test_story_format(self):
         """Test if the story has the correct format"""
         story = """
@@ -92,5 +145,1036 @@ Legendary. ✨
         self.assertIn("KATSEYE concert", story)
         self.assertIn("GlowBop Arena", story)
 
+class TestStoryTemplates(unittest.TestCase):
+    words = {
+        "name1": "Luna", "name2": "Mia", "city": "Seoul", "adjective1": "excited",
+        "kpop_merch": "lightstick", "snack": "ramen", "dance_move": "crab dance",
+        "embarrassing_sound": "squeak", "weird_object": "glowstick",
+        "idol_name": "Sophia", "emoji": "✨",
+    }
+
+    template = story_templates.get_library().get("kpop_concert")
+
+    def test_compiled_segments(self):
+        """Test that a template compiles into literals and slots"""
+        template = story_templates.parse_template("Hi {name1}, WE LOVE {idol_name.upper()} {{fans}}")
+        self.assertEqual(template.segments, (
+            "Hi ",
+            story_templates.Slot("name1"),
+            ", WE LOVE ",
+            story_templates.Slot("idol_name", "upper"),
+            " {fans}",
+        ))
+        self.assertEqual(template.slot_names, ("name1", "idol_name"))
+        self.assertEqual(template.render(self.words), "Hi Luna, WE LOVE SOPHIA {fans}")
+
+    def test_compile_is_cached(self):
+        """Test that the same source is only parsed once"""
+        source = "{name1} and {name2}"
+        self.assertIs(story_templates.compile_template(source), story_templates.compile_template(source))
+
+    def test_render_story(self):
+        """Test that the K-pop story renders every word"""
+        story = story_templates.render_story(self.words)
+        self.assertIn('"WE LOVE YOU, SOPHIA!"', story)
+        self.assertIn("Legendary. ✨", story)
+        self.assertNotIn("{", story)
+
+    def test_bad_templates(self):
+        """Test that broken templates are rejected"""
+        with self.assertRaises(story_templates.TemplateSyntaxError):
+            story_templates.parse_template("Hello {name")
+        with self.assertRaises(story_templates.TemplateSyntaxError):
+            story_templates.parse_template("Hello {name.shout()}")
+
+    def test_render_many_matches_render(self):
+        """Test that batch rendering matches one-at-a-time rendering"""
+        rows = [dict(self.words, name1=f"Fan{i}") for i in range(5)]
+        stories = list(story_templates.render_many(self.template, rows, batch_size=2))
+        self.assertEqual(stories, [story_templates.render_story(row) for row in rows])
+
+    def test_render_many_from_files(self):
+        """Test that word sets can be streamed from CSV and JSONL files"""
+        with tempfile.TemporaryDirectory() as tmp:
+            csv_path = os.path.join(tmp, "words.csv")
+            with open(csv_path, "w", newline="", encoding="utf-8") as f:
+                writer = csv.DictWriter(f, fieldnames=list(self.words))
+                writer.writeheader()
+                writer.writerow(self.words)
+            jsonl_path = os.path.join(tmp, "words.jsonl")
+            with open(jsonl_path, "w", encoding="utf-8") as f:
+                f.write(json.dumps(self.words) + "\n")
+            expected = [story_templates.render_story(self.words)]
+            self.assertEqual(list(story_templates.render_many(self.template, csv_path)), expected)
+            self.assertEqual(list(story_templates.render_many(self.template, jsonl_path)), expected)
+
+    def test_spans_tag_slot_positions(self):
+        """Test that only filled-in words are tagged, even when they appear in the template text"""
+        words = dict(self.words, snack="the", emoji="")
+        spans = story_templates.story_spans(words)
+        self.assertEqual("".join(text for text, _ in spans), story_templates.render_story(words))
+        tagged = [text for text, tags in spans if tags == ("userword",)]
+        self.assertEqual(tagged.count("the"), 2)
+        self.assertIn("SOPHIA", tagged)
+        self.assertNotIn("", tagged)
+
+    def test_chunk_spans(self):
+        """Test that spans are grouped into bounded chunks without losing text"""
+        spans = self.template.spans(dict(self.words, snack="ramen " * 500))
+        chunks = list(story_templates.chunk_spans(spans, 1000))
+        self.assertTrue(all(sum(len(text) for text, _ in chunk) <= 1000 for chunk in chunks))
+        self.assertEqual([span for chunk in chunks for span in chunk if not span[0]], [])
+        self.assertEqual("".join(text for chunk in chunks for text, _ in chunk), "".join(text for text, _ in spans))
+
+class TempDirTestCase(unittest.TestCase):
+    """Gives each test a scratch directory, ``self.tmp``, removed afterwards."""
+
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def open_database(self, name="onboarding.db"):
+        """An OnboardingDatabase in the scratch directory, closed after the test."""
+        db = OnboardingDatabase(os.path.join(self.tmp, name))
+        self.addCleanup(db.pool.close)
+        return db
+
+
+class TestStoryLibrary(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(3):
+            with open(f"{self.tmp}/story{i}.txt", "w", encoding="utf-8") as f:
+                f.write(f"title: Story {i}\n---\nHello {{name{i}}}!\n")
+
+    def test_index_lists_without_parsing(self):
+        """Test that the index describes templates and bodies load from byte offsets"""
+        library = story_templates.StoryLibrary(self.tmp)
+        self.assertEqual([e.title for e in library.entries()], ["Story 0", "Story 1", "Story 2"])
+        self.assertEqual(library.entry("story1").slots, ("name1",))
+        self.assertEqual(library._cache, {})
+        self.assertEqual(library.get("story1").render({"name1": "Mia"}), "Hello Mia!\n")
+
+    def test_lru_cache_is_bounded(self):
+        """Test that only the most recently used templates stay parsed"""
+        library = story_templates.StoryLibrary(self.tmp, cache_size=2)
+        first = library.get("story0")
+        library.get("story1")
+        self.assertIs(library.get("story0"), first)
+        library.get("story2")
+        self.assertEqual(list(library._cache), ["story0", "story2"])
+
+    def test_changed_template_needs_reindex(self):
+        """Test that an edited template is caught by its content hash"""
+        library = story_templates.StoryLibrary(self.tmp)
+        with open(f"{self.tmp}/story0.txt", "w", encoding="utf-8") as f:
+            f.write("title: Story 0\n---\nBye {name0}!\n")
+        with self.assertRaises(story_templates.TemplateSyntaxError):
+            library.get("story0")
+        library.reindex()
+        self.assertEqual(library.get("story0").render({"name0": "Luna"}), "Bye Luna!\n")
+
+    def test_bundled_templates(self):
+        """Test that every bundled story matches its index entry"""
+        library = story_templates.get_library()
+        self.assertIn("kpop_concert", [e.id for e in library.entries()])
+        for entry in library.entries():
+            self.assertEqual(library.get(entry.id).slot_names, entry.slots)
+
+
+class TestConnectionPool(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db_path = os.path.join(self.tmp, "onboarding.db")
+
+    def test_connections_are_reused(self):
+        """Test that a returned connection is handed out again"""
+        pool = onboarding_store.ConnectionPool(self.db_path, size=2)
+        with pool.connection() as first:
+            with pool.connection() as nested:
+                self.assertIs(nested, first)
+        with pool.connection() as again:
+            self.assertIs(again, first)
+        pool.close()
+
+    def test_read_only_pool_refuses_writes(self):
+        """Test that a read-only pool can query but not modify the database"""
+        writer = onboarding_store.ConnectionPool(self.db_path, size=1)
+        writer.run_in_transaction(onboarding_store.ensure_schema)
+        reader = onboarding_store.ConnectionPool(self.db_path, size=1, read_only=True)
+        with reader.connection() as conn:
+            self.assertEqual(onboarding_store.data_version(conn), 0)
+            with self.assertRaises(sqlite3.OperationalError):
+                conn.execute("DELETE FROM onboarding_progress")
+        reader.close()
+        writer.close()
+
+    def test_pool_size_is_bounded(self):
+        """Test that checkouts wait (and time out) once the pool is exhausted"""
+        pool = onboarding_store.ConnectionPool(self.db_path, size=1, timeout=0.05)
+        errors = []
+        with pool.connection():
+            def borrow():
+                try:
+                    with pool.connection():
+                        pass
+                except onboarding_store.PoolTimeoutError as e:
+                    errors.append(e)
+            worker = threading.Thread(target=borrow)
+            worker.start()
+            worker.join()
+        self.assertEqual(len(errors), 1)
+        pool.close()
+
+    def test_broken_connection_is_replaced(self):
+        """Test that an idle connection failing its health check is reopened"""
+        pool = onboarding_store.ConnectionPool(self.db_path, size=1, health_check_interval=0)
+        with pool.connection() as conn:
+            pass
+        conn.close()
+        with pool.connection() as replacement:
+            self.assertIsNot(replacement, conn)
+            self.assertEqual(replacement.execute("SELECT 1").fetchone(), (1,))
+        pool.close()
+
+    def test_transaction_rolls_back_on_error(self):
+        """Test that a failed transaction leaves no partial writes"""
+        pool = onboarding_store.ConnectionPool(self.db_path)
+        with pool.transaction() as conn:
+            conn.execute("CREATE TABLE t (x)")
+        with self.assertRaises(RuntimeError):
+            with pool.transaction() as conn:
+                conn.execute("INSERT INTO t VALUES (1)")
+                raise RuntimeError("boom")
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone(), (0,))
+        pool.close()
+
+    def test_storage_pragmas(self):
+        """Test that pooled connections run in WAL mode with a busy timeout"""
+        pool = onboarding_store.ConnectionPool(self.db_path)
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+            self.assertEqual(conn.execute("PRAGMA busy_timeout").fetchone(), (5000,))
+        pool.close()
+
+    def test_retry_on_busy(self):
+        """Test that busy errors are retried and other errors are not"""
+        calls = []
+        def flaky():
+            calls.append(1)
+            if len(calls) < 3:
+                raise sqlite3.OperationalError("database is locked")
+            return "ok"
+        self.assertEqual(onboarding_store.retry_on_busy(flaky, attempts=5, base_delay=0), "ok")
+        self.assertEqual(len(calls), 3)
+        def broken():
+            calls.append(1)
+            raise sqlite3.OperationalError("no such table: nope")
+        with self.assertRaises(sqlite3.OperationalError):
+            onboarding_store.retry_on_busy(broken, attempts=5, base_delay=0)
+        self.assertEqual(len(calls), 4)
+
+    def test_write_batcher_groups_writes(self):
+        """Test that concurrent writes commit together and a failing write is isolated"""
+        pool = onboarding_store.ConnectionPool(self.db_path)
+        pool.run_in_transaction(lambda conn: conn.execute("CREATE TABLE t (x INTEGER UNIQUE)"))
+        batcher = onboarding_store.WriteBatcher(pool, max_delay=0.05)
+        futures = [batcher.submit(lambda conn, i=i: conn.execute("INSERT INTO t VALUES (?)", (i,)).rowcount)
+                   for i in range(20)]
+        duplicate = batcher.submit(lambda conn: conn.execute("INSERT INTO t VALUES (0)"))
+        self.assertEqual([f.result() for f in futures], [1] * 20)
+        with self.assertRaises(Exception):
+            duplicate.result()
+        batcher.close()
+        with pool.connection() as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM t").fetchone(), (20,))
+        pool.close()
+
+
+def create_legacy_database(path):
+    """A database with the original schema: one column per step, no step_events."""
+    conn = sqlite3.connect(path)
+    conn.execute('''
+        CREATE TABLE onboarding_progress (
+            employee_id TEXT PRIMARY KEY, slack_user_id TEXT UNIQUE, employee_name TEXT,
+            start_date TIMESTAMP, current_step INTEGER DEFAULT 1,
+            step_1_github BOOLEAN DEFAULT FALSE, step_2_environment BOOLEAN DEFAULT FALSE,
+            step_3_history_quiz INTEGER DEFAULT 0, step_4_product_quiz INTEGER DEFAULT 0,
+            step_5_team_integration BOOLEAN DEFAULT FALSE, step_6_technical_setup BOOLEAN DEFAULT FALSE,
+            step_7_app_testing BOOLEAN DEFAULT FALSE, step_8_first_contribution BOOLEAN DEFAULT FALSE,
+            completion_percentage DECIMAL(5,2) DEFAULT 0.00, completed_date TIMESTAMP NULL,
+            last_activity TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        CREATE TABLE quiz_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT, employee_id TEXT, quiz_type TEXT, score INTEGER,
+            total_questions INTEGER, attempt_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.execute('''
+        INSERT INTO onboarding_progress (employee_id, slack_user_id, employee_name, start_date,
+            current_step, step_1_github, step_2_environment, step_3_history_quiz, completion_percentage)
+        VALUES ('emp_U9', 'U9', 'Mia', '2025-06-01 10:00:00', 4, 1, 1, 4, 37.5),
+               ('emp_U8', 'U8', 'Sophia', '2025-06-02 10:00:00', 4, 1, 1, 2, 37.5)
+    ''')
+    conn.commit()
+    conn.close()
+
+
+class TestOnboardingDatabase(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = self.open_database()
+        self.db.create_employee_record("U123", "Luna")
+
+    def test_step_updates_keep_metrics_in_sync(self):
+        """Test that each step write updates current step and completion"""
+        self.db.update_step_completion("U123", 1)
+        progress = self.db.get_employee_progress("U123")
+        self.assertEqual((progress["current_step"], progress["completion_percentage"]), (2, 12.5))
+        self.db.update_step_completion("U123", 3, True, 2)
+        self.db.update_step_completion("U123", 2)
+        progress = self.db.get_employee_progress("U123")
+        self.assertEqual((progress["current_step"], progress["completion_percentage"]), (3, 25.0))
+        self.assertIsNone(progress["completed_date"])
+
+    def test_all_steps_complete(self):
+        """Test that finishing every step sets the completed date"""
+        scores = {3: 4, 4: 2}
+        workers = [threading.Thread(target=self.db.update_step_completion, args=("U123", step, True, scores.get(step)))
+                   for step in range(1, 9)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        progress = self.db.get_employee_progress("U123")
+        self.assertEqual((progress["current_step"], progress["completion_percentage"]), (9, 100.0))
+        self.assertIsNotNone(progress["completed_date"])
+
+    def test_progress_reports_every_step(self):
+        """Test that progress rows still report one value per step"""
+        self.db.update_step_completion("U123", 4, True, 3)
+        progress = self.db.get_employee_progress("U123")
+        self.assertEqual(progress["step_4_product_quiz"], 3)
+        self.assertEqual(progress["step_1_github"], 0)
+
+    def test_migrates_legacy_step_columns(self):
+        """Test that a database with step_N columns is moved to step_events in place"""
+        create_legacy_database(os.path.join(self.tmp, "legacy.db"))
+
+        db = self.open_database("legacy.db")
+        progress = db.get_employee_progress("U9")
+        self.assertEqual((progress["current_step"], progress["completion_percentage"]), (4, 37.5))
+        self.assertEqual((progress["step_1_github"], progress["step_3_history_quiz"]), (1, 4))
+        # Stored under the old pass rules (2/4 used to pass the history quiz); recomputed on migration
+        progress = db.get_employee_progress("U8")
+        self.assertEqual((progress["current_step"], progress["completion_percentage"]), (3, 25.0))
+        with db.pool.connection() as conn:
+            columns = [row[1] for row in conn.execute("PRAGMA table_info(onboarding_progress)")]
+            self.assertNotIn("step_1_github", columns)
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM step_events").fetchone(), (6,))
+        db.update_step_completion("U9", 4, True, 2)
+        self.assertEqual(db.get_employee_progress("U9")["current_step"], 5)
+
+
+class TestOnboardingDashboard(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        self.db = self.open_database()
+        self.dashboard = dashboard.OnboardingDashboard(self.db.db_path)
+        for user_id, steps in [("U1", range(1, 9)), ("U2", range(1, 4)), ("U3", [])]:
+            self.db.create_employee_record(user_id, user_id)
+            for step in steps:
+                self.db.update_step_completion(user_id, step, True, {3: 4, 4: 3}.get(step))
+
+    def test_analytics_snapshot(self):
+        """Test that the single-pass aggregates match the employee data"""
+        analytics = self.dashboard.get_analytics_snapshot()
+        self.assertEqual((analytics.total_employees, analytics.completed_employees), (3, 1))
+        self.assertAlmostEqual(analytics.avg_completion, (100 + 37.5 + 0) / 3)
+        self.assertAlmostEqual(analytics.completion_rate, 100 / 3)
+        self.assertEqual(analytics.step_completion["GitHub Account"]["completed"], 2)
+        self.assertEqual(analytics.step_completion["Product Quiz"]["completed"], 1)
+        self.assertEqual(len(analytics.step_completion), 8)
+        self.assertEqual(sum(count for _, count in analytics.daily_starts), 3)
+        self.assertEqual(analytics.to_dict()["total_employees"], 3)
+
+    def test_writes_bump_data_version(self):
+        """Test that creating employees and completing steps bump the stored version"""
+        with self.db.pool.connection() as conn:
+            before = onboarding_store.data_version(conn)
+        self.db.create_employee_record("U4", "U4")
+        self.db.update_step_completion("U4", 1)
+        with self.db.pool.connection() as conn:
+            self.assertEqual(onboarding_store.data_version(conn), before + 2)
+
+    def test_snapshot_cache_follows_data_version(self):
+        """Test that cached snapshots are reused until the data changes"""
+        self.dashboard.cache.ttl = 0
+        first = self.dashboard.get_analytics_snapshot()
+        self.assertIs(self.dashboard.get_analytics_snapshot(), first)
+        self.db.update_step_completion("U3", 1)
+        second = self.dashboard.get_analytics_snapshot()
+        self.assertIsNot(second, first)
+        self.assertEqual(second.step_completion["GitHub Account"]["completed"], 3)
+
+    def test_snapshot_cache_ttl_and_invalidate(self):
+        """Test that the version is only re-read after the TTL or an explicit invalidate"""
+        self.dashboard.cache.ttl = 60
+        first = self.dashboard.get_all_progress()
+        self.db.create_employee_record("U4", "U4")
+        self.assertIs(self.dashboard.get_all_progress(), first)
+        self.dashboard.cache.invalidate()
+        self.assertEqual(len(self.dashboard.get_all_progress()), 4)
+
+    def test_progress_stream_sends_changed_rows(self):
+        """Test that the SSE stream starts from now and then sends only the rows that changed"""
+        self.dashboard.cache.ttl = 0
+        events = dashboard.progress_events(self.dashboard, '', poll_interval=0.01)
+        self.assertEqual(next(events), 'retry: 10000\n\n')
+        self.db.update_step_completion("U3", 1)
+        first = json.loads(next(events).split('data: ', 1)[1])
+        self.assertEqual([row['slack_user_id'] for row in first['rows']], ["U3"])
+        self.assertEqual(first['analytics']['total_employees'], 3)
+        self.db.update_step_completion("U2", 4, True, 3)
+        second = json.loads(next(events).split('data: ', 1)[1])
+        self.assertEqual([row['slack_user_id'] for row in second['rows']], ["U2"])
+        events.close()
+
+        # A bulk change bigger than one event asks the page to reload instead
+        bulk = dashboard.progress_events(self.dashboard, '2000-01-01', poll_interval=0.01, max_rows=2)
+        self.assertEqual(list(bulk)[1:], ['event: reload\ndata: {}\n\n'])
+        self.assertEqual(len(self.dashboard.get_progress_changes('2000-01-01', limit=2)), 2)
+
+    def test_readiness_probe(self):
+        """Test that /readyz reports ready, then draining once shutdown starts"""
+        client = dashboard.app.test_client()
+        with mock.patch.object(dashboard, 'dashboard', self.dashboard):
+            self.assertEqual(client.get('/readyz').json['status'], 'ready')
+            with mock.patch.object(dashboard, 'draining') as draining:
+                draining.is_set.return_value = True
+                self.assertEqual(client.get('/readyz').status_code, 503)
+
+    def test_dashboard_migrates_an_older_database(self):
+        """Test that the read-only dashboard serves a database the bot hasn't migrated yet"""
+        legacy_path = os.path.join(self.tmp, "legacy.db")
+        create_legacy_database(legacy_path)
+        board = dashboard.OnboardingDashboard(legacy_path)
+        self.addCleanup(board.pool.close)
+        client = dashboard.app.test_client()
+        with mock.patch.object(dashboard, 'dashboard', board):
+            self.assertEqual(client.get('/readyz').status_code, 200)
+            progress = client.get('/api/progress').json['items']
+            self.assertEqual({row['slack_user_id']: row['current_step'] for row in progress}, {"U9": 4, "U8": 3})
+            self.assertEqual(client.get('/api/analytics').json['total_employees'], 2)
+
+        # When it can't be migrated, endpoints say how to fix it instead of failing with a 500
+        stale = dashboard.OnboardingDashboard(legacy_path)
+        with mock.patch.object(dashboard, 'dashboard', stale), \
+                mock.patch.object(dashboard, 'migrate', side_effect=sqlite3.OperationalError("database is locked")):
+            response = client.get('/api/progress')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn("onboarding_store.py --migrate", response.json['error'])
+
+    def test_open_streams_dont_starve_requests(self):
+        """Test that live streams don't tie up request threads and are capped with a 503"""
+        for name, value in [('dashboard', self.dashboard), ('draining', threading.Event()),
+                            ('stream_slots', threading.BoundedSemaphore(3))]:
+            patcher = mock.patch.object(dashboard, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        server = PooledWSGIServer('127.0.0.1', 0, dashboard.app, threads=2)
+        serving = threading.Thread(target=server.serve_forever, daemon=True)
+        serving.start()
+        self.addCleanup(server.server_close)
+
+        def get(path):
+            conn = http.client.HTTPConnection('127.0.0.1', server.port, timeout=5)
+            self.addCleanup(conn.close)
+            conn.request('GET', path)
+            return conn.getresponse()
+
+        # More streams than request threads
+        streams = [get('/api/stream') for _ in range(3)]
+        self.assertEqual([stream.status for stream in streams], [200, 200, 200])
+        self.assertEqual(get('/readyz').status, 200)
+        progress = get('/api/progress')
+        self.assertEqual((progress.status, len(json.loads(progress.read())['items'])), (200, 3))
+        refused = get('/api/stream')
+        self.assertEqual((refused.status, refused.getheader('Retry-After')), (503, '10'))
+
+        server.begin_shutdown()
+        serving.join(5)
+        self.assertTrue(server.drain(5))
+
+    def test_conditional_get_and_compression(self):
+        """Test that unchanged JSON gets a 304 and large payloads are gzipped"""
+        self.dashboard.cache.ttl = 0
+        client = dashboard.app.test_client()
+        with mock.patch.object(dashboard, 'dashboard', self.dashboard):
+            first = client.get('/api/progress', headers={'Accept-Encoding': 'gzip'})
+            self.assertEqual(first.headers['Content-Encoding'], 'gzip')
+            self.assertEqual(len(json.loads(gzip.decompress(first.data))['items']), 3)
+            etag = first.headers['ETag']
+            again = client.get('/api/progress', headers={'If-None-Match': etag})
+            self.assertEqual((again.status_code, again.data), (304, b''))
+            self.db.update_step_completion("U3", 1)
+            changed = client.get('/api/progress', headers={'If-None-Match': etag})
+            self.assertEqual(changed.status_code, 200)
+            self.assertNotEqual(changed.headers['ETag'], etag)
+            # Dates can't see deletes or new quiz attempts, so only the ETag validates
+            self.assertNotIn('Last-Modified', changed.headers)
+            dated = client.get('/api/progress', headers={'If-Modified-Since': 'Fri, 01 Jan 2100 00:00:00 GMT'})
+            self.assertEqual(dated.status_code, 200)
+            missing = client.get('/api/employee/nobody')
+            self.assertEqual(missing.status_code, 404)
+
+    def test_progress_pages_filters_and_fields(self):
+        """Test keyset pages cover every employee once and filters/projection apply"""
+        for user_id in ("U4", "U5"):
+            self.db.create_employee_record(user_id, user_id)
+        seen, cursor = [], None
+        while True:
+            page = self.dashboard.get_progress_page(dashboard.ProgressQuery(limit=2, cursor=cursor))
+            seen.extend(row['slack_user_id'] for row in page['items'])
+            if not page['next_cursor']:
+                break
+            cursor = dashboard.decode_cursor(page['next_cursor'])
+        self.assertEqual(sorted(seen), ["U1", "U2", "U3", "U4", "U5"])
+        self.assertEqual(seen[0], "U5")
+        query = dashboard.ProgressQuery.from_args({'step': '4', 'fields': 'slack_user_id,step_1_github'})
+        page = self.dashboard.get_progress_page(query)
+        self.assertEqual(page['items'], [{'slack_user_id': 'U2', 'step_1_github': 1}])
+        band = dashboard.ProgressQuery.from_args({'min_completion': '30', 'max_completion': '99', 'fields': 'slack_user_id'})
+        self.assertEqual(self.dashboard.get_progress_page(band)['items'], [{'slack_user_id': 'U2'}])
+        with self.assertRaises(ValueError):
+            dashboard.ProgressQuery.from_args({'fields': 'password'})
+
+    def test_chart_specs_match_plotly(self):
+        """Test that the hand-built chart JSON equals what plotly.graph_objs produces"""
+        analytics = self.dashboard.get_analytics_snapshot()
+        steps = list(analytics.step_completion)
+        percentages = [analytics.step_completion[step]['percentage'] for step in steps]
+        fig = go.Figure(data=[go.Bar(x=steps, y=percentages, marker_color=charts.STEP_PALETTE,
+                                     text=[f"{p:.1f}%" for p in percentages], textposition='auto')])
+        fig.update_layout(title='Step Completion Rates', xaxis_title='Onboarding Steps',
+                          yaxis_title='Completion Percentage', template='plotly_white', height=400)
+        expected = json.loads(json.dumps(fig, cls=plotly.utils.PlotlyJSONEncoder))
+        self.assertEqual(json.loads(json.dumps(charts.completion_progress_figure(analytics))), expected)
+
+
+class FakeSlackClient:
+    """Just enough of slack_sdk.WebClient for the bot tests."""
+
+    def __init__(self, members):
+        self.members = members
+        self.calls = []
+
+    def users_list(self, limit=200, cursor=None):
+        self.calls.append("users_list")
+        start = int(cursor or 0)
+        page = self.members[start:start + limit]
+        next_cursor = str(start + limit) if start + limit < len(self.members) else ""
+        return {"members": page, "response_metadata": {"next_cursor": next_cursor}}
+
+    def users_info(self, user):
+        self.calls.append("users_info")
+        return {"user": next(m for m in self.members if m["id"] == user)}
+
+
+class FakeBoltApp:
+    """Records handlers instead of talking to Slack."""
+
+    def __init__(self, **kwargs):
+        self.handlers = {}
+        self.middlewares = []
+        self.client = FakeSlackClient([])
+
+    def middleware(self, func):
+        self.middlewares.append(func)
+        return func
+
+    def command(self, name):
+        return lambda func: self.handlers.setdefault(name, func)
+
+    def action(self, constraints):
+        name = constraints if isinstance(constraints, str) else constraints["type"]
+        return lambda func: self.handlers.setdefault(name, func)
+
+
+class TestKatbusOnboardingBot(TempDirTestCase):
+    def setUp(self):
+        super().setUp()
+        db = self.open_database()
+        env = {"SLACK_BOT_TOKEN": "xoxb-test", "SLACK_SIGNING_SECRET": "secret", "SLACK_APP_TOKEN": "xapp-test"}
+        with mock.patch.dict(os.environ, env), mock.patch("slack_bolt.App", FakeBoltApp), \
+                mock.patch.object(slack_bot, "OnboardingDatabase", lambda: db):
+            self.bot = slack_bot.KatbusOnboardingBot()
+        self.addCleanup(self.bot.outbound.close)
+        self.addCleanup(self.bot.tasks.close)
+        self.client = self.bot.app.client
+        self.client.members = [
+            {"id": f"U{i}", "name": f"user{i}", "real_name": f"User {i}"} for i in range(5)
+        ] + [{"id": "UGONE", "name": "gone", "deleted": True}]
+        self.responses = []
+
+    def respond(self, *args, **kwargs):
+        self.responses.append((args, kwargs))
+
+    def click(self, action_id, value=None, respond=None):
+        """Run a button click's handler the way the block_actions listener would."""
+        body = {"user": {"id": "U1"}, "actions": [{"action_id": action_id, "value": value}]}
+        handler, action = self.bot.actions.resolve(body)
+        handler(action, respond or self.respond)
+
+    def test_user_cache_warmed_from_users_list(self):
+        """Test that users.list pages fill the name cache and skip deleted users"""
+        self.assertEqual(self.bot.warm_user_cache(page_size=2), 5)
+        self.assertEqual(self.client.calls, ["users_list"] * 3)
+        self.assertEqual(self.bot.get_user_name("U3"), "User 3")
+        self.assertNotIn("users_info", self.client.calls)
+        self.assertEqual(self.bot.user_names.stats()["hits"], 1)
+
+    def test_repeat_onboard_skips_slack_lookup(self):
+        """Test that /onboard only asks Slack for a name the first time"""
+        self.bot.start_onboarding(self.respond, "U1")
+        self.bot.start_onboarding(self.respond, "U1")
+        self.assertEqual(self.client.calls, ["users_info"])
+        self.assertEqual(self.bot.db.get_employee_progress("U1")["employee_name"], "User 1")
+        self.assertTrue(self.responses)
+
+
+    def test_step_blocks_are_precompiled(self):
+        """Test that step blocks reuse the static parts and only rebuild the progress line"""
+        first = self.bot.blocks.step(3, 25)
+        second = self.bot.blocks.step(3, 50)
+        self.assertIn("*Progress: 25% Complete*", first[1]["text"]["text"])
+        self.assertIn("*Progress: 50% Complete*", second[1]["text"]["text"])
+        self.assertIs(first[0], second[0])
+        self.assertTrue(all(a is b for a, b in zip(first[2:], second[2:])))
+        values = [e["value"] for block in first if block["type"] == "actions" for e in block["elements"]]
+        self.assertEqual(values[:4], ["1.3.0.0", "1.3.0.1", "1.3.0.2", "1.3.0.3"])
+        buttons = self.bot.blocks.step(5, 50)[-1]["elements"]
+        self.assertEqual([b["action_id"] for b in buttons], ["complete_step", "get_help"])
+        self.assertEqual(self.bot.blocks.welcome("Ann")[0]["text"]["text"], "Welcome to Katbus, Ann! 🎵✨")
+
+    def test_quiz_session_scores_each_question_once(self):
+        """Test that quiz answers are recorded per attempt and only a pass completes the step"""
+        self.bot.start_onboarding(self.respond, "U1")
+        for step in (1, 2):
+            self.bot.db.update_step_completion("U1", step)
+
+        def answer(question, choice):
+            self.click("quiz_answer", f"1.3.{question}.{choice}")
+
+        # First attempt: two right, one wrong, one answered twice (counted once)
+        for question, choice in [(0, 1), (1, 0), (1, 1), (2, 3), (3, 0)]:
+            answer(question, choice)
+        self.assertIn("already answered question 2", self.responses[-5][0][0])
+        self.assertIn("You scored 2/4", self.responses[-1][0][0])
+        self.assertEqual(self.bot.db.get_employee_progress("U1")["current_step"], 3)
+
+        # Second attempt passes and moves on to step 4
+        for question, choice in [(0, 1), (1, 1), (2, 3), (3, 2)]:
+            answer(question, choice)
+        progress = self.bot.db.get_employee_progress("U1")
+        self.assertEqual((progress["current_step"], progress["step_3_history_quiz"]), (4, 4))
+        with self.bot.db.pool.connection() as conn:
+            attempts = conn.execute("SELECT quiz_type, score, total_questions, answered FROM quiz_attempts ORDER BY id").fetchall()
+        self.assertEqual(attempts, [("history", 2, 4, 0b1111), ("history", 4, 4, 0b1111)])
+        self.assertEqual(len(self.bot.quiz_engine.sessions), 0)
+
+        # Retaking it from the old message with a lower score changes nothing
+        for question, choice in [(0, 1), (1, 1), (2, 3), (3, 0)]:
+            answer(question, choice)
+        self.assertIn("progress is unchanged", self.responses[-2][0][0])
+        progress = self.bot.db.get_employee_progress("U1")
+        self.assertEqual((progress["current_step"], progress["step_3_history_quiz"]), (4, 4))
+        self.bot.db.update_step_completion("U1", 3, True, 3)
+        self.assertEqual(self.bot.db.get_employee_progress("U1")["step_3_history_quiz"], 4)
+
+    def test_quiz_for_a_later_step_is_not_recorded(self):
+        """Test that passing a quiz the user hasn't reached leaves their progress alone"""
+        self.bot.start_onboarding(self.respond, "U1")
+        for question in range(3):
+            self.click("quiz_answer", f"1.4.{question}.1")
+        self.assertIn("progress is unchanged", self.responses[-2][0][0])
+        progress = self.bot.db.get_employee_progress("U1")
+        self.assertEqual((progress["current_step"], progress["completion_percentage"]), (1, 0))
+        self.assertEqual(progress["step_4_product_quiz"], 0)
+
+    def test_action_routing(self):
+        """Test that button values are decoded and validated once, and unknown actions are just acked"""
+        self.assertEqual(decode_value("1.3.2.0"), (1, (3, 2, 0)))
+        self.assertEqual(decode_value("history_2_0"), (0, ("history", 2, 0)))
+        resolve = self.bot.actions.resolve
+        parse = lambda action_id, value: resolve({"user": {"id": "U1"}, "actions": [{"action_id": action_id, "value": value}]})[1].value
+        self.assertEqual(parse("quiz_answer", "1.4.2.1"), ("product", 2, 1))
+        self.assertEqual(parse("quiz_answer", "history_2_0"), ("history", 2, 0))
+        self.assertEqual(parse("complete_step", "5"), 5)
+        self.assertIs(parse("next_step", None), None)
+        for action_id, value in [("quiz_answer", "1.3.4.0"), ("quiz_answer", "1.3.0.-1"), ("quiz_answer", "1.5.0.0"),
+                                 ("quiz_answer", "2.3.0.0"), ("quiz_answer", "1.3.x"), ("complete_step", "1.9"),
+                                 ("complete_step", "1.3"), ("complete_step", "4")]:
+            with self.assertRaises(ActionValueError, msg=value):
+                parse(action_id, value)
+
+        handle_action = self.bot.app.handlers["block_actions"]
+        acks = []
+        handle_action(lambda *args: acks.append(args), {"user": {"id": "U1"}, "actions": [{"action_id": "mystery"}]},
+                      self.respond)
+        self.assertEqual((acks, self.responses, self.bot.actions.unhandled), ([()], [], 1))
+        handle_action(lambda *args: acks.append(args),
+                      {"user": {"id": "U1"}, "actions": [{"action_id": "complete_step", "value": "1.42"}]}, self.respond)
+        self.assertIn("out of date", self.responses[-1][0][0])
+        # Mark Complete can't finish a quiz step, so a passed quiz isn't overwritten
+        self.responses.clear()
+        handle_action(lambda *args: acks.append(args),
+                      {"user": {"id": "U1"}, "actions": [{"action_id": "complete_step", "value": "1.3"}]}, self.respond)
+        self.assertEqual(len(self.responses), 1)
+        self.assertIn("out of date", self.responses[-1][0][0])
+
+        self.click("get_help", "1.2")
+        self.assertIn("Need help with Step 2", self.responses[-1][0][0])
+
+    def test_redeliveries_are_dropped(self):
+        """Test that a retried command or click is acked without reaching the handlers"""
+        drop_duplicates = self.bot.app.middlewares[0]
+        click = {"type": "block_actions", "user": {"id": "U1"},
+                 "actions": [{"action_id": "complete_step", "value": "1.1", "action_ts": "1700000000.1"}]}
+        command = {"command": "/onboard", "user_id": "U1", "trigger_id": "123.456.abc"}
+        results = []
+        for body, retry in [(click, []), (click, ["1"]), (command, []), (command, ["1"]), ({"type": "url_verification"}, [])]:
+            request = SimpleNamespace(headers={"x-slack-retry-num": retry} if retry else {})
+            response = drop_duplicates(request, body, lambda: "handled")
+            results.append(getattr(response, "status", response))
+        self.assertEqual(results, ["handled", 200, "handled", 200, "handled"])
+        self.assertEqual(self.bot.deliveries.stats()["duplicates"], 2)
+        self.assertEqual(self.bot.deliveries.stats()["retries"], 2)
+
+    def test_double_clicks_are_dropped(self):
+        """Test that a second click on the same button is dropped until the click window has passed"""
+        drop_duplicates = self.bot.app.middlewares[0]
+
+        def click(action_ts, value="1.1"):
+            body = {"type": "block_actions", "user": {"id": "U1"},
+                    "actions": [{"action_id": "complete_step", "value": value, "action_ts": action_ts}]}
+            response = drop_duplicates(SimpleNamespace(headers={}), body, lambda: "handled")
+            return getattr(response, "status", response)
+
+        self.assertEqual([click("1.1"), click("1.2"), click("1.3", value="1.2")], ["handled", 200, "handled"])
+        self.assertEqual(self.bot.deliveries.stats()["double_clicks"], 1)
+        self.bot.deliveries.recent_clicks.clear()
+        self.assertEqual(click("1.4"), "handled")
+
+    def test_dedup_claims_survive_in_sqlite(self):
+        """Test that the SQLite spill still catches duplicates the memory cache has lost"""
+        path = os.path.join(self.tmp, "deliveries.db")
+        first = DeliveryDeduplicator(maxsize=1, db_path=path)
+        self.addCleanup(first.pool.close)
+        self.assertTrue(first.claim("trigger:a"))
+        self.assertTrue(first.claim("trigger:b"))  # evicts trigger:a from memory
+        self.assertFalse(first.claim("trigger:a"))
+        restarted = DeliveryDeduplicator(maxsize=10, db_path=path)
+        self.assertFalse(restarted.claim("trigger:b"))
+        expired = DeliveryDeduplicator(maxsize=10, ttl=0, db_path=path)
+        self.assertTrue(expired.claim("trigger:b"))
+
+        # A slow spill doesn't hold up the ack; the claim is still written afterwards
+        gate = threading.Event()
+        first.pool.writer.submit(lambda conn: gate.wait(5))
+        self.assertTrue(first.claim("trigger:c"))
+        self.assertFalse(first.claim("trigger:c"))
+        self.assertEqual(first.stats()["db_timeouts"], 1)
+        gate.set()
+        first.pool.writer.run(lambda conn: None)
+        self.assertFalse(DeliveryDeduplicator(maxsize=10, db_path=path).claim("trigger:c"))
+
+    def test_dashboard_command_pages_and_filters(self):
+        """Test that /dashboard summarises everyone but lists one filtered page"""
+        for i in range(45):
+            self.bot.db.create_employee_record(f"UD{i:02d}", f"Hire <{i:02d}>")
+            for step in range(1, 1 + i % 9):
+                self.bot.db.update_step_completion(f"UD{i:02d}", step, True, {3: 4, 4: 3}.get(step))
+        with self.bot.db.pool.transaction() as conn:
+            conn.execute("UPDATE onboarding_progress SET last_activity = '2020-01-01 09:00:00' "
+                         "WHERE slack_user_id IN ('UD00', 'UD01', 'UD08')")
+
+        def dashboard(text):
+            self.responses.clear()
+            self.bot.show_dashboard(self.respond, text)
+            args, kwargs = self.responses[-1]
+            return kwargs.get("blocks"), "\n".join(
+                b["text"]["text"] if "text" in b else b["elements"][0]["text"] for b in kwargs.get("blocks") or []) or args[0]
+
+        blocks, text = dashboard("")
+        self.assertIn("Total Employees: 45", text)
+        self.assertIn("Completed: 5", text)
+        self.assertIn("Stalled (7+ days idle): 2", text)
+        self.assertEqual(text.count("• *Hire"), 20)
+        self.assertIn("*Hire &lt;44&gt;*", text)
+        self.assertIn("Page 1 of 3 · `/dashboard page 2` for more", text)
+
+        _, text = dashboard("page 3")
+        self.assertEqual(text.count("• *Hire"), 5)
+        self.assertIn("Page 3 of 3", text)
+        self.assertNotIn("for more", text)
+
+        _, text = dashboard("stalled")
+        self.assertIn("*Stalled* (2)", text)
+        self.assertLess(text.index("Hire &lt;00&gt;"), text.index("Hire &lt;01&gt;"))
+        self.assertIn("last active 2020-01-01", text)
+
+        _, text = dashboard("ACTIVE step 3 page 1")
+        self.assertIn("*Active step 3* (5)", text)
+        _, text = dashboard("step 3 page 9")
+        self.assertIn("No step 3 employees on page 9.", text)
+        _, text = dashboard("step 12")
+        self.assertIn("there is no step 12", text)
+        self.assertIn("Usage:", text)
+
+        chunks = chunk_lines([f"line {i:04d}" for i in range(1000)], 3000)
+        self.assertTrue(all(len(chunk) <= 3000 for chunk in chunks))
+        self.assertEqual("\n".join(chunks).count("line"), 1000)
+
+    def test_step_completion_sent_as_one_message(self):
+        """Test that everything one action says reaches response_url as a single post"""
+        slack = StubSlackServer()
+        self.addCleanup(slack.close)
+        self.bot.start_onboarding(self.respond, "U1")
+        respond = Respond(response_url=slack.url)
+        self.assertTrue(self.bot.dispatch("U1", respond, lambda out: self.click("complete_step", "1.1", out)))
+        self.assertTrue(self.bot.tasks.join(timeout=10))
+        self.assertTrue(self.bot.outbound.join(timeout=10))
+        self.assertEqual(len(slack.payloads), 1)
+        self.assertIn("Step 1 completed!", slack.payloads[0]["text"])
+        self.assertTrue(slack.payloads[0]["blocks"])
+        self.assertEqual(self.bot.outbound.stats()["merged"], 1)
+
+
+class StubSlackServer:
+    """A local stand-in for Slack's response_url endpoint.
+
+    Records every JSON payload posted to it; the first ``rate_limit`` requests
+    get HTTP 429 with a short Retry-After instead, and the next ones get the
+    statuses in ``failures``.
+    """
+
+    def __init__(self, rate_limit=0, retry_after="0.1", failures=()):
+        self.payloads = []
+        self.rejected = 0
+        self.failures = list(failures)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                payload = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                if stub.rejected < rate_limit:
+                    stub.rejected += 1
+                    self.send_response(429)
+                    self.send_header("Retry-After", retry_after)
+                elif stub.failures:
+                    self.send_response(stub.failures.pop(0))
+                else:
+                    stub.payloads.append(payload)
+                    self.send_response(200)
+                self.send_header("Content-Length", "2")
+                self.end_headers()
+                self.wfile.write(b"ok")
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_port}/response"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestOutboundDispatcher(unittest.TestCase):
+    def setUp(self):
+        self.slack = StubSlackServer(rate_limit=1)
+        self.addCleanup(self.slack.close)
+        self.dispatcher = OutboundDispatcher(workers=2, base_delay=0.01, rate=100)
+        self.addCleanup(self.dispatcher.close)
+        self.respond = Respond(response_url=self.slack.url)
+
+    def test_rate_limited_send_is_retried(self):
+        """Test that a 429 pauses the bucket for Retry-After and the message still arrives"""
+        out = self.dispatcher.responder("U1", self.respond)
+        out("hello")
+        started = time.monotonic()
+        out.flush()
+        self.assertTrue(self.dispatcher.join(timeout=10))
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual([p["text"] for p in self.slack.payloads], ["hello"])
+        stats = self.dispatcher.stats()
+        self.assertEqual((stats["rate_limited"], stats["retries"], stats["sent"], stats["dropped"]), (1, 1, 1, 0))
+
+    def test_queued_responses_are_merged_in_order(self):
+        """Test that replies queued behind an in-flight send go out as one message"""
+        first = self.dispatcher.responder("U1", self.respond)
+        first("one")
+        first.flush()
+        # While "one" waits out its 429, the next replies queue up behind it
+        deadline = time.monotonic() + 10
+        while not self.slack.rejected and time.monotonic() < deadline:
+            time.sleep(0.005)
+        second = self.dispatcher.responder("U1", self.respond)
+        second("two")
+        second("three", blocks=[{"type": "divider"}])
+        second("ephemeral", replace_original=False)
+        second.flush()
+        self.assertTrue(self.dispatcher.join(timeout=10))
+        self.assertEqual(self.slack.payloads[0]["text"], "one")
+        self.assertEqual(self.slack.payloads[1]["text"], "two\n\nthree")
+        self.assertEqual([b["type"] for b in self.slack.payloads[1]["blocks"]], ["section", "divider"])
+        self.assertIs(self.slack.payloads[2]["replace_original"], False)
+        self.assertEqual(self.dispatcher.stats()["depth"], 0)
+        blocks = [{"type": "divider"}] * 30
+        self.assertEqual(len(merge_messages([{"text": "a", "blocks": blocks}, {"text": "b", "blocks": blocks}])), 2)
+
+    def test_only_failures_that_werent_delivered_are_retried(self):
+        """Test that 5xx is retried, other 4xx is dropped, and only connect failures are retried"""
+        slack = StubSlackServer()
+        self.addCleanup(slack.close)
+        respond = Respond(response_url=slack.url)
+        for text, failures in [("retried", [500]), ("rejected", [404]), ("sent", [])]:
+            slack.failures = failures
+            out = self.dispatcher.responder("U2", respond)
+            out(text)
+            out.flush()
+            self.assertTrue(self.dispatcher.join(timeout=10))
+        self.assertEqual([p["text"] for p in slack.payloads], ["retried", "sent"])
+        stats = self.dispatcher.stats()
+        self.assertEqual((stats["retries"], stats["sent"], stats["dropped"]), (1, 2, 1))
+
+        def refused(**message):
+            raise urllib.error.URLError(ConnectionRefusedError(111, "Connection refused"))
+        dispatcher = OutboundDispatcher(workers=1, max_attempts=2, base_delay=0.01, rate=100)
+        self.addCleanup(dispatcher.close)
+        dispatcher.enqueue("U3", refused, {"text": "nobody home"})
+        self.assertTrue(dispatcher.join(timeout=10))
+        stats = dispatcher.stats()
+        self.assertEqual((stats["retries"], stats["dropped"]), (1, 1))
+        # A timeout may come after Slack got the POST, so it isn't retried
+        self.assertFalse(_retryable(urllib.error.URLError(socket.timeout("timed out"))))
+        self.assertFalse(_retryable(TimeoutError()))
+
+
+class TestKeyedTaskQueue(unittest.TestCase):
+    def test_tasks_run_in_order_per_key(self):
+        """Test that one key's tasks never overlap and keep submission order"""
+        tasks = KeyedTaskQueue(workers=4)
+        self.addCleanup(tasks.close)
+        seen = {"U1": [], "U2": []}
+        running = set()
+        overlaps = []
+        lock = threading.Lock()
+
+        def work(key, n):
+            with lock:
+                if key in running:
+                    overlaps.append(key)
+                running.add(key)
+            time.sleep(0.001)
+            with lock:
+                running.discard(key)
+                seen[key].append(n)
+
+        for n in range(20):
+            for key in seen:
+                tasks.submit(key, work, key, n)
+        self.assertTrue(tasks.join(timeout=10))
+        self.assertEqual(seen, {"U1": list(range(20)), "U2": list(range(20))})
+        self.assertEqual(overlaps, [])
+        self.assertEqual(tasks.stats()["completed"], 40)
+
+    def test_queue_is_bounded(self):
+        """Test that submissions beyond max_pending are rejected and counted"""
+        started, release = threading.Event(), threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        tasks = KeyedTaskQueue(workers=1, max_pending=2)
+        self.addCleanup(tasks.close)
+        self.addCleanup(release.set)
+        tasks.submit("U1", block)
+        started.wait()
+        tasks.submit("U1", len, "a")
+        tasks.submit("U2", len, "b")
+        with self.assertRaises(QueueFullError):
+            tasks.submit("U3", len, "c")
+        stats = tasks.stats()
+        self.assertEqual((stats["pending"], stats["rejected"], stats["max_depth"]), (2, 1, 2))
+
+
+class TestTTLCache(unittest.TestCase):
+    def test_lru_eviction_and_counters(self):
+        """Test that the least recently used entry is evicted and lookups are counted"""
+        cache = TTLCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+        self.assertEqual(cache.get("a"), 1)
+        cache.set("c", 3)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1, "size": 2, "maxsize": 2})
+
+    def test_entries_expire(self):
+        """Test that entries past their TTL are treated as missing"""
+        cache = TTLCache(ttl=60)
+        cache.set("fresh", 1)
+        cache.set("stale", 2, ttl=-1)
+        self.assertEqual(cache.get("fresh"), 1)
+        self.assertEqual(cache.get("stale", "gone"), "gone")
+
+
+class TestQuickStart(TempDirTestCase):
+    def test_dependency_check_does_not_import(self):
+        """Test that installed modules are found without importing them and missing ones are reported"""
+        with open(os.path.join(self.tmp, "qs_installed_dep.py"), "w") as f:
+            f.write("raise RuntimeError('imported')\n")
+        modules = {"qs_installed_dep": "installed-dep"}
+        with patch.object(sys, "path", [self.tmp] + sys.path), \
+                patch.dict(quick_start.REQUIRED_MODULES, modules, clear=True), \
+                patch('sys.stdout', new=StringIO()) as fake_output:
+            self.assertTrue(quick_start.check_dependencies())
+            self.assertNotIn("qs_installed_dep", sys.modules)
+            quick_start.REQUIRED_MODULES["qs_missing_dep"] = "missing-dep"
+            self.assertFalse(quick_start.check_dependencies())
+        self.assertIn("❌ Missing dependencies: missing-dep\n", fake_output.getvalue())
+
+    def test_startup_report_parses_importtime(self):
+        """Test that -X importtime output becomes the module's total and its slowest direct imports"""
+        stderr = "\n".join([
+            "import time: self [us] | cumulative | imported package",
+            "import time:       300 |        300 |   json.decoder",
+            "import time:       200 |       1500 | json",
+            "import time:       100 |        100 |     jinja2.utils",
+            "import time:       400 |       1200 |   jinja2",
+            "import time:       600 |       2500 |   flask",
+            "import time:       500 |       4300 | dashboard",
+        ])
+        completed = subprocess.CompletedProcess([], 0, stdout="", stderr=stderr)
+        with patch('subprocess.run', return_value=completed) as run:
+            wall_ms, total_ms, children = quick_start.measure_startup("dashboard")
+            self.assertIn("importtime", run.call_args.args[0])
+            with patch('sys.stdout', new=StringIO()) as fake_output:
+                quick_start.show_startup_report(["dashboard"], top=1)
+        self.assertGreaterEqual(wall_ms, 0)
+        self.assertEqual(total_ms, 4.3)
+        self.assertEqual(children, [("flask", 2.5), ("jinja2", 1.2)])
+        report = fake_output.getvalue()
+        self.assertIn("📦 dashboard: 4 ms importing", report)
+        self.assertIn("2.5 ms  flask", report)
+        self.assertNotIn("jinja2", report)
+
 if __name__ == '__main__':
     unittest.main() 
\ No newline at end of file